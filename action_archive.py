@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Monthly archive databases for old actions (hot/cold split)
+
+With ACTION_ARCHIVE_DAYS set, actions older than that move out of the live
+database into one SQLite file per month (`archive/actions-YYYY-MM.db`, next
+to the live DB unless ACTION_ARCHIVE_DIR says otherwise). The live DB stays
+small enough to keep its indexes in cache; historical queries ATTACH the
+months they need and read through a UNION ALL (see `union_source`).
+
+Rows are copied and deleted in id batches, one transaction per batch.
+Archive tables use `id` as PRIMARY KEY with INSERT OR IGNORE, so an
+interrupted batch (SQLite only commits each attached file atomically on its
+own in WAL mode) is simply redone on the next run - rows are never lost,
+at worst briefly present in both places.
+
+Usage:
+    python action_archive.py --days 90             # Dry run (rows per month)
+    python action_archive.py --days 90 --execute   # Archive
+"""
+
+import argparse
+import glob
+import logging
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import compact_schema
+import db_domains
+import epoch
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv("DATABASE_PATH", "data/pro4kings.db")
+
+# Columns copied to (and read back from) the archives - the `actions` shape
+ARCHIVE_COLUMNS = (
+    "id",
+    "player_id",
+    "player_name",
+    "action_type",
+    "action_detail",
+    "item_name",
+    "item_quantity",
+    "target_player_id",
+    "target_player_name",
+    "admin_id",
+    "admin_name",
+    "warning_count",
+    "reason",
+    "timestamp",
+    "raw_text",
+    "amount",
+    "fee",
+)
+
+ARCHIVE_TABLE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {{schema}}.actions (
+        id INTEGER PRIMARY KEY,
+        player_id INTEGER,
+        player_name TEXT,
+        action_type TEXT NOT NULL,
+        action_detail TEXT,
+        item_name TEXT,
+        item_quantity INTEGER,
+        target_player_id INTEGER,
+        target_player_name TEXT,
+        admin_id INTEGER,
+        admin_name TEXT,
+        warning_count TEXT,
+        reason TEXT,
+        timestamp TIMESTAMP,
+        raw_text TEXT,
+        amount INTEGER,
+        fee INTEGER,
+        ts {epoch.TS_COLUMN_SQL}
+    )
+"""
+
+ARCHIVE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_actions_player ON actions(player_id)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_actions_target ON actions(target_player_id)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_actions_ts ON actions(ts)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_actions_type ON actions(action_type)",
+)
+
+_MONTH_FILE_RE = re.compile(r"actions-(\d{4}-\d{2})\.db$")
+
+
+def archive_dir_for(db_path: str, archive_dir: Optional[str] = None) -> str:
+    """Archive directory (default: `archive/` next to the live DB)"""
+    if archive_dir:
+        return archive_dir
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "archive")
+
+
+def month_path(archive_dir: str, month: str) -> str:
+    return os.path.join(archive_dir, f"actions-{month}.db")
+
+
+def list_archives(archive_dir: str) -> List[Tuple[str, str]]:
+    """(month, path) of every archive file, oldest first"""
+    archives = []
+    for path in glob.glob(os.path.join(archive_dir, "actions-*.db")):
+        match = _MONTH_FILE_RE.search(path)
+        if match:
+            archives.append((match.group(1), path))
+    return sorted(archives)
+
+
+def _schema_name(month: str) -> str:
+    return "arch_" + month.replace("-", "_")
+
+
+def _attach(cursor, path: str, schema: str, create: bool = False) -> None:
+    cursor.execute("ATTACH DATABASE ? AS " + schema, (path,))
+    if create:
+        cursor.execute(ARCHIVE_TABLE_SQL.format(schema=schema))
+        for index_sql in ARCHIVE_INDEXES:
+            cursor.execute(index_sql.format(schema=schema))
+
+
+def month_bounds(month: str) -> Tuple[int, int]:
+    """[start, end) epoch range of a 'YYYY-MM' month"""
+    year, mon = (int(part) for part in month.split("-"))
+    end = (year + 1, 1) if mon == 12 else (year, mon + 1)
+    return (
+        epoch.to_epoch(f"{year:04d}-{mon:02d}-01 00:00:00"),
+        epoch.to_epoch(f"{end[0]:04d}-{end[1]:02d}-01 00:00:00"),
+    )
+
+
+def pending_by_month(conn: sqlite3.Connection, cutoff_ts: int) -> List[Tuple[str, int]]:
+    """(month, row count) of live actions older than cutoff_ts"""
+    return [
+        (row[0], row[1])
+        for row in conn.execute(
+            """
+            SELECT strftime('%Y-%m', timestamp) as month, COUNT(*)
+            FROM actions WHERE ts < ?
+            GROUP BY month ORDER BY month
+        """,
+            (cutoff_ts,),
+        )
+        if row[0]
+    ]
+
+
+def archive_batch(
+    conn: sqlite3.Connection,
+    archive_dir: str,
+    month: str,
+    cutoff_ts: int,
+    batch_size: int = 5000,
+) -> int:
+    """Move one batch of `month`'s actions older than cutoff_ts, returns rows moved
+
+    One short write transaction, so callers can interleave other writes
+    between batches. Uses the caller's connection (commits whatever it has
+    pending - ATTACH can't run inside a transaction).
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    conn.commit()
+
+    cursor = conn.cursor()
+    table = compact_schema.actions_table(cursor)
+    live = db_domains.table_schema(cursor, table)
+    columns = ", ".join(ARCHIVE_COLUMNS)
+    schema = _schema_name(month)
+    start, end = month_bounds(month)
+    _attach(cursor, month_path(archive_dir, month), schema, create=True)
+    conn.commit()
+    try:
+        cursor.execute(
+            """
+            SELECT id FROM actions
+            WHERE ts >= ? AND ts < ?
+            ORDER BY id LIMIT ?
+        """,
+            (start, min(end, cutoff_ts), batch_size),
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return 0
+
+        placeholders = ",".join("?" * len(ids))
+        cursor.execute(
+            f"INSERT OR IGNORE INTO {schema}.actions ({columns}) "
+            f"SELECT {columns} FROM actions WHERE id IN ({placeholders})",
+            ids,
+        )
+        cursor.execute(f"DELETE FROM {live}.{table} WHERE id IN ({placeholders})", ids)
+        conn.commit()
+        return len(ids)
+    finally:
+        conn.commit()
+        cursor.execute("DETACH DATABASE " + schema)
+
+
+def archive_actions(
+    conn: sqlite3.Connection,
+    archive_dir: str,
+    cutoff_ts: int,
+    batch_size: int = 5000,
+    log=logger.info,
+) -> int:
+    """Move live actions older than cutoff_ts into their monthly archives
+
+    Returns the number of rows moved.
+    """
+    moved = 0
+    started = time.time()
+
+    for month, _count in pending_by_month(conn, cutoff_ts):
+        while True:
+            batch = archive_batch(conn, archive_dir, month, cutoff_ts, batch_size)
+            if not batch:
+                break
+            moved += batch
+        log(f"📦 Archived actions for {month} -> {month_path(archive_dir, month)}")
+
+    if moved:
+        log(f"📦 Moved {moved:,} actions to archives in {time.time() - started:.1f}s")
+    return moved
+
+
+@contextmanager
+def union_source(
+    conn: sqlite3.Connection, archive_dir: str, since_ts: Optional[int]
+) -> Iterator[str]:
+    """Yield a FROM-clause source covering live + archived actions since since_ts
+
+    Attaches only the monthly archives that overlap the window (newest first,
+    up to SQLite's attach limit) and yields `(SELECT ... UNION ALL ...)`, or
+    plain `actions` when no archive is needed. WHERE clauses on the outer
+    query are pushed down into every branch, so archive indexes are used.
+    """
+    since_month = epoch.format_epoch(since_ts, "%Y-%m") if since_ts is not None else ""
+    archives = [
+        (month, path)
+        for month, path in list_archives(archive_dir)
+        if month >= since_month
+    ]
+    if not archives:
+        yield "actions"
+        return
+
+    cursor = conn.cursor()
+    live = db_domains.table_schema(cursor, "actions")
+    # Leave room for the attached domain files plus one slot for archiving
+    attached_domains = len(db_domains.schemas(cursor)) - 1
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) - attached_domains - 1
+    if len(archives) > limit:
+        logger.warning(
+            f"⚠️ {len(archives)} archive months requested, attaching newest {limit}"
+        )
+        archives = archives[-limit:]
+
+    conn.commit()
+    columns = ", ".join(ARCHIVE_COLUMNS) + ", ts"
+    attached = []
+    try:
+        for month, path in archives:
+            schema = _schema_name(month)
+            _attach(cursor, path, schema)
+            attached.append(schema)
+
+        branches = [f"SELECT {columns} FROM {live}.actions"] + [
+            f"SELECT {columns} FROM {schema}.actions" for schema in attached
+        ]
+        yield "(" + " UNION ALL ".join(branches) + ")"
+    finally:
+        conn.commit()
+        for schema in attached:
+            cursor.execute("DETACH DATABASE " + schema)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old actions by month")
+    parser.add_argument("--db", default=DB_PATH, help="Database path")
+    parser.add_argument("--dir", default=None, help="Archive directory")
+    parser.add_argument(
+        "--days", type=int, required=True, help="Archive actions older than N days"
+    )
+    parser.add_argument(
+        "--execute", action="store_true", help="Move rows (default: dry run)"
+    )
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found: {args.db}")
+        return
+
+    archive_dir = archive_dir_for(args.db, args.dir)
+    cutoff_ts = epoch.now_epoch() - args.days * epoch.DAY
+
+    conn = sqlite3.connect(args.db, timeout=30.0)
+    db_domains.attach(conn, args.db)
+    conn.execute("PRAGMA journal_mode=WAL")
+    pending = pending_by_month(conn, cutoff_ts)
+    for month, count in pending:
+        print(f"  {month}: {count:,} actions")
+    print(f"📦 {sum(c for _, c in pending):,} actions older than {args.days} days")
+
+    if args.execute:
+        archive_actions(conn, archive_dir, cutoff_ts, args.batch_size, log=print)
+    else:
+        print(f"🔍 Dry run - re-run with --execute to move them to {archive_dir}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+"""Staged action ingestion
+
+`scrape_actions` used to fetch, parse, dedup, save and run the side effects
+of every action inside one loop iteration, so a slow write delayed the next
+poll. The work is now split into stages connected by bounded queues:
+
+    fetch (scrape_actions task) -> parse -> dedup -> write -> dispatch
+
+- parse: homepage HTML -> PlayerAction list, off the event loop
+- dedup: drops actions already seen (in-memory window of recent keys, then
+  `action_exists` for the rest)
+- write: `save_action`, one action at a time on the events writer thread
+- dispatch: kick -> logout, ban detection, then one coalesced
+  `mark_players_for_update` and one `add_action_counts` per drained batch
+
+The fetch task only waits when the parse queue is full (backpressure), so
+write latency no longer sets the polling cadence. Each stage counts items,
+errors and busy time; `stats()` also reports queue depths and the fetch ->
+saved latency.
+
+Every poll is recorded in `ingest_metrics` once its last new action is
+saved: snapshot size, new items, overlap with the previous snapshot, a gap
+flag (the snapshot's oldest action is newer than the previous newest, so
+actions in between were never seen) and the ingestion lag (panel timestamp
+-> DB commit) of its new actions.
+
+Consumers that only care about some actions (VIP, online-priority) call
+`subscribe()` with a filter instead of fetching the homepage themselves:
+every saved action is offered to each subscription, which buffers the
+matches until its task drains them.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import epoch
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("parse", "dedup", "write", "dispatch")
+
+# Keys of recently seen actions kept to skip the DB duplicate check
+SEEN_WINDOW = 5000
+
+# Queue bounds: pages waiting for the parser / actions between stages
+PAGE_QUEUE_SIZE = 4
+ACTION_QUEUE_SIZE = 1000
+
+# Matches a subscription holds before dropping the oldest
+SUBSCRIBER_BACKLOG = 500
+
+
+def action_to_dict(action) -> Dict:
+    """PlayerAction -> the dict `save_action` expects"""
+    return {
+        "player_id": action.player_id,
+        "player_name": action.player_name,
+        "action_type": action.action_type,
+        "action_detail": action.action_detail,
+        "item_name": action.item_name,
+        "item_quantity": action.item_quantity,
+        "target_player_id": action.target_player_id,
+        "target_player_name": action.target_player_name,
+        "admin_id": action.admin_id,
+        "admin_name": action.admin_name,
+        "warning_count": action.warning_count,
+        "reason": action.reason,
+        "timestamp": action.timestamp,
+        "raw_text": action.raw_text,
+        "amount": action.amount,
+        "fee": action.fee,
+    }
+
+
+class _StageStats:
+    def __init__(self):
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.max_ms = 0.0
+
+    def add(self, seconds: float, items: int = 1) -> None:
+        self.items += items
+        self.busy += seconds
+        self.max_ms = max(self.max_ms, seconds * 1000)
+
+    def to_dict(self, uptime: float) -> Dict:
+        return {
+            "items": self.items,
+            "errors": self.errors,
+            "per_min": round(self.items / uptime * 60, 1) if uptime else 0.0,
+            "avg_ms": round(self.busy / self.items * 1000, 2) if self.items else 0.0,
+            "max_ms": round(self.max_ms, 1),
+            "busy_pct": round(self.busy / uptime * 100, 1) if uptime else 0.0,
+        }
+
+
+class _Poll:
+    """One fetched snapshot, tracked until all its new actions are written"""
+
+    def __init__(self, fetched_at: float):
+        self.fetched_at = fetched_at
+        # Local epoch of the fetch, like the other `ts` columns (fetched_at is monotonic)
+        self.ts = epoch.now_epoch() - int(time.monotonic() - fetched_at)
+        self.snapshot_size = 0
+        self.new_items = 0
+        self.overlap: Optional[int] = None
+        self.gap = False
+        self.poll_interval: Optional[float] = None
+        self.pending = 0
+        self.lags: List[float] = []
+
+    def to_metric(self) -> Dict:
+        return {
+            "ts": self.ts,
+            "snapshot_size": self.snapshot_size,
+            "new_items": self.new_items,
+            "overlap": self.overlap,
+            "gap": self.gap,
+            "lag_avg": round(sum(self.lags) / len(self.lags), 2) if self.lags else None,
+            "lag_max": round(max(self.lags), 2) if self.lags else None,
+            "poll_interval": self.poll_interval,
+        }
+
+
+class FeedSubscription:
+    """Saved actions matching `predicate`, buffered until drained"""
+
+    def __init__(
+        self, name: str, predicate: Callable, backlog: int = SUBSCRIBER_BACKLOG
+    ):
+        self.name = name
+        self.predicate = predicate
+        self._actions = deque(maxlen=backlog)
+        self.delivered = 0
+        self.dropped = 0
+
+    def offer(self, action) -> None:
+        try:
+            if not self.predicate(action):
+                return
+        except Exception as e:
+            logger.error(f"❌ Feed filter {self.name} failed: {e}")
+            return
+        if len(self._actions) == self._actions.maxlen:
+            self.dropped += 1
+        self._actions.append(action)
+        self.delivered += 1
+
+    def drain(self) -> List:
+        """All buffered matches, oldest first"""
+        actions = list(self._actions)
+        self._actions.clear()
+        return actions
+
+    def stats(self) -> Dict:
+        return {
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "pending": len(self._actions),
+        }
+
+
+class ActionPipeline:
+    """Bounded-queue pipeline from homepage HTML to saved actions"""
+
+    def __init__(
+        self,
+        db,
+        presence,
+        scraper_getter,
+        limit: int = 200,
+        poller=None,
+        on_interval: Optional[Callable[[float], None]] = None,
+    ):
+        self.db = db
+        self.presence = presence
+        self.scraper_getter = scraper_getter
+        self.limit = limit
+        # adaptive_poll.AdaptivePoller fed with every snapshot (optional)
+        self.poller = poller
+        # Called with the poller's next interval as soon as a snapshot is observed
+        self.on_interval = on_interval
+
+        self._pages: Optional[asyncio.Queue] = None
+        self._dedup: Optional[asyncio.Queue] = None
+        self._write: Optional[asyncio.Queue] = None
+        self._dispatch: Optional[asyncio.Queue] = None
+        self._tasks = []
+        # (timestamp, raw_text) of actions known to be saved or in flight
+        self._seen: "OrderedDict[Tuple, None]" = OrderedDict()
+        self.subscriptions: Dict[str, FeedSubscription] = {}
+        # Newest panel timestamp of the previous snapshot (gap detection)
+        self._previous_newest: Optional[datetime] = None
+
+        self.stats_by_stage = {stage: _StageStats() for stage in STAGES}
+        self.pages_submitted = 0
+        self.submit_wait = 0.0
+        self.saved = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.last_saved_at: Optional[datetime] = None
+        self.started: Optional[float] = None
+        self.gaps = 0
+        self.lag_last: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks) and not all(task.done() for task in self._tasks)
+
+    def start(self) -> None:
+        """Create the queues and stage workers on the running loop"""
+        if self.running:
+            return
+        self._pages = asyncio.Queue(PAGE_QUEUE_SIZE)
+        self._dedup = asyncio.Queue(PAGE_QUEUE_SIZE)
+        self._write = asyncio.Queue(ACTION_QUEUE_SIZE)
+        self._dispatch = asyncio.Queue(ACTION_QUEUE_SIZE)
+        self._tasks = [
+            asyncio.create_task(self._run(stage, worker), name=f"pipeline-{stage}")
+            for stage, worker in (
+                ("parse", self._parse_stage),
+                ("dedup", self._dedup_stage),
+                ("write", self._write_stage),
+                ("dispatch", self._dispatch_stage),
+            )
+        ]
+        self.started = time.monotonic()
+        logger.info("🏭 Action pipeline started (parse -> dedup -> write -> dispatch)")
+
+    def subscribe(self, name: str, predicate: Callable) -> FeedSubscription:
+        """Receive every saved action for which predicate(action) is true"""
+        subscription = FeedSubscription(name, predicate)
+        self.subscriptions[name] = subscription
+        return subscription
+
+    def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def submit(self, html: str, fetched_at: Optional[float] = None) -> None:
+        """Hand a fetched homepage to the parser (waits only if the queue is full)"""
+        if not self.running:
+            self.start()
+        started = time.monotonic()
+        await self._pages.put((html, fetched_at or started))
+        self.submit_wait += time.monotonic() - started
+        self.pages_submitted += 1
+
+    async def _run(self, stage: str, worker) -> None:
+        """Keep a stage alive: errors are counted and logged, never fatal"""
+        while True:
+            try:
+                await worker()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats_by_stage[stage].errors += 1
+                logger.error(f"❌ Pipeline {stage} stage error: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+    async def _parse_stage(self) -> None:
+        while True:
+            html, fetched_at = await self._pages.get()
+            started = time.perf_counter()
+            scraper = await self.scraper_getter()
+            actions = await asyncio.to_thread(
+                scraper.parse_latest_actions, html, self.limit
+            )
+            self.stats_by_stage["parse"].add(time.perf_counter() - started)
+            if not actions:
+                logger.warning("⚠️ No actions parsed from the homepage")
+                continue
+            await self._dedup.put((actions, fetched_at))
+
+    def _remember(self, key: Tuple) -> None:
+        self._seen[key] = None
+        if len(self._seen) > SEEN_WINDOW:
+            self._seen.popitem(last=False)
+
+    async def _dedup_stage(self) -> None:
+        while True:
+            actions, fetched_at = await self._dedup.get()
+            started = time.perf_counter()
+            new = []
+            for action in actions:
+                key = (action.timestamp, action.raw_text)
+                if key in self._seen:
+                    self._seen.move_to_end(key)
+                    continue
+                if not await self.db.action_exists(action.timestamp, action.raw_text):
+                    new.append(action)
+                self._remember(key)
+            self.stats_by_stage["dedup"].add(time.perf_counter() - started, len(actions))
+
+            poll = _Poll(fetched_at)
+            poll.snapshot_size = len(actions)
+            poll.new_items = poll.pending = len(new)
+            if self.poller:
+                poll.poll_interval = self.poller.observe(
+                    ((action.timestamp, action.raw_text) for action in actions),
+                    len(new),
+                    fetched_at,
+                )
+                poll.overlap = self.poller.last_overlap
+                if self.on_interval:
+                    # Reschedule the poll now, not after the next fetch (gaps go fast at once)
+                    self.on_interval(poll.poll_interval)
+            self._check_gap(actions, poll)
+
+            if not new:
+                logger.info(f"ℹ️ No new actions (checked {len(actions)} entries)")
+                await self._record_poll(poll)
+            for action in new:
+                await self._write.put((action, poll))
+
+    def _check_gap(self, actions, poll: _Poll) -> None:
+        """Flag the poll if its oldest action is newer than the previous newest"""
+        timestamps = [action.timestamp for action in actions if action.timestamp]
+        if not timestamps:
+            return
+        oldest, newest = min(timestamps), max(timestamps)
+        if self._previous_newest is not None and oldest > self._previous_newest:
+            poll.gap = True
+            self.gaps += 1
+            logger.warning(
+                f"🕳️ Action feed gap: oldest action {oldest:%H:%M:%S} is newer than "
+                f"the previous poll's newest {self._previous_newest:%H:%M:%S}"
+            )
+        self._previous_newest = max(newest, self._previous_newest or newest)
+
+    async def _poll_written(self, poll: _Poll) -> None:
+        """One of the poll's new actions is done - record the poll after the last"""
+        poll.pending -= 1
+        if poll.pending == 0:
+            await self._record_poll(poll)
+
+    async def _record_poll(self, poll: _Poll) -> None:
+        # Metrics must never hold up ingestion
+        try:
+            await self.db.save_ingest_metric(poll.to_metric())
+        except Exception as e:
+            logger.debug(f"Could not record ingest metrics: {e}")
+
+    async def _write_stage(self) -> None:
+        while True:
+            action, poll = await self._write.get()
+            started = time.perf_counter()
+            try:
+                await self.db.save_action(action_to_dict(action))
+            except Exception:
+                # Forget it so the next poll retries the action
+                self._seen.pop((action.timestamp, action.raw_text), None)
+                await self._poll_written(poll)
+                raise
+            self.stats_by_stage["write"].add(time.perf_counter() - started)
+
+            # Ingestion lag: panel timestamp -> committed
+            if action.timestamp:
+                self.lag_last = (datetime.now() - action.timestamp).total_seconds()
+                poll.lags.append(self.lag_last)
+            await self._poll_written(poll)
+
+            latency = time.monotonic() - poll.fetched_at
+            self.saved += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            self.last_saved_at = datetime.now()
+            for subscription in self.subscriptions.values():
+                subscription.offer(action)
+            await self._dispatch.put(action)
+
+    async def _dispatch_stage(self) -> None:
+        while True:
+            batch = [await self._dispatch.get()]
+            while not self._dispatch.empty():
+                batch.append(self._dispatch.get_nowait())
+
+            started = time.perf_counter()
+            player_ids: Set[Tuple[str, str]] = set()
+            for action in batch:
+                # One failing side effect (e.g. a busy DB on save_banned_player)
+                # must not skip the rest of the batch: its actions are committed
+                try:
+                    await self._side_effects(action, player_ids)
+                except Exception as e:
+                    self.stats_by_stage["dispatch"].errors += 1
+                    logger.error(
+                        f"❌ Side effects failed for {action.action_type} "
+                        f"({action.player_id}): {e}",
+                        exc_info=True,
+                    )
+
+            # 🔥 One coalesced bulk write instead of one UPSERT per player
+            await self.db.mark_players_for_update(player_ids)
+            await self.db.add_action_counts(
+                Counter(action.player_id for action in batch if action.player_id)
+            )
+            self.stats_by_stage["dispatch"].add(time.perf_counter() - started, len(batch))
+            logger.info(
+                f"✅ Saved {len(batch)} new actions, marked {len(player_ids)} players for update"
+            )
+
+    async def _side_effects(self, action, player_ids: Set[Tuple[str, str]]) -> None:
+        # Collected first, so the players are marked even if a step below fails
+        if action.player_id:
+            player_ids.add(
+                (action.player_id, action.player_name or f"Player_{action.player_id}")
+            )
+        if action.target_player_id:
+            player_ids.add(
+                (
+                    action.target_player_id,
+                    action.target_player_name or f"Player_{action.target_player_id}",
+                )
+            )
+
+        # 🔥 Server kick (faction_kicked) = kicked from FiveM server by admin
+        # This should trigger a logout for the affected player
+        if action.action_type == "faction_kicked" and action.player_id:
+            self.presence.record_logout(
+                action.player_id, action.timestamp or datetime.now()
+            )
+            logger.info(
+                f"🚫 Server kick detected: {action.player_name}({action.player_id}) - triggering logout"
+            )
+
+        # 🔥 Ban detection - auto-add to banned_players table when ban action detected
+        if action.action_type == "ban_received" and action.player_id:
+            ban_data = {
+                "player_id": action.player_id,
+                "player_name": action.player_name or f"Player_{action.player_id}",
+                "admin": action.admin_name,
+                "reason": action.reason,
+                "duration": None,  # Duration not always in action detail
+                "ban_date": (action.timestamp or datetime.now()).strftime(
+                    "%Y-%m-%d %H:%M:%S"
+                ),
+                "expiry_date": None,
+            }
+            await self.db.save_banned_player(ban_data)
+            logger.info(
+                f"🔨 Ban detected from action: {action.player_name}({action.player_id}) by {action.admin_name}"
+            )
+
+    def stats(self) -> Dict:
+        """Per-stage throughput/latency, queue depths and fetch -> saved latency"""
+        uptime = time.monotonic() - self.started if self.started else 0.0
+        queues = {
+            "pages": self._pages,
+            "dedup": self._dedup,
+            "write": self._write,
+            "dispatch": self._dispatch,
+        }
+        return {
+            "running": self.running,
+            "uptime_seconds": round(uptime),
+            "pages_submitted": self.pages_submitted,
+            "submit_wait_seconds": round(self.submit_wait, 2),
+            "queues": {
+                name: queue.qsize() if queue else 0 for name, queue in queues.items()
+            },
+            "stages": {
+                stage: entry.to_dict(uptime)
+                for stage, entry in self.stats_by_stage.items()
+            },
+            "subscriptions": {
+                name: subscription.stats()
+                for name, subscription in self.subscriptions.items()
+            },
+            "saved": self.saved,
+            "latency_avg_s": (
+                round(self.latency_total / self.saved, 2) if self.saved else None
+            ),
+            "latency_max_s": round(self.latency_max, 2),
+            "lag_last_s": round(self.lag_last, 1) if self.lag_last is not None else None,
+            "gaps": self.gaps,
+            "last_saved_at": self.last_saved_at.isoformat() if self.last_saved_at else None,
+        }
@@ -0,0 +1,84 @@
+"""Numeric value extraction for money/contract actions
+
+Pulls `amount`, `fee` and (where the pattern didn't set them) `item_name` /
+`item_quantity` out of a parsed action, so leaderboards can aggregate plain
+integer columns instead of re-parsing `action_detail` on every query. Used by
+the scraper at ingest and by the database backfill for historical rows.
+"""
+
+import re
+from typing import Dict, Optional
+
+# Action types that carry a money amount
+VALUE_ACTION_TYPES = (
+    "money_transfer",
+    "money_deposit",
+    "money_withdraw",
+    "gambling_win",
+    "vehicle_contract",
+)
+
+_AMOUNT_RE = re.compile(r"(\d[\d.,]*)\s*\$")
+_SUM_RE = re.compile(r"suma\s+de\s+(\d[\d.,]*)", re.IGNORECASE)
+_FEE_RE = re.compile(r"taxa\s+(\d[\d.,]*)\s*\$", re.IGNORECASE)
+_GAMBLING_RE = re.compile(r":\s*(\d[\d.,]*)\s*\$?\s*$")
+# Contract offers - "'123' [Brioso, ]" / "'456' [10.000.000$"
+_CONTRACT_OFFER_RE = re.compile(r"'(\d+)'\s*\[([^\]]*)")
+
+
+def parse_money(value: Optional[str]) -> Optional[int]:
+    """Parse a '1.234.567' / '1,234,567' style amount into an int"""
+    if not value:
+        return None
+    digits = re.sub(r"[.,\s]", "", value)
+    return int(digits) if digits.isdigit() else None
+
+
+def extract_action_values(
+    action_type: Optional[str],
+    action_detail: Optional[str],
+    raw_text: Optional[str],
+    player_id: Optional[str] = None,
+) -> Dict[str, Optional[object]]:
+    """Extract amount/fee/item values for a money or contract action
+
+    Returns a dict with `amount`, `fee`, `item_name` and `item_quantity`;
+    values that don't apply are None.
+    """
+    values = {"amount": None, "fee": None, "item_name": None, "item_quantity": None}
+    if action_type not in VALUE_ACTION_TYPES:
+        return values
+
+    detail = action_detail or ""
+    raw = raw_text or ""
+
+    if action_type == "gambling_win":
+        # "Câștigat barbut vs Name: 50.000$"
+        match = _GAMBLING_RE.search(detail)
+        values["amount"] = parse_money(match.group(1)) if match else None
+
+    elif action_type == "vehicle_contract":
+        # Money side of an exchange contract, items from the player's own offer
+        for offer_id, offer in _CONTRACT_OFFER_RE.findall(raw):
+            for money in _AMOUNT_RE.findall(offer):
+                amount = parse_money(money)
+                if amount is not None:
+                    values["amount"] = (values["amount"] or 0) + amount
+
+            items = [
+                item.strip()
+                for item in _AMOUNT_RE.sub("", offer).split(",")
+                if item.strip()
+            ]
+            if items and offer_id == player_id and values["item_name"] is None:
+                values["item_name"] = ", ".join(items)
+                values["item_quantity"] = len(items)
+
+    else:
+        # "Transferat 1.000$ lui X" / "Depozitat 1.000$ (taxa 10$)" / "Retras ..."
+        match = _AMOUNT_RE.search(detail) or _SUM_RE.search(raw)
+        values["amount"] = parse_money(match.group(1)) if match else None
+        fee = _FEE_RE.search(detail) or _FEE_RE.search(raw)
+        values["fee"] = parse_money(fee.group(1)) if fee else None
+
+    return values
@@ -0,0 +1,140 @@
+"""Adaptive polling for the latest-actions feed
+
+The homepage only shows the newest ~200 actions. With a fixed interval a
+busy server can roll the whole window over between two polls (actions are
+lost), while a quiet one wastes requests. `AdaptivePoller` looks at every
+parsed snapshot:
+
+- overlap: actions also present in the previous snapshot
+- arrival rate: new actions per second (EWMA)
+
+and picks the next interval so that about `target_fill` of the window is
+replaced between polls, clamped to [min_interval, max_interval]. Polls that
+find nothing new back the interval off by `backoff`. A snapshot with no
+overlap at all means the window may have rolled past unseen actions: it is
+recorded as a possible gap and the next poll runs at `min_interval`.
+"""
+
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest rate sample in the EWMA
+RATE_SMOOTHING = 0.3
+
+# Possible-gap events kept for stats
+GAP_HISTORY = 100
+
+
+class AdaptivePoller:
+    """Next poll interval from snapshot overlap and arrival rate"""
+
+    def __init__(
+        self,
+        interval: float,
+        min_interval: float,
+        max_interval: float,
+        target_fill: float = 0.25,
+        backoff: float = 1.5,
+        enabled: bool = True,
+    ):
+        self.min_interval = max(0.5, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+        self.target_fill = target_fill
+        self.backoff = backoff
+        self.enabled = enabled
+
+        self.rate: Optional[float] = None  # New actions per second (EWMA)
+        self.window = 0  # Snapshot size seen last
+        self._previous_keys: Optional[set] = None
+        self._previous_at: Optional[float] = None
+
+        self.polls = 0
+        self.last_overlap: Optional[int] = None
+        self.last_new = 0
+        self.gap_count = 0
+        self.gaps: deque = deque(maxlen=GAP_HISTORY)
+
+    def observe(
+        self, keys: Iterable, new_count: int, fetched_at: Optional[float] = None
+    ) -> float:
+        """Record one parsed snapshot, returns the next poll interval
+
+        `keys` identify the snapshot's actions, `new_count` is how many were
+        not in the database yet, `fetched_at` is the fetch time (monotonic).
+        """
+        keys = set(keys)
+        fetched_at = fetched_at or time.monotonic()
+        self.polls += 1
+        self.window = max(self.window, len(keys))
+        self.last_new = new_count
+
+        overlap = None
+        if self._previous_keys is not None:
+            overlap = len(keys & self._previous_keys)
+            elapsed = fetched_at - self._previous_at
+            if elapsed > 0:
+                sample = new_count / elapsed
+                self.rate = (
+                    sample
+                    if self.rate is None
+                    else RATE_SMOOTHING * sample + (1 - RATE_SMOOTHING) * self.rate
+                )
+            if overlap == 0 and keys:
+                self._record_gap(len(keys), elapsed)
+        self.last_overlap = overlap
+        self._previous_keys = keys
+        self._previous_at = fetched_at
+
+        if self.enabled:
+            self.interval = self._next_interval(overlap, new_count)
+        return self.interval
+
+    def _next_interval(self, overlap: Optional[int], new_count: int) -> float:
+        if overlap == 0:
+            return self.min_interval
+        if new_count == 0:
+            return min(self.interval * self.backoff, self.max_interval)
+        if not self.rate:
+            return self.interval
+        # Time for `target_fill` of the window to be replaced at the current rate
+        target = self.target_fill * self.window / self.rate
+        return min(max(target, self.min_interval), self.max_interval)
+
+    def _record_gap(self, window: int, elapsed: float) -> None:
+        self.gap_count += 1
+        event = {
+            "at": datetime.now().isoformat(),
+            "window": window,
+            "seconds_since_previous": round(elapsed, 1),
+            "rate_per_min": round(self.rate * 60, 1) if self.rate else None,
+        }
+        self.gaps.append(event)
+        logger.info(
+            f"🕳️ Possible gap in the action feed: no overlap with the previous "
+            f"snapshot ({window} actions, {elapsed:.1f}s apart) - polling at "
+            f"{self.min_interval:g}s"
+        )
+
+    def recent_gaps(self) -> List[Dict]:
+        return list(self.gaps)
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "interval": round(self.interval, 1),
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            "polls": self.polls,
+            "rate_per_min": round(self.rate * 60, 1) if self.rate is not None else None,
+            "window": self.window,
+            "last_overlap": self.last_overlap,
+            "last_new": self.last_new,
+            "possible_gaps": self.gap_count,
+            "last_gap": self.gaps[-1] if self.gaps else None,
+        }
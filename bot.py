@@ -10,11 +10,20 @@ import signal
 import sys
 from datetime import datetime, timedelta
 from database import Database
+import db_backup
+import db_domains
+import wal_checkpoint
 from scraper import Pro4KingsScraper
 from config import Config
+from presence import PresenceTracker
+from action_pipeline import ActionPipeline
+from adaptive_poll import AdaptivePoller
+from loop_monitor import LoopMonitor
+import cpu_profiler
+import metrics
 import asyncio
 import logging
-import tracemalloc
+import time
 import psutil
 
 
@@ -49,8 +58,6 @@ async def run_migration_once():
 
 
 # 🔥 SET UP LOGGING FIRST (before using logger)
-tracemalloc.start()
-
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -91,6 +98,8 @@ logger.info(f"{'='*60}\n")
 COMMANDS_SYNCED = False
 SYNC_LOCK = asyncio.Lock()
 SCAN_IN_PROGRESS = False
+ACTION_BACKFILL_STARTED = False
+METRICS_SERVER = None  # aiohttp AppRunner serving /metrics
 
 SCAN_STATS = {
     "start_time": None,
@@ -122,9 +131,22 @@ TASK_HEALTH = {
         "error_count": 0,
     },
     "cleanup_stale_data": {"last_run": None, "is_running": False, "error_count": 0},
+    "purge_old_data": {"last_run": None, "is_running": False, "error_count": 0},
+    "backup_database": {"last_run": None, "is_running": False, "error_count": 0},
+    "checkpoint_wal": {"last_run": None, "is_running": False, "error_count": 0},
     "task_watchdog": {"last_run": None, "is_running": False, "error_count": 0},
 }
 
+
+def finish_task(name: str):
+    """Mark a task iteration finished and record its duration for /metrics"""
+    health = TASK_HEALTH[name]
+    health["is_running"] = False
+    if health["last_run"]:
+        duration = (datetime.now() - health["last_run"]).total_seconds()
+        metrics.TASK_DURATION.observe(duration, task=name)
+
+
 SHUTDOWN_REQUESTED = False
 
 # Initialize Discord bot
@@ -133,9 +155,28 @@ intents.message_content = True
 bot = commands.Bot(command_prefix="!p4k ", intents=intents)
 
 # Initialize database
-db = Database(Config.DATABASE_PATH)
+db = Database(
+    Config.DATABASE_PATH,
+    mark_coalesce_window=Config.PROFILE_MARK_COALESCE_WINDOW,
+    compress_raw_text=Config.RAW_TEXT_COMPRESSION,
+    archive_after_days=Config.ACTION_ARCHIVE_DAYS,
+    archive_dir=Config.ACTION_ARCHIVE_DIR or None,
+    retention_days={
+        "actions": Config.ACTIONS_RETENTION_DAYS,
+        "login_events": Config.LOGIN_EVENTS_RETENTION_DAYS,
+        "profile_history": Config.PROFILE_HISTORY_RETENTION_DAYS,
+        "ingest_metrics": Config.INGEST_METRICS_RETENTION_DAYS,
+    },
+    split_domains=Config.DATABASE_SPLIT,
+    read_workers=Config.DB_READ_WORKERS,
+    max_pending_jobs=Config.DB_MAX_PENDING_JOBS,
+    slow_query_ms=Config.SLOW_QUERY_MS,
+)
 scraper: Pro4KingsScraper | None = None
 
+# In-memory login/logout state (loaded once from login_events in on_ready)
+presence = PresenceTracker()
+
 
 def signal_handler(sig, frame):
     """Handle shutdown signals gracefully"""
@@ -158,8 +199,16 @@ def signal_handler(sig, frame):
         scrape_online_priority_actions.cancel()
     if cleanup_stale_data.is_running():
         cleanup_stale_data.cancel()
+    if purge_old_data.is_running():
+        purge_old_data.cancel()
+    if backup_database.is_running():
+        backup_database.cancel()
+    if checkpoint_wal.is_running():
+        checkpoint_wal.cancel()
     if task_watchdog.is_running():
         task_watchdog.cancel()
+    action_pipeline.stop()
+    loop_monitor.stop()
 
     logger.info("✅ Background tasks stopped")
 
@@ -172,6 +221,8 @@ def signal_handler(sig, frame):
                 logger.info("✅ Scraper closed successfully")
             except Exception as e:
                 logger.error(f"Error closing scraper: {e}")
+        if METRICS_SERVER:
+            await METRICS_SERVER.cleanup()
         await bot.close()
 
     asyncio.create_task(cleanup_and_shutdown())
@@ -266,23 +317,248 @@ async def get_or_recreate_scraper(max_concurrent=None):
     return scraper
 
 
+# Poll interval from feed overlap / arrival rate (fixed when adaptive polling is off)
+action_poller = AdaptivePoller(
+    Config.SCRAPE_ACTIONS_INTERVAL,
+    Config.SCRAPE_ACTIONS_MIN_INTERVAL,
+    Config.SCRAPE_ACTIONS_MAX_INTERVAL,
+    target_fill=Config.SCRAPE_ACTIONS_TARGET_FILL,
+    enabled=Config.SCRAPE_ACTIONS_ADAPTIVE,
+)
+
+
+def apply_action_poll_interval(seconds: float) -> None:
+    """📈 Reschedule scrape_actions as soon as the dedup stage has seen a snapshot
+
+    change_interval on a sleeping loop recalculates its current sleep, so a
+    gap switches to the fast interval before the next fetch, not after it.
+    """
+    if abs(scrape_actions.seconds - seconds) >= 0.5:
+        logger.debug(
+            f"📈 Action poll interval {scrape_actions.seconds:g}s -> {seconds:.1f}s"
+        )
+        scrape_actions.change_interval(seconds=seconds)
+
+
+# Staged action ingestion: scrape_actions only fetches, the stages do the rest
+action_pipeline = ActionPipeline(
+    db,
+    presence,
+    get_or_recreate_scraper,
+    limit=Config.ACTIONS_FETCH_LIMIT,
+    poller=action_poller,
+    on_interval=apply_action_poll_interval,
+)
+
+# Loop lag + stacks of blocking callbacks (started in on_ready, on the bot's loop)
+loop_monitor = LoopMonitor(
+    Config.LOOP_MONITOR_INTERVAL, Config.LOOP_BLOCK_THRESHOLD_MS / 1000
+)
+
+# VIP / online-priority tracking filter the shared feed (no homepage fetches of their own)
+ONLINE_PRIORITY_IDS: set = set()
+VIP_IDS = set(Config.VIP_PLAYER_IDS)
+vip_feed = (
+    action_pipeline.subscribe(
+        "vip", lambda action: Pro4KingsScraper.is_vip_action(action, VIP_IDS)
+    )
+    if Config.VIP_PLAYER_IDS
+    else None
+)
+online_priority_feed = (
+    action_pipeline.subscribe(
+        "online_priority",
+        lambda action: Pro4KingsScraper.is_online_action(action, ONLINE_PRIORITY_IDS),
+    )
+    if Config.TRACK_ONLINE_PLAYERS_PRIORITY
+    else None
+)
+
+
+def collect_metrics():
+    """Gauges read at scrape time from TASK_HEALTH, the DB executor and the pipeline"""
+    yield (
+        "p4k_process_start_time_seconds",
+        "gauge",
+        "Bot process start time (unix)",
+        [({}, metrics.START_TIME)],
+    )
+    yield (
+        "p4k_task_running",
+        "gauge",
+        "1 while a task iteration is in progress",
+        [({"task": name}, health["is_running"]) for name, health in TASK_HEALTH.items()],
+    )
+    yield (
+        "p4k_task_error_count",
+        "gauge",
+        "Task errors since the last reset",
+        [({"task": name}, health["error_count"]) for name, health in TASK_HEALTH.items()],
+    )
+    yield (
+        "p4k_task_last_run_timestamp_seconds",
+        "gauge",
+        "Start of the latest task iteration (unix)",
+        [
+            ({"task": name}, health["last_run"].timestamp())
+            for name, health in TASK_HEALTH.items()
+            if health["last_run"]
+        ],
+    )
+
+    if scraper:
+        yield (
+            "p4k_scraper_adaptive_delay_seconds",
+            "gauge",
+            "Current scraper backoff delay",
+            [({}, scraper.adaptive_delay)],
+        )
+
+    executor = db.get_executor_stats()
+    yield (
+        "p4k_db_pending_jobs",
+        "gauge",
+        "DB executor jobs queued or running",
+        [
+            ({"kind": "read"}, executor["pending_reads"]),
+            ({"kind": "write"}, executor["pending_writes"]),
+        ],
+    )
+    yield (
+        "p4k_db_slot_waits_total",
+        "counter",
+        "DB jobs that waited for a free executor slot",
+        [({}, executor["waited_for_slot"])],
+    )
+
+    pipeline = action_pipeline.stats()
+    yield (
+        "p4k_pipeline_queue_depth",
+        "gauge",
+        "Items waiting between action pipeline stages",
+        [({"queue": name}, depth) for name, depth in pipeline["queues"].items()],
+    )
+    yield (
+        "p4k_pipeline_stage_items_total",
+        "counter",
+        "Items processed per action pipeline stage",
+        [({"stage": name}, stage["items"]) for name, stage in pipeline["stages"].items()],
+    )
+    yield (
+        "p4k_actions_ingested_total",
+        "counter",
+        "Actions saved by the ingestion pipeline",
+        [({}, pipeline["saved"])],
+    )
+    yield (
+        "p4k_feed_gaps_total",
+        "counter",
+        "Polls whose snapshot did not reach back to the previous one",
+        [({}, pipeline["gaps"])],
+    )
+    if pipeline["lag_last_s"] is not None:
+        yield (
+            "p4k_ingest_lag_seconds",
+            "gauge",
+            "Panel timestamp -> commit lag of the latest saved action",
+            [({}, pipeline["lag_last_s"])],
+        )
+    yield (
+        "p4k_feed_poll_interval_seconds",
+        "gauge",
+        "Current latest-actions poll interval",
+        [({}, action_poller.interval)],
+    )
+    if loop_monitor.samples:
+        loop = loop_monitor.stats()
+        yield (
+            "p4k_event_loop_lag_seconds",
+            "gauge",
+            "Event-loop wakeup delay (last sample, p50/p99 over the window, max)",
+            [
+                ({"stat": stat}, loop[f"lag_{stat}_ms"] / 1000)
+                for stat in ("last", "p50", "p99", "max")
+            ],
+        )
+        yield (
+            "p4k_event_loop_blocked_total",
+            "counter",
+            "Callbacks that blocked the event loop past the threshold",
+            [({}, loop["blocked_count"])],
+        )
+        yield (
+            "p4k_event_loop_blocked_seconds_total",
+            "counter",
+            "Time the event loop spent blocked past the threshold",
+            [({}, loop["blocked_seconds"])],
+        )
+    if action_poller.rate is not None:
+        yield (
+            "p4k_actions_arrival_per_second",
+            "gauge",
+            "New actions per second on the panel feed (EWMA)",
+            [({}, action_poller.rate)],
+        )
+
+
+metrics.REGISTRY.add_collector(collect_metrics)
+
+
+async def profile_endpoint(request):
+    """GET /debug/profile?seconds=10&interval_ms=5&idle=false - sample this process"""
+    from aiohttp import web
+
+    try:
+        seconds = float(request.query.get("seconds", 10))
+        interval = float(request.query.get("interval_ms", 5)) / 1000
+    except ValueError:
+        return web.json_response({"error": "seconds/interval_ms must be numbers"}, status=400)
+    include_idle = request.query.get("idle", "false").lower() == "true"
+    try:
+        profile = await asyncio.to_thread(
+            cpu_profiler.sample, seconds, interval, include_idle
+        )
+    except RuntimeError as e:
+        return web.json_response({"error": str(e)}, status=409)
+    logger.info(
+        f"🔬 CPU profile via HTTP: {profile.elapsed:.1f}s, {profile.samples} samples"
+    )
+    return web.json_response(profile.to_dict())
+
+
 # Import and setup slash commands
 try:
     from commands import setup_commands
 
-    setup_commands(bot, db, get_or_recreate_scraper)
+    setup_commands(
+        bot,
+        db,
+        get_or_recreate_scraper,
+        TASK_HEALTH,
+        action_pipeline,
+        action_poller,
+        loop_monitor,
+    )
     logger.info("✅ Slash commands module loaded")
 except ImportError as e:
     logger.warning(f"⚠️ Could not import commands module: {e}")
     logger.warning("⚠️ Bot will run without slash commands")
 
 
+async def backfill_action_values():
+    """Run the one-off amount/fee backfill without blocking startup"""
+    try:
+        await db.backfill_action_values()
+    except Exception as e:
+        logger.error(f"❌ Action value backfill failed: {e}", exc_info=True)
+
+
 @bot.event
 async def on_ready():
     """Bot ready event - runs migration, imports data, starts background tasks"""
     # Run migration automatically (only once)
     await run_migration_once()
-    global COMMANDS_SYNCED
+    global COMMANDS_SYNCED, ACTION_BACKFILL_STARTED, METRICS_SERVER
 
     logger.info(f"✅ {bot.user} is now running!")
 
@@ -299,6 +575,17 @@ async def on_ready():
     await log_database_startup_info()
     await inspect_database_tables()
 
+    if not presence.loaded:
+        try:
+            await presence.load(db)
+        except Exception as e:
+            logger.error(f"❌ Failed to load presence state: {e}", exc_info=True)
+
+    # 💰 Fill amount/fee for actions saved before ingest-time extraction (batched, background)
+    if not ACTION_BACKFILL_STARTED:
+        ACTION_BACKFILL_STARTED = True
+        asyncio.create_task(backfill_action_values())
+
     # Sync slash commands
     async with SYNC_LOCK:
         if not COMMANDS_SYNCED:
@@ -312,7 +599,26 @@ async def on_ready():
             except Exception as e:
                 logger.error(f"❌ Failed to sync commands: {e}", exc_info=True)
 
+    # 📊 Prometheus endpoint (also read by the dashboard's bot status page)
+    if Config.METRICS_PORT > 0 and METRICS_SERVER is None:
+        try:
+            METRICS_SERVER = await metrics.start_server(
+                Config.METRICS_HOST,
+                Config.METRICS_PORT,
+                routes={"/debug/profile": profile_endpoint},
+            )
+            logger.info(
+                f"📊 Metrics on http://{Config.METRICS_HOST}:{Config.METRICS_PORT}/metrics"
+            )
+        except OSError as e:
+            logger.error(f"❌ Could not start metrics endpoint: {e}")
+
+    if Config.LOOP_MONITOR_INTERVAL > 0:
+        loop_monitor.start()
+
     # Start background tasks
+    action_pipeline.start()
+
     if not scrape_actions.is_running():
         scrape_actions.start()
         logger.info(
@@ -360,6 +666,24 @@ async def on_ready():
         cleanup_stale_data.start()
         logger.info("✓ Started: cleanup_stale_data (10min interval)")
 
+    if Config.RETENTION_PURGE_INTERVAL > 0 and not purge_old_data.is_running():
+        purge_old_data.start()
+        logger.info(
+            f"✓ Started: purge_old_data ({Config.RETENTION_PURGE_INTERVAL}s interval)"
+        )
+
+    if Config.DATABASE_BACKUP_INTERVAL > 0 and not backup_database.is_running():
+        backup_database.start()
+        logger.info(
+            f"✓ Started: backup_database ({Config.DATABASE_BACKUP_INTERVAL}s interval)"
+        )
+
+    if Config.WAL_CHECKPOINT_INTERVAL > 0 and not checkpoint_wal.is_running():
+        checkpoint_wal.start()
+        logger.info(
+            f"✓ Started: checkpoint_wal ({Config.WAL_CHECKPOINT_INTERVAL}s interval)"
+        )
+
     if not task_watchdog.is_running():
         task_watchdog.start()
         logger.info(
@@ -488,7 +812,7 @@ async def inspect_database_tables():
 
 @tasks.loop(minutes=10)
 async def cleanup_stale_data():
-    """Cleanup stale online player entries every 10 minutes"""
+    """Cleanup stale online entries, archive old actions, trim ingest metrics (10 min)"""
     if SHUTDOWN_REQUESTED:
         return
 
@@ -501,12 +825,18 @@ async def cleanup_stale_data():
             logger.info(
                 f"🧹 Cleaned up {removed} stale online entries (older than 5 min)"
             )
+
+        # 📦 Keep the live DB to ACTION_ARCHIVE_DAYS (small increments each run)
+        await db.archive_old_actions()
+
+        # 📈 One ingest_metrics row per poll - trimmed here even with the purge off
+        await db.trim_ingest_metrics()
         TASK_HEALTH["cleanup_stale_data"]["error_count"] = 0
     except Exception as e:
         TASK_HEALTH["cleanup_stale_data"]["error_count"] += 1
         logger.error(f"❌ Error in cleanup task: {e}", exc_info=True)
     finally:
-        TASK_HEALTH["cleanup_stale_data"]["is_running"] = False
+        finish_task("cleanup_stale_data")
 
 
 @cleanup_stale_data.before_loop
@@ -515,6 +845,103 @@ async def before_cleanup_stale_data():
     logger.info("✓ cleanup_stale_data task ready")
 
 
+@tasks.loop(seconds=max(Config.RETENTION_PURGE_INTERVAL, 3600))
+async def purge_old_data():
+    """Apply retention in throttled chunks (see Database.purge_old_data)"""
+    if SHUTDOWN_REQUESTED:
+        return
+
+    TASK_HEALTH["purge_old_data"]["last_run"] = datetime.now()
+    TASK_HEALTH["purge_old_data"]["is_running"] = True
+
+    try:
+        results = await db.purge_old_data()
+        if any(results.values()):
+            summary = ", ".join(f"{k}: {v:,}" for k, v in results.items())
+            logger.info(f"🧹 Retention purge done - {summary}")
+        TASK_HEALTH["purge_old_data"]["error_count"] = 0
+    except Exception as e:
+        TASK_HEALTH["purge_old_data"]["error_count"] += 1
+        logger.error(f"❌ Error in retention purge: {e}", exc_info=True)
+    finally:
+        finish_task("purge_old_data")
+
+
+@purge_old_data.before_loop
+async def before_purge_old_data():
+    await bot.wait_until_ready()
+    logger.info("✓ purge_old_data task ready")
+
+
+@tasks.loop(seconds=max(Config.DATABASE_BACKUP_INTERVAL, 3600))
+async def backup_database():
+    """Rotating online backup into DATABASE_BACKUP_PATH (see db_backup.py)"""
+    if SHUTDOWN_REQUESTED:
+        return
+
+    TASK_HEALTH["backup_database"]["last_run"] = datetime.now()
+    TASK_HEALTH["backup_database"]["is_running"] = True
+
+    try:
+        await asyncio.to_thread(
+            db_backup.backup_all,
+            db.db_path,
+            Config.DATABASE_BACKUP_PATH,
+            keep=Config.DATABASE_BACKUP_KEEP,
+            progress=lambda done, total: logger.debug(
+                f"💾 Backup {done * 100 // total}% ({done:,}/{total:,} pages)"
+            ),
+        )
+        TASK_HEALTH["backup_database"]["error_count"] = 0
+    except Exception as e:
+        TASK_HEALTH["backup_database"]["error_count"] += 1
+        logger.error(f"❌ Scheduled backup failed: {e}", exc_info=True)
+    finally:
+        finish_task("backup_database")
+
+
+@backup_database.before_loop
+async def before_backup_database():
+    await bot.wait_until_ready()
+    logger.info("✓ backup_database task ready")
+
+
+# Last checkpoint result per database file
+LAST_CHECKPOINTS = {}
+
+
+@tasks.loop(seconds=max(Config.WAL_CHECKPOINT_INTERVAL, 10))
+async def checkpoint_wal():
+    """PASSIVE checkpoint, TRUNCATE when quiet or oversized (see wal_checkpoint.py)"""
+    if SHUTDOWN_REQUESTED:
+        return
+
+    TASK_HEALTH["checkpoint_wal"]["last_run"] = datetime.now()
+    TASK_HEALTH["checkpoint_wal"]["is_running"] = True
+
+    try:
+        # One WAL per file when the database is split into domains
+        for path in db_domains.database_files(db.db_path):
+            LAST_CHECKPOINTS[path] = await asyncio.to_thread(
+                wal_checkpoint.run_checkpoint,
+                path,
+                LAST_CHECKPOINTS.get(path),
+                Config.WAL_TRUNCATE_SIZE_MB * 1024 * 1024,
+            )
+        TASK_HEALTH["checkpoint_wal"]["error_count"] = 0
+    except Exception as e:
+        TASK_HEALTH["checkpoint_wal"]["error_count"] += 1
+        logger.error(f"❌ WAL checkpoint failed: {e}", exc_info=True)
+    finally:
+        finish_task("checkpoint_wal")
+
+
+@checkpoint_wal.before_loop
+async def before_checkpoint_wal():
+    await bot.wait_until_ready()
+    logger.info("✓ checkpoint_wal task ready")
+
+
 @cleanup_stale_data.error
 async def cleanup_stale_data_error(_loop, error):
     logger.error(f"❌ cleanup_stale_data task error: {error}", exc_info=error)
@@ -537,10 +964,9 @@ async def task_watchdog():
         # Check scrape_actions
         if TASK_HEALTH["scrape_actions"]["last_run"]:
             elapsed = (now - TASK_HEALTH["scrape_actions"]["last_run"]).total_seconds()
-            max_delay = (
-                Config.SCRAPE_ACTIONS_INTERVAL
-                * Config.TASK_HEALTH_CHECK_MULTIPLIER.get("scrape_actions", 4)
-            )
+            max_delay = max(
+                Config.SCRAPE_ACTIONS_INTERVAL, scrape_actions.seconds
+            ) * Config.TASK_HEALTH_CHECK_MULTIPLIER.get("scrape_actions", 4)
             if elapsed > max_delay:
                 if not TASK_HEALTH["scrape_actions"]["is_running"]:
                     issues.append(f"scrape_actions hasn't run in {elapsed:.0f}s")
@@ -629,6 +1055,13 @@ async def task_watchdog():
 
         if issues:
             logger.warning(f"⚠️ Task health issues detected: {', '.join(issues)}")
+            # Stale tasks are often a blocked loop rather than crashed tasks
+            if loop_monitor.blocks:
+                block = loop_monitor.recent_blocks(1)[0]
+                logger.warning(
+                    f"🐢 Last loop block: {block['blocked_s']}s in {block['where']} "
+                    f"at {block['at']} ({loop_monitor.blocked_count} total)"
+                )
         else:
             logger.debug("✅ All background tasks healthy")
 
@@ -638,7 +1071,7 @@ async def task_watchdog():
         TASK_HEALTH["task_watchdog"]["error_count"] += 1
         logger.error(f"❌ Error in task_watchdog: {e}", exc_info=True)
     finally:
-        TASK_HEALTH["task_watchdog"]["is_running"] = False
+        finish_task("task_watchdog")
 
 
 @task_watchdog.before_loop
@@ -665,90 +1098,18 @@ async def scrape_actions():
     try:
         scraper_instance = await get_or_recreate_scraper()
         logger.info("🔍 Fetching latest actions...")
-        actions = await scraper_instance.get_latest_actions(
-            limit=Config.ACTIONS_FETCH_LIMIT
-        )
+        fetched_at = time.monotonic()
+        html = await scraper_instance.fetch_latest_actions_page()
 
-        if not actions:
+        if not html:
             logger.warning("⚠️ No actions retrieved this cycle")
             TASK_HEALTH["scrape_actions"]["error_count"] += 1
             return
 
-        new_count = 0
-        new_player_ids = set()
-
-        for action in actions:
-            action_dict = {
-                "player_id": action.player_id,
-                "player_name": action.player_name,
-                "action_type": action.action_type,
-                "action_detail": action.action_detail,
-                "item_name": action.item_name,
-                "item_quantity": action.item_quantity,
-                "target_player_id": action.target_player_id,
-                "target_player_name": action.target_player_name,
-                "admin_id": action.admin_id,
-                "admin_name": action.admin_name,
-                "warning_count": action.warning_count,
-                "reason": action.reason,
-                "timestamp": action.timestamp,
-                "raw_text": action.raw_text,
-            }
-
-            if not await db.action_exists(action.timestamp, action.raw_text):
-                await db.save_action(action_dict)
-                new_count += 1
-
-                # 🔥 Server kick (faction_kicked) = kicked from FiveM server by admin
-                # This should trigger a logout for the affected player
-                if action.action_type == "faction_kicked" and action.player_id:
-                    await db.save_logout(
-                        action.player_id, action.timestamp or datetime.now()
-                    )
-                    logger.info(
-                        f"🚫 Server kick detected: {action.player_name}({action.player_id}) - triggering logout"
-                    )
-
-                # 🔥 NEW: Ban detection - auto-add to banned_players table when ban action detected
-                if action.action_type == "ban_received" and action.player_id:
-                    ban_data = {
-                        "player_id": action.player_id,
-                        "player_name": action.player_name
-                        or f"Player_{action.player_id}",
-                        "admin": action.admin_name,
-                        "reason": action.reason,
-                        "duration": None,  # Duration not always in action detail
-                        "ban_date": (action.timestamp or datetime.now()).strftime(
-                            "%Y-%m-%d %H:%M:%S"
-                        ),
-                        "expiry_date": None,
-                    }
-                    await db.save_banned_player(ban_data)
-                    logger.info(
-                        f"🔨 Ban detected from action: {action.player_name}({action.player_id}) by {action.admin_name}"
-                    )
-
-                if action.player_id:
-                    player_name = action.player_name or f"Player_{action.player_id}"
-                    new_player_ids.add((action.player_id, player_name))
-                    await db.mark_player_for_update(action.player_id, player_name)
-
-                if action.target_player_id:
-                    target_name = (
-                        action.target_player_name or f"Player_{action.target_player_id}"
-                    )
-                    new_player_ids.add((action.target_player_id, target_name))
-                    await db.mark_player_for_update(
-                        action.target_player_id, target_name
-                    )
-
-        if new_count > 0:
-            logger.info(
-                f"✅ Saved {new_count} new actions, marked {len(new_player_ids)} players for update"
-            )
-            TASK_HEALTH["scrape_actions"]["error_count"] = 0
-        else:
-            logger.info(f"ℹ️ No new actions (checked {len(actions)} entries)")
+        # 🏭 Parse, dedup, save and side effects run in the pipeline stages,
+        # so a slow write no longer delays the next poll
+        await action_pipeline.submit(html, fetched_at)
+        TASK_HEALTH["scrape_actions"]["error_count"] = 0
 
     except Exception as e:
         TASK_HEALTH["scrape_actions"]["error_count"] += 1
@@ -769,7 +1130,7 @@ async def scrape_actions():
             TASK_HEALTH["scrape_actions"]["error_count"] = 0
 
     finally:
-        TASK_HEALTH["scrape_actions"]["is_running"] = False
+        finish_task("scrape_actions")
 
 
 @scrape_actions.before_loop
@@ -786,7 +1147,7 @@ async def scrape_actions_error(_loop, error):
 
 @tasks.loop(seconds=Config.VIP_SCAN_INTERVAL)
 async def scrape_vip_actions():
-    """Scrape actions for VIP players"""
+    """Report VIP player actions from the shared action feed"""
     if SHUTDOWN_REQUESTED:
         return
 
@@ -797,86 +1158,29 @@ async def scrape_vip_actions():
     TASK_HEALTH["scrape_vip_actions"]["is_running"] = True
 
     try:
-        scraper_instance = await get_or_recreate_scraper()
-        vip_ids = set(Config.VIP_PLAYER_IDS)
-        vip_actions = await scraper_instance.get_vip_actions(
-            vip_ids, limit=Config.ACTIONS_FETCH_LIMIT
-        )
+        # Saved by the action pipeline already (kick logout, ban detection and
+        # profile marking included) - this only reports the VIP matches
+        vip_actions = vip_feed.drain()
 
         if vip_actions:
-            new_count = 0
-            new_player_ids = set()
-
+            vip_player_ids = set()
             for action in vip_actions:
-                action_dict = {
-                    "player_id": action.player_id,
-                    "player_name": action.player_name,
-                    "action_type": action.action_type,
-                    "action_detail": action.action_detail,
-                    "item_name": action.item_name,
-                    "item_quantity": action.item_quantity,
-                    "target_player_id": action.target_player_id,
-                    "target_player_name": action.target_player_name,
-                    "admin_id": action.admin_id,
-                    "admin_name": action.admin_name,
-                    "warning_count": action.warning_count,
-                    "reason": action.reason,
-                    "timestamp": action.timestamp,
-                    "raw_text": action.raw_text,
-                }
-
-                if not await db.action_exists(action.timestamp, action.raw_text):
-                    await db.save_action(action_dict)
-                    new_count += 1
-
-                    # 🔥 Server kick detection for VIP players
-                    if action.action_type == "faction_kicked" and action.player_id:
-                        await db.save_logout(
-                            action.player_id, action.timestamp or datetime.now()
-                        )
-                        logger.info(
-                            f"🚫 VIP Server kick: {action.player_name}({action.player_id}) - triggering logout"
-                        )
-
-                    # 🔥 NEW: Ban detection for VIP players
-                    if action.action_type == "ban_received" and action.player_id:
-                        ban_data = {
-                            "player_id": action.player_id,
-                            "player_name": action.player_name
-                            or f"Player_{action.player_id}",
-                            "admin": action.admin_name,
-                            "reason": action.reason,
-                            "duration": None,
-                            "ban_date": (action.timestamp or datetime.now()).strftime(
-                                "%Y-%m-%d %H:%M:%S"
-                            ),
-                            "expiry_date": None,
-                        }
-                        await db.save_banned_player(ban_data)
-                        logger.info(
-                            f"🔨 VIP Ban detected: {action.player_name}({action.player_id}) by {action.admin_name}"
-                        )
-
-                    if action.player_id:
-                        player_name = action.player_name or f"Player_{action.player_id}"
-                        new_player_ids.add((action.player_id, player_name))
-                        await db.mark_player_for_update(action.player_id, player_name)
-
-                    if action.target_player_id:
-                        target_name = (
-                            action.target_player_name
-                            or f"Player_{action.target_player_id}"
-                        )
-                        new_player_ids.add((action.target_player_id, target_name))
-                        await db.mark_player_for_update(
-                            action.target_player_id, target_name
-                        )
+                if action.action_type == "faction_kicked" and action.player_id:
+                    logger.info(
+                        f"🚫 VIP Server kick: {action.player_name}({action.player_id}) - triggering logout"
+                    )
+                if action.action_type == "ban_received" and action.player_id:
+                    logger.info(
+                        f"🔨 VIP Ban detected: {action.player_name}({action.player_id}) by {action.admin_name}"
+                    )
+                for player_id in (action.player_id, action.target_player_id):
+                    if player_id:
+                        vip_player_ids.add(player_id)
 
-            if new_count > 0:
-                logger.info(
-                    f"💎 VIP Scan: {new_count} new VIP actions saved, {len(new_player_ids)} players marked for update"
-                )
-                TASK_HEALTH["scrape_vip_actions"]["error_count"] = 0
+            logger.info(
+                f"💎 VIP Scan: {len(vip_actions)} new VIP actions saved, {len(vip_player_ids)} players involved"
+            )
+        TASK_HEALTH["scrape_vip_actions"]["error_count"] = 0
 
     except Exception as e:
         TASK_HEALTH["scrape_vip_actions"]["error_count"] += 1
@@ -886,7 +1190,7 @@ async def scrape_vip_actions():
         )
 
     finally:
-        TASK_HEALTH["scrape_vip_actions"]["is_running"] = False
+        finish_task("scrape_vip_actions")
 
 
 @scrape_vip_actions.before_loop
@@ -903,7 +1207,7 @@ async def scrape_vip_actions_error(_loop, error):
 
 @tasks.loop(seconds=Config.ONLINE_PLAYERS_SCAN_INTERVAL)
 async def scrape_online_priority_actions():
-    """Scrape actions for currently online players"""
+    """Report online players' actions from the shared action feed"""
     if SHUTDOWN_REQUESTED:
         return
 
@@ -914,62 +1218,17 @@ async def scrape_online_priority_actions():
     TASK_HEALTH["scrape_online_priority_actions"]["is_running"] = True
 
     try:
+        # The feed filter reads this set; the actions themselves are saved by the pipeline
         online_players = await db.get_current_online_players()
-        if not online_players:
-            return
-
-        online_ids = set(player["player_id"] for player in online_players)
-        scraper_instance = await get_or_recreate_scraper()
-        online_actions = await scraper_instance.get_online_player_actions(
-            online_ids, limit=Config.ACTIONS_FETCH_LIMIT
-        )
+        ONLINE_PRIORITY_IDS.clear()
+        ONLINE_PRIORITY_IDS.update(player["player_id"] for player in online_players)
 
+        online_actions = online_priority_feed.drain()
         if online_actions:
-            new_count = 0
-            new_player_ids = set()
-
-            for action in online_actions:
-                action_dict = {
-                    "player_id": action.player_id,
-                    "player_name": action.player_name,
-                    "action_type": action.action_type,
-                    "action_detail": action.action_detail,
-                    "item_name": action.item_name,
-                    "item_quantity": action.item_quantity,
-                    "target_player_id": action.target_player_id,
-                    "target_player_name": action.target_player_name,
-                    "admin_id": action.admin_id,
-                    "admin_name": action.admin_name,
-                    "warning_count": action.warning_count,
-                    "reason": action.reason,
-                    "timestamp": action.timestamp,
-                    "raw_text": action.raw_text,
-                }
-
-                if not await db.action_exists(action.timestamp, action.raw_text):
-                    await db.save_action(action_dict)
-                    new_count += 1
-
-                    if action.player_id:
-                        player_name = action.player_name or f"Player_{action.player_id}"
-                        new_player_ids.add((action.player_id, player_name))
-                        await db.mark_player_for_update(action.player_id, player_name)
-
-                    if action.target_player_id:
-                        target_name = (
-                            action.target_player_name
-                            or f"Player_{action.target_player_id}"
-                        )
-                        new_player_ids.add((action.target_player_id, target_name))
-                        await db.mark_player_for_update(
-                            action.target_player_id, target_name
-                        )
-
-            if new_count > 0:
-                logger.info(
-                    f"🟢 Online Priority: {new_count} new actions saved for {len(online_ids)} online players"
-                )
-                TASK_HEALTH["scrape_online_priority_actions"]["error_count"] = 0
+            logger.info(
+                f"🟢 Online Priority: {len(online_actions)} new actions saved for {len(ONLINE_PRIORITY_IDS)} online players"
+            )
+        TASK_HEALTH["scrape_online_priority_actions"]["error_count"] = 0
 
     except Exception as e:
         TASK_HEALTH["scrape_online_priority_actions"]["error_count"] += 1
@@ -979,7 +1238,7 @@ async def scrape_online_priority_actions():
         )
 
     finally:
-        TASK_HEALTH["scrape_online_priority_actions"]["is_running"] = False
+        finish_task("scrape_online_priority_actions")
 
 
 @scrape_online_priority_actions.before_loop
@@ -1010,40 +1269,39 @@ async def scrape_online_players():
         online_players = await scraper_instance.get_online_players()
         current_time = datetime.now()
 
-        previous_online = await db.get_current_online_players()
-        previous_ids = {p["player_id"] for p in previous_online}
-        current_ids = {p["player_id"] for p in online_players}
+        # 🔥 Apply only joins/leaves/renames to online_players in one transaction
+        diff = await db.reconcile_online_players(online_players)
+        new_logins = diff["joined"]
+        logouts = diff["left"]
 
-        new_logins = current_ids - previous_ids
-
-        for player in online_players:
-            if player["player_id"] in new_logins:
-                await db.save_login(
-                    player["player_id"], player["player_name"], current_time
-                )
-                await db.mark_player_for_update(
-                    player["player_id"], player["player_name"]
-                )
-                logger.info(
-                    f"🟢 Login detected: {player['player_name']} ({player['player_id']})"
-                )
+        # 🔥 Login/logout transitions are decided in memory by the presence
+        # tracker and persisted below in a single batched transaction
+        await db.mark_players_for_update(
+            ((p["player_id"], p["player_name"]) for p in new_logins), reason="login"
+        )
+        for player in new_logins:
+            presence.record_login(
+                player["player_id"], player["player_name"], current_time
+            )
+            logger.info(
+                f"🟢 Login detected: {player['player_name']} ({player['player_id']})"
+            )
 
-        logouts = previous_ids - current_ids
-        for player_id in logouts:
-            await db.save_logout(player_id, current_time)
-            await db.remove_from_online_players(
-                player_id
-            )  # 🔥 Remove from online_players table immediately
-            logger.info(f"🔴 Logout detected: Player {player_id}")
+        for player in logouts:
+            presence.record_logout(player["player_id"], current_time)
+            logger.info(f"🔴 Logout detected: Player {player['player_id']}")
 
-        await db.update_online_players(online_players)
+        await presence.flush(db)
 
-        for player in online_players:
-            await db.mark_player_for_update(player["player_id"], player["player_name"])
+        # 🔥 Coalesced: each online player produces at most one write per window
+        await db.mark_players_for_update(
+            ((player["player_id"], player["player_name"]) for player in online_players),
+            reason="online",
+        )
 
-        if new_logins or logouts:
+        if new_logins or logouts or diff["renamed"]:
             logger.info(
-                f"👥 Online: {len(online_players)} | New: {len(new_logins)} | Left: {len(logouts)}"
+                f"👥 Online: {len(online_players)} | New: {len(new_logins)} | Left: {len(logouts)} | Renamed: {len(diff['renamed'])}"
             )
         else:
             logger.info(f"👥 Online players: {len(online_players)}")
@@ -1055,7 +1313,7 @@ async def scrape_online_players():
         logger.error(f"✗ Error scraping online players: {e}", exc_info=True)
 
     finally:
-        TASK_HEALTH["scrape_online_players"]["is_running"] = False
+        finish_task("scrape_online_players")
 
 
 @scrape_online_players.before_loop
@@ -1072,7 +1330,7 @@ async def scrape_online_players_error(_loop, error):
 
 @tasks.loop(seconds=Config.UPDATE_PROFILES_INTERVAL)
 async def update_pending_profiles():
-    """Update profiles of players marked for priority update"""
+    """Refresh the most valuable due profiles within the per-cycle HTTP budget"""
     if SHUTDOWN_REQUESTED:
         return
 
@@ -1081,33 +1339,46 @@ async def update_pending_profiles():
 
     try:
         scraper_instance = await get_or_recreate_scraper()
-        pending_ids = await db.get_players_pending_update(
-            limit=Config.PROFILES_UPDATE_BATCH
-        )
+        # 🔥 Scored scheduler: due profiles ranked by refresh value
+        pending_ids = await db.get_due_profile_refreshes(Config.PROFILE_REFRESH_BUDGET)
 
         if not pending_ids:
             return
 
-        logger.info(f"🔄 Updating {len(pending_ids)} pending profiles...")
+        logger.info(f"🔄 Updating {len(pending_ids)} due profiles...")
         results = await scraper_instance.batch_get_profiles(pending_ids)
 
-        for profile in results:
-            profile_dict = {
-                "player_id": profile.player_id,
-                "player_name": profile.username,
-                "is_online": profile.is_online,
-                "last_connection": profile.last_seen,
-                "faction": profile.faction,
-                "faction_rank": profile.faction_rank,
-                "job": profile.job,
-                "warns": profile.warnings,
-                "played_hours": profile.played_hours,
-                "age_ic": profile.age_ic,
-            }
-            await db.save_player_profile(profile_dict)
-            await db.reset_player_priority(profile.player_id)
-
-        logger.info(f"✓ Updated {len(results)}/{len(pending_ids)} profiles")
+        # 🔥 One read + one transaction for the whole batch
+        changed = await db.save_player_profiles_bulk(
+            [
+                {
+                    "player_id": profile.player_id,
+                    "player_name": profile.username,
+                    "is_online": profile.is_online,
+                    "last_connection": profile.last_seen,
+                    "faction": profile.faction,
+                    "faction_rank": profile.faction_rank,
+                    "job": profile.job,
+                    "warns": profile.warnings,
+                    "played_hours": profile.played_hours,
+                    "age_ic": profile.age_ic,
+                }
+                for profile in results
+            ]
+        )
+
+        # Profiles that came back empty (404/errors) retry later instead of
+        # occupying the budget every cycle
+        fetched_ids = {profile.player_id for profile in results}
+        await db.defer_profile_refreshes(
+            [pid for pid in pending_ids if pid not in fetched_ids]
+        )
+
+        change_ratio = changed / len(results) * 100 if results else 0
+        logger.info(
+            f"✓ Updated {len(results)}/{len(pending_ids)} profiles "
+            f"({changed} changed, {change_ratio:.1f}% change ratio)"
+        )
         TASK_HEALTH["update_pending_profiles"]["error_count"] = 0
 
     except Exception as e:
@@ -1115,7 +1386,7 @@ async def update_pending_profiles():
         logger.error(f"✗ Error updating profiles: {e}", exc_info=True)
 
     finally:
-        TASK_HEALTH["update_pending_profiles"]["is_running"] = False
+        finish_task("update_pending_profiles")
 
 
 @update_pending_profiles.before_loop
@@ -1156,14 +1427,16 @@ async def update_missing_faction_ranks():
                 )
                 return [row[0] for row in cursor.fetchall()]
 
-        player_ids = await asyncio.to_thread(_get_missing_ranks)
+        player_ids = await db.run_read(_get_missing_ranks)
 
         if player_ids:
             logger.info(
                 f"🎯 Targeting {len(player_ids)} players with missing faction ranks"
             )
-            for player_id in player_ids:
-                await db.mark_player_for_update(player_id, f"Player_{player_id}")
+            await db.mark_players_for_update(
+                ((player_id, f"Player_{player_id}") for player_id in player_ids),
+                reason="missing_rank",
+            )
 
         TASK_HEALTH["update_missing_faction_ranks"]["error_count"] = 0
 
@@ -1172,7 +1445,7 @@ async def update_missing_faction_ranks():
         logger.error(f"Error in update_missing_faction_ranks: {e}", exc_info=True)
 
     finally:
-        TASK_HEALTH["update_missing_faction_ranks"]["is_running"] = False
+        finish_task("update_missing_faction_ranks")
 
 
 @update_missing_faction_ranks.before_loop
@@ -1214,7 +1487,7 @@ async def check_banned_players():
         logger.error(f"✗ Error checking banned players: {e}", exc_info=True)
 
     finally:
-        TASK_HEALTH["check_banned_players"]["is_running"] = False
+        finish_task("check_banned_players")
 
 
 @check_banned_players.before_loop
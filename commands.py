@@ -10,6 +10,7 @@ import re
 from typing import Optional, List, Dict
 from collections import defaultdict
 from config import Config
+import epoch
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +22,7 @@ SCAN_STATE = {
     "end_id": 0,
     "current_id": 0,
     "found_count": 0,
+    "changed_count": 0,
     "error_count": 0,
     "start_time": None,
     "scan_task": None,
@@ -1859,6 +1861,9 @@ def build_status_embed():
         name="❌ Errors", value=f"{SCAN_STATE['error_count']:,}", inline=True
     )
     embed.add_field(name="⏲️ Elapsed", value=elapsed_str, inline=True)
+    embed.add_field(
+        name="📝 Changed", value=f"{SCAN_STATE['changed_count']:,}", inline=True
+    )
 
     # Worker stats
     config = SCAN_STATE["scan_config"]
@@ -1914,13 +1919,25 @@ def is_admin(user_id: int) -> bool:
     return user_id in Config.ADMIN_USER_IDS
 
 
-def setup_commands(bot, db, scraper_getter):
+def setup_commands(
+    bot,
+    db,
+    scraper_getter,
+    task_health,
+    action_pipeline,
+    action_poller,
+    loop_monitor,
+):
     """Setup all slash commands for the bot
 
     Args:
         bot: Discord bot instance
         db: Database instance
         scraper_getter: Async function that returns scraper instance (accepts max_concurrent param)
+        task_health: The bot's TASK_HEALTH dict (per-task last run / errors)
+        action_pipeline: The running action_pipeline.ActionPipeline
+        action_poller: The adaptive_poll.AdaptivePoller feeding scrape_actions
+        loop_monitor: The started loop_monitor.LoopMonitor
     """
 
     # ========================================================================
@@ -1934,9 +1951,7 @@ def setup_commands(bot, db, scraper_getter):
         await interaction.response.defer()
 
         try:
-            from bot import TASK_HEALTH
             import psutil
-            import tracemalloc
 
             embed = discord.Embed(
                 title="🏋️ Bot Health Status",
@@ -1946,7 +1961,7 @@ def setup_commands(bot, db, scraper_getter):
 
             # Background Tasks
             task_status = []
-            for task_name, health in TASK_HEALTH.items():
+            for task_name, health in task_health.items():
                 last_run = health.get("last_run")
                 error_count = health.get("error_count", 0)
 
@@ -1975,10 +1990,75 @@ def setup_commands(bot, db, scraper_getter):
             )
 
             # Memory Usage
-            current, peak = tracemalloc.get_traced_memory()
-            mem_mb = current / 1024 / 1024
+            mem_mb = psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
             embed.add_field(
-                name="Memory Usage", value=f"Current: {mem_mb:.1f} MB", inline=True
+                name="Memory Usage", value=f"RSS: {mem_mb:.1f} MB", inline=True
+            )
+
+            # Action ingestion pipeline
+            pipeline = action_pipeline.stats()
+            stage_lines = [
+                f"{stage}: {entry['items']:,} • avg {entry['avg_ms']}ms • "
+                f"max {entry['max_ms']}ms • {entry['busy_pct']}% busy"
+                + (f" • ⚠️ {entry['errors']} errors" if entry["errors"] else "")
+                for stage, entry in pipeline["stages"].items()
+            ]
+            queues = " | ".join(
+                f"{name}: {depth}" for name, depth in pipeline["queues"].items()
+            )
+            latency = (
+                f"avg {pipeline['latency_avg_s']}s, max {pipeline['latency_max_s']}s"
+                if pipeline["saved"]
+                else "n/a"
+            )
+            poll = action_poller.stats()
+            rate = (
+                f"{poll['rate_per_min']}/min" if poll["rate_per_min"] is not None else "n/a"
+            )
+            embed.add_field(
+                name=f"Action Pipeline {'🟢' if pipeline['running'] else '🔴'}",
+                value="\n".join(stage_lines)
+                + f"\nQueues: {queues}\nFetch → saved: {latency}"
+                + f"\nPoll: every {poll['interval']}s"
+                + (" (adaptive)" if poll["enabled"] else "")
+                + f" • {rate} • overlap {poll['last_overlap']}/{poll['window']}"
+                + f" • possible gaps: {poll['possible_gaps']}",
+                inline=False,
+            )
+
+            # Event loop responsiveness
+            if loop_monitor.samples:
+                loop = loop_monitor.stats()
+                loop_lines = [
+                    f"Lag: last {loop['lag_last_ms']}ms • p50 {loop['lag_p50_ms']}ms • "
+                    f"p99 {loop['lag_p99_ms']}ms • max {loop['lag_max_ms']}ms",
+                    f"Blocked: {loop['blocked_count']}× "
+                    f"({loop['blocked_seconds']}s over {loop['block_threshold_ms']}ms)",
+                ]
+                if loop["last_block"]:
+                    block = loop["last_block"]
+                    loop_lines.append(
+                        f"Last: {block['blocked_s']}s in `{block['where']}` at {block['at']}"
+                    )
+                embed.add_field(
+                    name=f"Event Loop {'🟢' if loop['lag_p99_ms'] < 250 else '🟡'}",
+                    value="\n".join(loop_lines),
+                    inline=False,
+                )
+
+            # Profile refresh scheduler
+            queue = await db.get_refresh_queue_stats()
+            ages = " | ".join(
+                f"{label}: {count:,}"
+                for label, count in queue["age_distribution"].items()
+                if count
+            )
+            embed.add_field(
+                name="Profile Refresh Queue",
+                value=f"Due: {queue['queue_depth']:,} (budget {queue['budget']}/cycle)\n"
+                f"Scheduled: {queue['scheduled']:,}\n"
+                f"Profile age: {ages or 'n/a'}",
+                inline=False,
             )
 
             # Database Status
@@ -2095,13 +2175,10 @@ def setup_commands(bot, db, scraper_getter):
     async def memory_stats(interaction: discord.Interaction):
         """Display memory usage statistics"""
         try:
-            import tracemalloc
+            import gc
             import psutil
             import os
 
-            # Memory tracing
-            current, peak = tracemalloc.get_traced_memory()
-
             # System memory
             process = psutil.Process(os.getpid())
             mem_info = process.memory_info()
@@ -2114,8 +2191,9 @@ def setup_commands(bot, db, scraper_getter):
             )
 
             embed.add_field(
-                name="🔍 Traced Memory",
-                value=f"Current: {current / 1024**2:.2f} MB\nPeak: {peak / 1024**2:.2f} MB",
+                name="🐍 Garbage Collector",
+                value=f"Pending: {'/'.join(str(count) for count in gc.get_count())}\n"
+                f"Collections: {'/'.join(str(gen['collections']) for gen in gc.get_stats())}",
                 inline=True,
             )
 
@@ -2131,6 +2209,8 @@ def setup_commands(bot, db, scraper_getter):
                 inline=True,
             )
 
+            embed.set_footer(text="Allocation sites: /memprofile (admin)")
+
             await interaction.response.send_message(embed=embed)
 
         except Exception as e:
@@ -2138,6 +2218,79 @@ def setup_commands(bot, db, scraper_getter):
                 f"❌ Error getting memory stats: {e}", ephemeral=True
             )
 
+    @bot.tree.command(
+        name="memprofile",
+        description="🧠 Trace allocations for N seconds and show what grew (Admin only)",
+    )
+    @app_commands.describe(
+        seconds="Window between the two snapshots (default: 60, max: 600)",
+        limit="Growth sites to show (default: 10, max: 20)",
+        frames="Stack frames per allocation, >1 groups by traceback (default: 1)",
+    )
+    @app_commands.checks.cooldown(1, 60)
+    async def memprofile_command(
+        interaction: discord.Interaction,
+        seconds: int = 60,
+        limit: int = 10,
+        frames: int = 1,
+    ):
+        """Start tracemalloc, diff two snapshots N seconds apart, stop tracing"""
+        if not is_admin(interaction.user.id):
+            await interaction.response.send_message(
+                "❌ **Access Denied**\n\nThis command is restricted to bot administrators.",
+                ephemeral=True,
+            )
+            return
+
+        await interaction.response.defer()
+
+        try:
+            import io
+            import memory_profiler
+
+            limit = max(1, min(limit, 20))
+            profile = await memory_profiler.profile(seconds, frames=frames)
+            logger.info(
+                f"🧠 Memory profile by {interaction.user}: {profile.seconds:g}s, "
+                f"{profile.total_growth / 1024:.1f} KiB growth"
+            )
+
+            embed = discord.Embed(
+                title="🧠 Memory Growth",
+                description=(
+                    f"**{profile.total_growth / 1024**2:.2f} MiB** allocated and still "
+                    f"held after {profile.seconds:g}s "
+                    f"(traced peak {profile.traced_peak / 1024**2:.1f} MiB, "
+                    f"tracemalloc overhead {profile.tracing_overhead / 1024**2:.1f} MiB)"
+                ),
+                color=discord.Color.teal(),
+                timestamp=datetime.now(),
+            )
+            rows = profile.top(limit)
+            embed.add_field(
+                name=f"Top growth by {'traceback' if frames > 1 else 'file:line'}",
+                value="\n".join(
+                    f"`{row['size_diff_kb']:>8} KiB` {row['count_diff']:+,} blocks • "
+                    f"`{row['location']}`"
+                    for row in rows
+                )[:1024]
+                or "No growth",
+                inline=False,
+            )
+            embed.set_footer(text="Tracing stopped • full report attached")
+
+            file = discord.File(
+                io.BytesIO(profile.report(50).encode("utf-8")),
+                filename=f"memory_profile_{profile.started_at.strftime('%Y%m%d_%H%M%S')}.txt",
+            )
+            await interaction.followup.send(embed=embed, file=file)
+
+        except RuntimeError as e:
+            await interaction.followup.send(f"⏳ {e}")
+        except Exception as e:
+            logger.error(f"Error in memprofile command: {e}", exc_info=True)
+            await interaction.followup.send(f"❌ **Error:** {str(e)}")
+
     @bot.tree.command(
         name="cleanup_old_data",
         description="Remove old data based on retention policy (Admin only)",
@@ -2214,19 +2367,28 @@ def setup_commands(bot, db, scraper_getter):
         await interaction.response.defer()
 
         try:
-            import shutil
-            from pathlib import Path
+            import db_backup
 
-            # Create backup
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_dir = Path("backups")
-            backup_dir.mkdir(exist_ok=True)
+            loop = asyncio.get_running_loop()
+            status = await interaction.followup.send("💾 Backing up database... 0%")
 
-            backup_path = backup_dir / f"pro4kings_backup_{timestamp}.db"
-            shutil.copy2(db.db_path, backup_path)
+            def _progress(done: int, total: int):
+                asyncio.run_coroutine_threadsafe(
+                    status.edit(
+                        content=f"💾 Backing up database... {done * 100 // total}% "
+                        f"({done:,}/{total:,} pages)"
+                    ),
+                    loop,
+                )
 
-            # Get file size
-            file_size = backup_path.stat().st_size / (1024 * 1024)  # MB
+            # Online backup via the SQLite backup API (consistent with the WAL)
+            results = await asyncio.to_thread(
+                db_backup.backup_all,
+                db.db_path,
+                Config.DATABASE_BACKUP_PATH,
+                keep=Config.DATABASE_BACKUP_KEEP,
+                progress=_progress,
+            )
 
             embed = discord.Embed(
                 title="✅ Database Backup Created",
@@ -2234,20 +2396,227 @@ def setup_commands(bot, db, scraper_getter):
                 timestamp=datetime.now(),
             )
 
-            embed.add_field(name="Backup File", value=backup_path.name, inline=False)
-            embed.add_field(name="Size", value=f"{file_size:.2f} MB", inline=True)
-            embed.add_field(name="Location", value=str(backup_dir), inline=True)
+            embed.add_field(
+                name="Backup File" if len(results) == 1 else "Backup Files",
+                value="\n".join(os.path.basename(r["path"]) for r in results),
+                inline=False,
+            )
+            backup_mb = sum(r["backup_bytes"] for r in results) / 1024 / 1024
+            db_mb = sum(r["db_bytes"] for r in results) / 1024 / 1024
+            embed.add_field(
+                name="Size",
+                value=f"{backup_mb:.2f} MB (database {db_mb:.2f} MB)",
+                inline=True,
+            )
+            embed.add_field(
+                name="Duration",
+                value=f"{sum(r['seconds'] for r in results):.1f}s",
+                inline=True,
+            )
+            embed.add_field(
+                name="Location", value=Config.DATABASE_BACKUP_PATH, inline=True
+            )
 
             # Count total backups
-            backup_count = len(list(backup_dir.glob("*.db")))
-            embed.set_footer(text=f"Total backups: {backup_count}")
+            backup_count = len(db_backup.list_backups(Config.DATABASE_BACKUP_PATH))
+            footer = f"Total backups: {backup_count}"
+            removed = sum(len(r["removed"]) for r in results)
+            if removed:
+                footer += f" • Rotated out {removed} old"
+            embed.set_footer(text=footer)
 
-            await interaction.followup.send(embed=embed)
+            await status.edit(content=None, embed=embed)
 
         except Exception as e:
             logger.error(f"Error in backup command: {e}", exc_info=True)
             await interaction.followup.send(f"❌ **Error:** {str(e)}")
 
+    @bot.tree.command(
+        name="dbstats", description="🐢 Slowest SQL statements and DB methods (Admin only)"
+    )
+    @app_commands.describe(
+        limit="Statements to show (default: 10, max: 20)",
+        sort="Order statements by (default: total time)",
+        reset="Clear the counters after showing them",
+    )
+    @app_commands.choices(
+        sort=[
+            app_commands.Choice(name="Total time", value="total_ms"),
+            app_commands.Choice(name="Max time", value="max_ms"),
+            app_commands.Choice(name="Average time", value="avg_ms"),
+            app_commands.Choice(name="Calls", value="calls"),
+        ]
+    )
+    @app_commands.checks.cooldown(1, 10)
+    async def dbstats_command(
+        interaction: discord.Interaction,
+        limit: int = 10,
+        sort: str = "total_ms",
+        reset: bool = False,
+    ):
+        """SQL timing by statement fingerprint plus executor time per DB method"""
+        if not is_admin(interaction.user.id):
+            await interaction.response.send_message(
+                "❌ **Access Denied**\n\nThis command is restricted to bot administrators.",
+                ephemeral=True,
+            )
+            return
+
+        await interaction.response.defer()
+
+        try:
+            import query_stats
+
+            limit = max(1, min(limit, 20))
+            stats = db.get_query_stats(limit, sort)
+            summary = stats["summary"]
+            executor = db.get_executor_stats()
+
+            embed = discord.Embed(
+                title="🐢 Database Timing",
+                description=(
+                    f"**{summary['calls']:,}** statements "
+                    f"({summary['statements']} distinct), "
+                    f"**{summary['total_ms'] / 1000:.1f}s** total since "
+                    f"<t:{int(summary['since'])}:R>\n"
+                    f"Slow log: "
+                    + (
+                        f"over {summary['slow_ms']:g}ms"
+                        if summary["slow_ms"]
+                        else "disabled"
+                    )
+                ),
+                color=discord.Color.orange(),
+                timestamp=datetime.now(),
+            )
+
+            for i, row in enumerate(stats["top"], 1):
+                sql = row["sql"] if len(row["sql"]) <= 180 else row["sql"][:177] + "..."
+                buckets = " ".join(
+                    f"{bound}:{count}"
+                    for bound, count in row["histogram"].items()
+                    if count
+                )
+                embed.add_field(
+                    name=(
+                        f"{i}. {row['calls']:,} calls • avg {row['avg_ms']}ms • "
+                        f"max {row['max_ms']}ms • total {row['total_ms'] / 1000:.1f}s"
+                    ),
+                    value=f"```sql\n{sql}\n```{buckets}",
+                    inline=False,
+                )
+
+            methods = list(executor["methods"].items())[:8]
+            if methods:
+                embed.add_field(
+                    name=(
+                        f"🧵 Methods (pending: {executor['pending_reads']} read, "
+                        f"{executor['pending_writes']} write)"
+                    ),
+                    value="\n".join(
+                        f"`{name}` {m['kind']} ×{m['calls']:,} • "
+                        f"run {m['run_avg_ms']}/{m['run_max_ms']}ms • "
+                        f"wait {m['wait_avg_ms']}/{m['wait_max_ms']}ms"
+                        for name, m in methods
+                    )[:1024],
+                    inline=False,
+                )
+
+            embed.set_footer(text="avg/max ms • histogram buckets: calls per latency")
+
+            if reset:
+                query_stats.STATS.reset()
+                embed.set_footer(text="Counters reset")
+
+            await interaction.followup.send(embed=embed)
+
+        except Exception as e:
+            logger.error(f"Error in dbstats command: {e}", exc_info=True)
+            await interaction.followup.send(f"❌ **Error:** {str(e)}")
+
+    @bot.tree.command(
+        name="profile", description="🔬 Sample where the bot spends CPU time (Admin only)"
+    )
+    @app_commands.describe(
+        seconds="How long to sample (default: 10, max: 60)",
+        include_idle="Keep samples of threads waiting for work (event loop select, idle pools)",
+    )
+    @app_commands.checks.cooldown(1, 60)
+    async def profile_command(
+        interaction: discord.Interaction,
+        seconds: int = 10,
+        include_idle: bool = False,
+    ):
+        """Stack-sample every thread for N seconds without restarting the bot"""
+        if not is_admin(interaction.user.id):
+            await interaction.response.send_message(
+                "❌ **Access Denied**\n\nThis command is restricted to bot administrators.",
+                ephemeral=True,
+            )
+            return
+
+        await interaction.response.defer()
+
+        try:
+            import io
+            import cpu_profiler
+
+            seconds = max(1, min(seconds, 60))
+            profile = await asyncio.to_thread(
+                cpu_profiler.sample, seconds, include_idle=include_idle
+            )
+            logger.info(
+                f"🔬 CPU profile by {interaction.user}: {profile.elapsed:.1f}s, "
+                f"{profile.samples} samples"
+            )
+
+            embed = discord.Embed(
+                title="🔬 CPU Profile",
+                description=(
+                    f"**{profile.samples:,}** samples over {profile.elapsed:.1f}s "
+                    f"({profile.ticks} ticks @ {profile.interval * 1000:g}ms, "
+                    f"{profile.idle_samples:,} idle dropped)\n"
+                    + " • ".join(
+                        f"`{name}` {count}"
+                        for name, count in profile.threads.most_common(6)
+                    )
+                ),
+                color=discord.Color.purple(),
+                timestamp=datetime.now(),
+            )
+            for sort, title in (("self", "🔥 Top self"), ("cumulative", "📚 Top cumulative")):
+                rows = profile.top(10, sort)
+                embed.add_field(
+                    name=title,
+                    value="\n".join(
+                        f"`{row['self_pct' if sort == 'self' else 'cumulative_pct']:>5}%` "
+                        f"{row['function']} ({row['location']})"
+                        for row in rows
+                    )[:1024]
+                    or "No samples",
+                    inline=False,
+                )
+            embed.set_footer(text=".collapsed → flamegraph.pl / speedscope.app")
+
+            stamp = profile.started_at.strftime("%Y%m%d_%H%M%S")
+            files = [
+                discord.File(
+                    io.BytesIO(profile.report(50).encode("utf-8")),
+                    filename=f"cpu_profile_{stamp}.txt",
+                ),
+                discord.File(
+                    io.BytesIO(profile.collapsed().encode("utf-8")),
+                    filename=f"cpu_profile_{stamp}.collapsed",
+                ),
+            ]
+            await interaction.followup.send(embed=embed, files=files)
+
+        except RuntimeError as e:
+            await interaction.followup.send(f"⏳ {e}")
+        except Exception as e:
+            logger.error(f"Error in profile command: {e}", exc_info=True)
+            await interaction.followup.send(f"❌ **Error:** {str(e)}")
+
     # ========================================================================
     # SCAN MANAGEMENT COMMANDS - WITH CONCURRENT WORKERS
     # ========================================================================
@@ -2287,6 +2656,7 @@ def setup_commands(bot, db, scraper_getter):
             SCAN_STATE["end_id"] = end_id
             SCAN_STATE["current_id"] = start_id
             SCAN_STATE["found_count"] = 0
+            SCAN_STATE["changed_count"] = 0
             SCAN_STATE["error_count"] = 0
             SCAN_STATE["total_scanned"] = 0
             SCAN_STATE["start_time"] = datetime.now()
@@ -2359,24 +2729,31 @@ def setup_commands(bot, db, scraper_getter):
                                 # Fetch profiles for this batch
                                 profiles = await scraper.batch_get_profiles(batch_ids)
 
-                                # Save profiles to database
-                                for profile in profiles:
-                                    if profile:
-                                        profile_dict = {
-                                            "player_id": profile.player_id,
-                                            "player_name": profile.username,
-                                            "is_online": profile.is_online,
-                                            "last_connection": profile.last_seen,
-                                            "faction": profile.faction,
-                                            "faction_rank": profile.faction_rank,
-                                            "job": profile.job,
-                                            "warns": profile.warnings,
-                                            "played_hours": profile.played_hours,
-                                            "age_ic": profile.age_ic,
-                                        }
-                                        await db.save_player_profile(profile_dict)
-                                        worker_found += 1
-                                        SCAN_STATE["found_count"] += 1
+                                # 🔥 Save the whole batch in one transaction
+                                profile_dicts = [
+                                    {
+                                        "player_id": profile.player_id,
+                                        "player_name": profile.username,
+                                        "is_online": profile.is_online,
+                                        "last_connection": profile.last_seen,
+                                        "faction": profile.faction,
+                                        "faction_rank": profile.faction_rank,
+                                        "job": profile.job,
+                                        "warns": profile.warnings,
+                                        "played_hours": profile.played_hours,
+                                        "age_ic": profile.age_ic,
+                                    }
+                                    for profile in profiles
+                                    if profile
+                                ]
+                                if profile_dicts:
+                                    SCAN_STATE[
+                                        "changed_count"
+                                    ] += await db.save_player_profiles_bulk(
+                                        profile_dicts
+                                    )
+                                worker_found += len(profile_dicts)
+                                SCAN_STATE["found_count"] += len(profile_dicts)
 
                                 worker_scanned += len(batch_ids)
                                 SCAN_STATE["total_scanned"] += len(batch_ids)
@@ -2432,9 +2809,17 @@ def setup_commands(bot, db, scraper_getter):
                     avg_speed = (
                         SCAN_STATE["total_scanned"] / elapsed if elapsed > 0 else 0
                     )
+                    change_ratio = (
+                        SCAN_STATE["changed_count"] / SCAN_STATE["found_count"] * 100
+                        if SCAN_STATE["found_count"] > 0
+                        else 0
+                    )
                     logger.info(
                         f"✅ Scan complete! Found {SCAN_STATE['found_count']:,} players in {format_time_duration(elapsed)} (avg: {avg_speed:.2f} IDs/s)"
                     )
+                    logger.info(
+                        f"📝 {SCAN_STATE['changed_count']:,} profiles changed ({change_ratio:.1f}% change ratio)"
+                    )
 
                 except Exception as e:
                     logger.error(f"❌ Scan error: {e}", exc_info=True)
@@ -3617,7 +4002,7 @@ def setup_commands(bot, db, scraper_getter):
                             )
                 return faction_map
 
-            faction_map = await asyncio.to_thread(_get_factions_sync)
+            faction_map = await db.run_read(_get_factions_sync)
 
             # 🆕 Create pagination view for handling 500+ players
             view = OnlinePaginationView(
@@ -3757,14 +4142,15 @@ def setup_commands(bot, db, scraper_getter):
             def check_is_online():
                 with db.get_connection() as conn:
                     cursor = conn.cursor()
-                    cutoff = datetime.now() - timedelta(minutes=2)
+                    # Same window as the dashboard (see database.ONLINE_REFRESH_BUCKET)
+                    cutoff = datetime.now() - timedelta(minutes=5)
                     cursor.execute(
                         "SELECT 1 FROM online_players WHERE player_id = ? AND detected_online_at > ?",
                         (player["player_id"], cutoff),
                     )
                     return cursor.fetchone() is not None
 
-            is_currently_online = await asyncio.to_thread(check_is_online)
+            is_currently_online = await db.run_read(check_is_online)
 
             # Build profile embed with ACCURATE online status
             status_icon = "🟢" if is_currently_online else "🔴"
@@ -3854,13 +4240,17 @@ def setup_commands(bot, db, scraper_getter):
                         """
                         SELECT COUNT(*) FROM actions
                         WHERE (player_id = ? OR target_player_id = ?)
-                        AND timestamp >= ?
+                        AND ts >= ?
                     """,
-                        (player["player_id"], player["player_id"], cutoff),
+                        (
+                            player["player_id"],
+                            player["player_id"],
+                            epoch.to_epoch(cutoff),
+                        ),
                     )
                     return cursor.fetchone()[0]
 
-            recent_count = await asyncio.to_thread(_count_recent_actions)
+            recent_count = await db.run_read(_count_recent_actions)
             embed.add_field(
                 name="📝 Actions (7d)", value=f"{recent_count:,}", inline=True
             )
@@ -4031,7 +4421,7 @@ def setup_commands(bot, db, scraper_getter):
                     )
                     return [dict(row) for row in cursor.fetchall()]
 
-            patterns = await asyncio.to_thread(_get_unknown_patterns)
+            patterns = await db.run_read(_get_unknown_patterns)
 
             if not patterns:
                 await interaction.followup.send(
@@ -4048,7 +4438,7 @@ def setup_commands(bot, db, scraper_getter):
                     )
                     return cursor.fetchone()[0]
 
-            total_unknown = await asyncio.to_thread(_get_total_unknown)
+            total_unknown = await db.run_read(_get_total_unknown)
 
             # If export requested, create a text file
             if export:
@@ -4135,7 +4525,7 @@ def setup_commands(bot, db, scraper_getter):
                     )
                     return [dict(row) for row in cursor.fetchall()]
 
-            stats = await asyncio.to_thread(_get_action_stats)
+            stats = await db.run_read(_get_action_stats)
 
             if not stats:
                 await interaction.followup.send("📊 **No actions in database yet.**")
@@ -4261,11 +4651,11 @@ def setup_commands(bot, db, scraper_getter):
                             """
                             SELECT * FROM actions
                             WHERE action_type = ?
-                            AND timestamp >= ?
-                            ORDER BY timestamp DESC
+                            AND ts >= ?
+                            ORDER BY ts DESC
                             LIMIT 500
                         """,
-                            (action_type, cutoff),
+                            (action_type, epoch.to_epoch(cutoff)),
                         )
                     else:
                         # All admin action types
@@ -4274,16 +4664,16 @@ def setup_commands(bot, db, scraper_getter):
                             f"""
                             SELECT * FROM actions
                             WHERE action_type IN ({type_placeholders})
-                            AND timestamp >= ?
-                            ORDER BY timestamp DESC
+                            AND ts >= ?
+                            ORDER BY ts DESC
                             LIMIT 500
                         """,
-                            (*admin_action_types, cutoff),
+                            (*admin_action_types, epoch.to_epoch(cutoff)),
                         )
 
                     return [dict(row) for row in cursor.fetchall()]
 
-            admin_actions = await asyncio.to_thread(_get_all_admin_actions)
+            admin_actions = await db.run_read(_get_all_admin_actions)
 
             if not admin_actions:
                 filter_text = (
@@ -4380,8 +4770,8 @@ def setup_commands(bot, db, scraper_getter):
                     )
                     return cursor.fetchone()[0]
 
-            legacy_actions = await asyncio.to_thread(_get_legacy_actions)
-            total_count = await asyncio.to_thread(_get_total_count)
+            legacy_actions = await db.run_read(_get_legacy_actions)
+            total_count = await db.run_read(_get_total_count)
 
             if not legacy_actions:
                 await interaction.followup.send(
@@ -4458,7 +4848,7 @@ def setup_commands(bot, db, scraper_getter):
                     )
                     return cursor.fetchone()[0]
 
-            count = await asyncio.to_thread(_get_count)
+            count = await db.run_read(_get_count)
 
             if count == 0:
                 await interaction.followup.send(
@@ -4480,14 +4870,16 @@ def setup_commands(bot, db, scraper_getter):
             def _delete_legacy():
                 with db.get_connection() as conn:
                     cursor = conn.cursor()
+                    # total_changes also counts rows deleted through the actions view
+                    changes_before = conn.total_changes
                     cursor.execute(
                         "DELETE FROM actions WHERE action_type = 'legacy_multi_action'"
                     )
-                    deleted = cursor.rowcount
+                    deleted = conn.total_changes - changes_before
                     conn.commit()
                     return deleted
 
-            deleted = await asyncio.to_thread(_delete_legacy)
+            deleted = await db.run_write(_delete_legacy, domain="events")
 
             await interaction.followup.send(
                 f"✅ **Deleted {deleted:,} legacy_multi_action entries!**\n\n"
@@ -4796,7 +5188,7 @@ def setup_commands(bot, db, scraper_getter):
 
                     return [dict(row) for row in cursor.fetchall()]
 
-            unknown_actions = await asyncio.to_thread(_get_unknown_actions)
+            unknown_actions = await db.run_read(_get_unknown_actions)
 
             if not unknown_actions:
                 await interaction.followup.send(
@@ -4917,7 +5309,7 @@ def setup_commands(bot, db, scraper_getter):
                             )
                         conn.commit()
 
-                await asyncio.to_thread(_apply_updates)
+                await db.run_write(_apply_updates, domain="events")
 
             # Build result embed
             recognition_rate = (
@@ -0,0 +1,629 @@
+#!/usr/bin/env python3
+"""
+Compact storage layout: INTEGER player IDs and dictionary-encoded action types
+
+The original schema stores `player_id`, `target_player_id` and `admin_id` as
+TEXT and repeats the `action_type` string on every action row. The compact
+layout:
+
+- converts every player ID column to INTEGER (player_profiles and
+  online_players use it as their INTEGER PRIMARY KEY / rowid)
+- moves actions into `action_log` with an `action_type_id` pointing at the
+  `action_types` lookup table
+- keeps an `actions` VIEW with the old column shape (INSTEAD OF triggers
+  route inserts/updates/deletes to action_log), so existing queries keep
+  working during the transition
+- returns player IDs to Python as strings through `row_factory`, exactly like
+  the TEXT columns did
+
+The migration is online: the large tables are copied in batches while the
+bot keeps writing, and only the final swap (tail copy, small mutable tables,
+DROP/RENAME) runs in one short write transaction. Triggers record the ids of
+rows updated or deleted during the copy (value backfill, reparse, retention
+purge) and the swap re-copies exactly those rows. An interrupted run leaves
+the legacy tables in use and resumes where it stopped.
+
+Usage:
+    python compact_schema.py                      # Dry run (sizes + plan)
+    python compact_schema.py --execute            # Migrate
+    python compact_schema.py --execute --vacuum   # Migrate and reclaim space
+"""
+
+import argparse
+import logging
+import os
+import re
+import sqlite3
+import time
+from typing import Callable, Dict, List, Optional
+
+import db_domains
+import epoch
+import raw_text_store
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv("DATABASE_PATH", "data/pro4kings.db")
+
+ACTIONS_TABLE = "action_log"
+
+# Columns holding player IDs - returned to Python as str whatever the storage
+ID_COLUMNS = frozenset({"player_id", "target_player_id", "admin_id"})
+
+# Player ID columns to convert, per table
+TABLE_ID_COLUMNS: Dict[str, tuple] = {
+    "actions": ("player_id", "target_player_id", "admin_id"),
+    "login_events": ("player_id",),
+    "profile_history": ("player_id",),
+    "player_profiles": ("player_id",),
+    "online_players": ("player_id",),
+    "rank_history": ("player_id",),
+    "banned_players": ("player_id",),
+}
+
+# Append-only tables copied in batches before the swap
+BATCHED_TABLES = ("login_events", "profile_history")
+
+# Mutable tables copied in one go inside the swap transaction
+SWAP_TABLES = ("player_profiles", "online_players", "rank_history", "banned_players")
+
+# Columns added to actions after the initial schema (either layout)
+ACTION_COLUMNS = {"amount": "INTEGER", "fee": "INTEGER", "ts": epoch.TS_COLUMN_SQL}
+
+# Action indexes: suffix -> columns (legacy column names)
+ACTION_INDEXES = {
+    "player": "player_id",
+    "target": "target_player_id",
+    "timestamp": "timestamp",
+    "type": "action_type",
+    "detail": "action_detail",
+    "type_amount": "action_type, amount",
+    "ts": "ts",
+}
+
+
+# (description, ID column positions, raw_text positions) of the last statement
+# seen by row_factory. Swapped as one tuple so concurrent threads never pair
+# the wrong positions.
+_id_positions_cache: tuple = (None, (), ())
+
+
+def row_factory(cursor: sqlite3.Cursor, row: tuple) -> sqlite3.Row:
+    """sqlite3.Row factory that returns INTEGER player IDs as str
+
+    Also decodes compressed raw_text BLOBs (see raw_text_store.py).
+    """
+    global _id_positions_cache
+
+    description = cursor.description
+    cached_description, positions, raw_positions = _id_positions_cache
+    if cached_description is not description:
+        positions = tuple(
+            i for i, column in enumerate(description) if column[0] in ID_COLUMNS
+        )
+        raw_positions = tuple(
+            i for i, column in enumerate(description) if column[0] == "raw_text"
+        )
+        _id_positions_cache = (description, positions, raw_positions)
+
+    if positions or raw_positions:
+        values = list(row)
+        for i in positions:
+            if type(values[i]) is int:
+                values[i] = str(values[i])
+        for i in raw_positions:
+            if type(values[i]) is bytes:
+                values[i] = raw_text_store.decode(values[i])
+        row = tuple(values)
+    return sqlite3.Row(cursor, row)
+
+
+def is_compact(cursor) -> bool:
+    """Return True if the database already uses the compact layout
+
+    That is `actions` being the view over action_log: an interrupted
+    migration leaves action_log next to the still-live legacy `actions` table.
+    """
+    # action_log may live in an attached domain file (see db_domains.py)
+    schema = db_domains.table_schema(cursor, "actions")
+    if schema is None or db_domains.table_schema(cursor, ACTIONS_TABLE) is None:
+        return False
+    cursor.execute(f"SELECT type FROM {schema}.sqlite_master WHERE name = 'actions'")
+    return cursor.fetchone()[0] == "view"
+
+
+def add_missing_columns(cursor, table: str, columns: Dict[str, str]) -> List[str]:
+    """Add missing columns to an existing table, returns names of added columns"""
+    # table_xinfo also lists generated columns
+    cursor.execute(f"PRAGMA table_xinfo({table})")
+    existing = {row[1] for row in cursor.fetchall()}
+    added = []
+    for name, definition in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            added.append(name)
+            logger.info(f"🔧 Added column {table}.{name}")
+    return added
+
+
+def actions_table(cursor) -> str:
+    """Physical table behind `actions` (action_log once migrated)"""
+    return ACTIONS_TABLE if is_compact(cursor) else "actions"
+
+
+def action_index_statements(compact: bool) -> List[str]:
+    """CREATE INDEX statements for the actions storage of either layout"""
+    statements = []
+    for suffix, columns in ACTION_INDEXES.items():
+        if compact:
+            columns = columns.replace("action_type", "action_type_id")
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS idx_{ACTIONS_TABLE}_{suffix} "
+                f"ON {ACTIONS_TABLE}({columns})"
+            )
+        else:
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS idx_actions_{suffix} ON actions({columns})"
+            )
+    return statements
+
+
+def create_actions_view(cursor) -> None:
+    """(Re)create the `actions` compatibility view and its INSTEAD OF triggers"""
+    # table_xinfo: generated columns (hidden 2/3) are selectable but not writable
+    cursor.execute(f"PRAGMA table_xinfo({ACTIONS_TABLE})")
+    columns = [(row[1], row[4], row[6]) for row in cursor.fetchall()]
+    # Views/triggers must live in the same file as action_log
+    schema = db_domains.table_schema(cursor, ACTIONS_TABLE) or "main"
+
+    select = []
+    insert_cols, insert_vals, update_sets = [], [], []
+    for name, default, hidden in columns:
+        if hidden in (2, 3):
+            select.append(f"l.{name}")
+            continue
+        if name == "action_type_id":
+            select.append("t.name AS action_type")
+            value = "(SELECT id FROM action_types WHERE name = NEW.action_type)"
+        else:
+            select.append(f"l.{name}")
+            value = f"NEW.{name}"
+            if default is not None:
+                value = f"COALESCE(NEW.{name}, {default})"
+        insert_cols.append(name)
+        insert_vals.append(value)
+        if name != "id":
+            update_sets.append(f"{name} = {value}")
+
+    cursor.execute("DROP VIEW IF EXISTS actions")
+    cursor.execute(
+        f"""
+        CREATE VIEW {schema}.actions AS
+        SELECT {", ".join(select)}
+        FROM {ACTIONS_TABLE} l
+        JOIN action_types t ON t.id = l.action_type_id
+    """
+    )
+    cursor.execute(
+        f"""
+        CREATE TRIGGER {schema}.actions_insert INSTEAD OF INSERT ON actions
+        BEGIN
+            INSERT OR IGNORE INTO action_types (name) VALUES (NEW.action_type);
+            INSERT INTO {ACTIONS_TABLE} ({", ".join(insert_cols)})
+            VALUES ({", ".join(insert_vals)});
+        END
+    """
+    )
+    cursor.execute(
+        f"""
+        CREATE TRIGGER {schema}.actions_update INSTEAD OF UPDATE ON actions
+        BEGIN
+            INSERT OR IGNORE INTO action_types (name) VALUES (NEW.action_type);
+            UPDATE {ACTIONS_TABLE} SET {", ".join(update_sets)}
+            WHERE id = OLD.id;
+        END
+    """
+    )
+    cursor.execute(
+        f"""
+        CREATE TRIGGER {schema}.actions_delete INSTEAD OF DELETE ON actions
+        BEGIN
+            DELETE FROM {ACTIONS_TABLE} WHERE id = OLD.id;
+        END
+    """
+    )
+
+
+def storage_report(conn: sqlite3.Connection, db_path: str) -> Dict:
+    """File size, used bytes and per table/index sizes (via dbstat when available)"""
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    objects = {}
+    try:
+        for name, size in conn.execute(
+            "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"
+        ):
+            objects[name] = size
+    except sqlite3.Error:
+        pass  # dbstat not compiled in - only totals
+
+    return {
+        "file_bytes": os.path.getsize(db_path) if os.path.exists(db_path) else 0,
+        "used_bytes": (page_count - freelist) * page_size,
+        "objects": objects,
+    }
+
+
+def format_report(before: Dict, after: Optional[Dict] = None) -> str:
+    """Human readable size table (before/after)"""
+
+    def mb(value: Optional[int]) -> str:
+        return "-" if value is None else f"{value / 1024 / 1024:,.2f} MB"
+
+    lines = [f"{'':<40} {'before':>14} {'after':>14}"]
+    for key, label in (("file_bytes", "File size"), ("used_bytes", "Used pages")):
+        lines.append(
+            f"{label:<40} {mb(before[key]):>14} {mb(after[key] if after else None):>14}"
+        )
+
+    names = set(before["objects"]) | set(after["objects"] if after else ())
+    for name in sorted(names, key=lambda n: -before["objects"].get(n, 0)):
+        lines.append(
+            f"  {name:<38} {mb(before['objects'].get(name)):>14} "
+            f"{mb(after['objects'].get(name) if after else None):>14}"
+        )
+    return "\n".join(lines)
+
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _compact_table_sql(conn: sqlite3.Connection, table: str, new_name: str) -> str:
+    """Rewrite a table's stored CREATE statement with INTEGER player ID columns"""
+    sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()[0]
+    sql = re.sub(
+        r"^CREATE TABLE\s+(?:IF NOT EXISTS\s+)?[\"`]?\w+[\"`]?",
+        f"CREATE TABLE {new_name}",
+        sql,
+        flags=re.IGNORECASE,
+    )
+    for column in TABLE_ID_COLUMNS[table]:
+        sql = re.sub(
+            rf"\b{column}\s+TEXT\b", f"{column} INTEGER", sql, flags=re.IGNORECASE
+        )
+
+    if table == "actions":
+        sql, replaced = re.subn(
+            r"\baction_type\s+TEXT\s+NOT\s+NULL",
+            "action_type_id INTEGER NOT NULL REFERENCES action_types(id)",
+            sql,
+            flags=re.IGNORECASE,
+        )
+        if replaced != 1:
+            raise RuntimeError("Unexpected actions schema - action_type column not found")
+    return sql
+
+
+def _non_numeric_ids(conn: sqlite3.Connection, table: str) -> int:
+    """Count rows whose player ID columns would stay TEXT after conversion"""
+    conditions = " OR ".join(
+        f"({column} IS NOT NULL AND ({column} = '' OR {column} GLOB '*[^0-9]*'))"
+        for column in TABLE_ID_COLUMNS[table]
+    )
+    return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {conditions}").fetchone()[0]
+
+
+def _track_changes(conn: sqlite3.Connection, table: str) -> None:
+    """Record ids of `table` rows updated or deleted while it is being copied"""
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {table}__changed (id INTEGER PRIMARY KEY)")
+    for event in ("UPDATE", "DELETE"):
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}__track_{event.lower()}
+            AFTER {event} ON {table}
+            BEGIN
+                INSERT OR IGNORE INTO {table}__changed (id) VALUES (OLD.id);
+            END
+        """
+        )
+
+
+def _copy_batches(
+    conn: sqlite3.Connection,
+    source: str,
+    target: str,
+    select: str,
+    batch_size: int,
+    log: Callable[[str], None],
+    join: str = "",
+    prepare: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """Copy rows in id-ordered batches (one txn each), returns the last source id
+
+    Starts after MAX(target.id), so an interrupted run resumes. The cursor
+    advances by source ids read, never by what landed in the target.
+    `prepare(low, high)` runs first inside each batch transaction.
+    """
+    columns = _columns(conn, target)
+    last_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {target}").fetchone()[0]
+    copied = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            high = conn.execute(
+                f"SELECT MAX(id) FROM (SELECT id FROM {source} "
+                f"WHERE id > ? ORDER BY id LIMIT ?)",
+                (last_id, batch_size),
+            ).fetchone()[0]
+            if high is None:
+                conn.execute("COMMIT")
+                return last_id
+            if prepare:
+                prepare(last_id, high)
+            cursor = conn.execute(
+                f"""
+                INSERT INTO {target} ({", ".join(columns)})
+                SELECT {select} FROM {source} s {join}
+                WHERE s.id > ? AND s.id <= ?
+            """,
+                (last_id, high),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        previous = copied
+        copied += cursor.rowcount
+        last_id = high
+        if copied // (batch_size * 20) > previous // (batch_size * 20):
+            log(f"   {source}: {copied:,} rows copied")
+
+
+def _apply_changes(
+    conn: sqlite3.Connection,
+    source: str,
+    target: str,
+    select: str,
+    last_id: int,
+    join: str = "",
+) -> None:
+    """Swap step: re-copy rows changed during the batched copy, then the tail"""
+    columns = _columns(conn, target)
+    changed = f"SELECT id FROM {source}__changed"
+    conn.execute(f"DELETE FROM {target} WHERE id IN ({changed})")
+    conn.execute(
+        f"""
+        INSERT INTO {target} ({", ".join(columns)})
+        SELECT {select} FROM {source} s {join}
+        WHERE s.id > ? OR s.id IN ({changed})
+    """,
+        (last_id,),
+    )
+
+
+def migrate(
+    db_path: str = DB_PATH,
+    execute: bool = False,
+    batch_size: int = 20000,
+    vacuum: bool = False,
+    log: Callable[[str], None] = print,
+) -> Dict:
+    """Migrate a legacy TEXT-key database to the compact layout
+
+    Returns {"migrated": bool, "before": report, "after": report|None}
+    """
+    conn = sqlite3.connect(db_path, timeout=30.0, isolation_level=None)
+    db_domains.attach(conn, db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+
+    try:
+        before = storage_report(conn, db_path)
+        result = {"migrated": False, "before": before, "after": None}
+
+        if is_compact(conn.cursor()):
+            log("✅ Database already uses the compact layout")
+            return result
+
+        tables = [t for t in TABLE_ID_COLUMNS if _table_exists(conn, t)]
+        log("📋 Compact layout migration plan:")
+        for table in tables:
+            rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            odd = _non_numeric_ids(conn, table)
+            note = f" ({odd:,} non-numeric IDs kept as TEXT)" if odd else ""
+            log(f"   - {table}: {rows:,} rows{note}")
+
+        if "player_profiles" in tables and _non_numeric_ids(conn, "player_profiles"):
+            raise RuntimeError(
+                "player_profiles has non-numeric player_id values - "
+                "they cannot become an INTEGER PRIMARY KEY; fix them first"
+            )
+
+        if not execute:
+            log("ℹ️ Dry run - re-run with --execute to migrate")
+            return result
+
+        started = time.time()
+
+        # 1️⃣ Lookup table, action_log with its final indexes, change tracking.
+        # One transaction, IF NOT EXISTS throughout: a failure leaves the legacy
+        # layout untouched and a re-run resumes the copy.
+        batched = [table for table in BATCHED_TABLES if table in tables]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.cursor()
+            # amount/fee/ts normally come from Database init - a database the
+            # current code never opened does not have them yet
+            add_missing_columns(cursor, "actions", ACTION_COLUMNS)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS action_types (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE
+                )
+            """
+            )
+            conn.execute(
+                _compact_table_sql(conn, "actions", ACTIONS_TABLE).replace(
+                    "CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1
+                )
+            )
+            # action_log left behind by an interrupted run of older code
+            add_missing_columns(cursor, ACTIONS_TABLE, ACTION_COLUMNS)
+            for statement in action_index_statements(compact=True):
+                conn.execute(statement)
+            for table in ["actions"] + batched:
+                _track_changes(conn, table)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        action_columns = _columns(conn, ACTIONS_TABLE)
+        action_select = ", ".join(
+            "t.id" if column == "action_type_id" else f"s.{column}"
+            for column in action_columns
+        )
+        action_join = "JOIN action_types t ON t.name = s.action_type"
+
+        def seed_action_types(low: int = 0, high: int = -1):
+            """Types of actions with id in (low, high] (high < 0: all)"""
+            conn.execute(
+                "INSERT OR IGNORE INTO action_types (name) "
+                "SELECT DISTINCT action_type FROM actions "
+                "WHERE id > ? AND (? < 0 OR id <= ?)",
+                (low, high, high),
+            )
+
+        # 2️⃣ Batched copy of the big tables while the bot keeps running. Types
+        # are seeded in each batch's transaction, so new ones never drop rows.
+        log("🔄 Copying actions...")
+        copied_until = {
+            "actions": _copy_batches(
+                conn,
+                "actions",
+                ACTIONS_TABLE,
+                action_select,
+                batch_size,
+                log,
+                action_join,
+                prepare=seed_action_types,
+            )
+        }
+        for table in batched:
+            log(f"🔄 Copying {table}...")
+            # Copied from scratch, so earlier change records are moot
+            conn.execute(f"DELETE FROM {table}__changed")
+            conn.execute(f"DROP TABLE IF EXISTS {table}__new")
+            conn.execute(_compact_table_sql(conn, table, f"{table}__new"))
+            select = ", ".join(f"s.{c}" for c in _columns(conn, f"{table}__new"))
+            copied_until[table] = _copy_batches(
+                conn, table, f"{table}__new", select, batch_size, log
+            )
+
+        # 3️⃣ Swap: changed + tail rows, mutable tables, DROP/RENAME, view - one transaction
+        log("🔁 Swapping tables...")
+        swap_started = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            seed_action_types()
+            _apply_changes(
+                conn,
+                "actions",
+                ACTIONS_TABLE,
+                action_select,
+                copied_until["actions"],
+                action_join,
+            )
+            conn.execute("DROP TABLE actions")
+
+            for table in tables:
+                if table == "actions":
+                    continue
+                new_table = f"{table}__new"
+                if table in BATCHED_TABLES:
+                    select = ", ".join(f"s.{c}" for c in _columns(conn, new_table))
+                    _apply_changes(conn, table, new_table, select, copied_until[table])
+                else:
+                    columns = ", ".join(_columns(conn, table))
+                    conn.execute(f"DROP TABLE IF EXISTS {new_table}")
+                    conn.execute(_compact_table_sql(conn, table, new_table))
+                    conn.execute(
+                        f"INSERT INTO {new_table} ({columns}) "
+                        f"SELECT {columns} FROM {table}"
+                    )
+
+                index_sql = [
+                    row[0]
+                    for row in conn.execute(
+                        "SELECT sql FROM sqlite_master "
+                        "WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                        (table,),
+                    )
+                ]
+                conn.execute(f"DROP TABLE {table}")
+                conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+                for sql in index_sql:
+                    conn.execute(sql)
+
+            # Tracking triggers went with the dropped source tables
+            for table in ["actions"] + batched:
+                conn.execute(f"DROP TABLE {table}__changed")
+
+            create_actions_view(conn.cursor())
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        log(f"✅ Swap committed in {time.time() - swap_started:.1f}s")
+
+        conn.execute("PRAGMA optimize")
+        if vacuum:
+            log("🧹 VACUUM (rewrites the whole file)...")
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # applied by the VACUUM
+            conn.execute("VACUUM")
+
+        result["migrated"] = True
+        result["after"] = storage_report(conn, db_path)
+        log(f"✅ Migration finished in {time.time() - started:.1f}s")
+        return result
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Migrate to INTEGER player IDs and dictionary-encoded action types"
+    )
+    parser.add_argument("--db", default=DB_PATH, help="Database path")
+    parser.add_argument(
+        "--execute", action="store_true", help="Actually migrate (default: dry run)"
+    )
+    parser.add_argument("--batch-size", type=int, default=20000)
+    parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="VACUUM afterwards to shrink the file (blocks writers while it runs)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    result = migrate(args.db, args.execute, args.batch_size, args.vacuum)
+    print()
+    print(format_report(result["before"], result["after"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -38,6 +38,23 @@ class Config:
     # Database (relative paths for portability)
     DATABASE_PATH: str = os.getenv("DATABASE_PATH", "data/pro4kings.db")
     DATABASE_BACKUP_PATH: str = os.getenv("DATABASE_BACKUP_PATH", "data/backups")
+    DATABASE_BACKUP_KEEP: int = _safe_int("DATABASE_BACKUP_KEEP", 7)  # Rotating backups kept
+    DATABASE_BACKUP_INTERVAL: int = _safe_int(
+        "DATABASE_BACKUP_INTERVAL", 0
+    )  # Scheduled online backup every N seconds (0 = only via /backup_database)
+    DB_READ_WORKERS: int = _safe_int("DB_READ_WORKERS", 4)  # Threads for DB reads (writes: 1)
+    DB_MAX_PENDING_JOBS: int = _safe_int(
+        "DB_MAX_PENDING_JOBS", 200
+    )  # Outstanding DB jobs before callers wait for a slot
+    SLOW_QUERY_MS: float = _safe_float(
+        "SLOW_QUERY_MS", 250.0
+    )  # Log statements slower than this with their query plan (0 = off)
+    LOOP_MONITOR_INTERVAL: float = _safe_float(
+        "LOOP_MONITOR_INTERVAL", 0.5
+    )  # Event-loop lag sample period in seconds (0 = off)
+    LOOP_BLOCK_THRESHOLD_MS: float = _safe_float(
+        "LOOP_BLOCK_THRESHOLD_MS", 500.0
+    )  # Capture the stack of callbacks blocking the loop this long (0 = off)
 
     # Scraper Settings
     # 🔥 OPTIMIZED: Based on testing panel.pro4kings.ro (30 connection limit shared hosting)
@@ -75,6 +92,14 @@ class Config:
 
     # Task Intervals (in seconds)
     SCRAPE_ACTIONS_INTERVAL: int = _safe_int("SCRAPE_ACTIONS_INTERVAL", 5)
+    # Adaptive action polling: faster when the homepage window turns over, slower when idle
+    SCRAPE_ACTIONS_ADAPTIVE: bool = (
+        os.getenv("SCRAPE_ACTIONS_ADAPTIVE", "true").lower() == "true"
+    )
+    SCRAPE_ACTIONS_MIN_INTERVAL: int = _safe_int("SCRAPE_ACTIONS_MIN_INTERVAL", 2)
+    SCRAPE_ACTIONS_MAX_INTERVAL: int = _safe_int("SCRAPE_ACTIONS_MAX_INTERVAL", 30)
+    # Share of the homepage window replaced between polls (lower = fresher, more requests)
+    SCRAPE_ACTIONS_TARGET_FILL: float = _safe_float("SCRAPE_ACTIONS_TARGET_FILL", 0.25)
     SCRAPE_ONLINE_INTERVAL: int = _safe_int("SCRAPE_ONLINE_INTERVAL", 60)
     UPDATE_PROFILES_INTERVAL: int = _safe_int("UPDATE_PROFILES_INTERVAL", 120)  # 2 min
     CHECK_BANNED_INTERVAL: int = _safe_int("CHECK_BANNED_INTERVAL", 7200)  # 2 hours
@@ -87,6 +112,9 @@ class Config:
     LOGIN_EVENTS_RETENTION_DAYS: int = _safe_int(
         "LOGIN_EVENTS_RETENTION_DAYS", 30
     )  # Keep 1 month
+    INGEST_METRICS_RETENTION_DAYS: int = _safe_int(
+        "INGEST_METRICS_RETENTION_DAYS", 7
+    )  # Per-poll feed lag / gap metrics
     PROFILE_HISTORY_RETENTION_DAYS: int = _safe_int(
         "PROFILE_HISTORY_RETENTION_DAYS", 180
     )  # Keep 6 months
@@ -94,6 +122,48 @@ class Config:
     # Batch Sizes
     ACTIONS_FETCH_LIMIT: int = _safe_int("ACTIONS_FETCH_LIMIT", 200)
     PROFILES_UPDATE_BATCH: int = _safe_int("PROFILES_UPDATE_BATCH", 200)
+    PROFILE_REFRESH_BUDGET: int = _safe_int(
+        "PROFILE_REFRESH_BUDGET", PROFILES_UPDATE_BATCH
+    )  # Max profile fetches per update_pending_profiles cycle
+    PROFILE_REFRESH_MIN_INTERVAL: int = _safe_int(
+        "PROFILE_REFRESH_MIN_INTERVAL", 600
+    )  # Highest-scored profiles: every 10 min
+    PROFILE_REFRESH_MAX_INTERVAL: int = _safe_int(
+        "PROFILE_REFRESH_MAX_INTERVAL", 604800
+    )  # Lowest-scored profiles: every 7 days
+    PROFILE_MARK_COALESCE_WINDOW: int = _safe_int(
+        "PROFILE_MARK_COALESCE_WINDOW", 600
+    )  # Repeated refresh marks for the same player within 10 min = 1 write
+
+    # Storage
+    RAW_TEXT_COMPRESSION: bool = (
+        os.getenv("RAW_TEXT_COMPRESSION", "false").lower() == "true"
+    )  # Store new actions.raw_text dictionary-compressed (see raw_text_store.py)
+    ACTION_ARCHIVE_DAYS: int = _safe_int(
+        "ACTION_ARCHIVE_DAYS", 0
+    )  # Move older actions to monthly archive DBs (0 = off, delete at 90 days)
+    ACTION_ARCHIVE_DIR: str = os.getenv("ACTION_ARCHIVE_DIR", "")  # Default: archive/ next to DB
+    DATABASE_SPLIT: bool = (
+        os.getenv("DATABASE_SPLIT", "false").lower() == "true"
+    )  # Per-domain DB files (see db_domains.py) - new databases; existing: run the CLI
+
+    # Retention (days, 0 = keep forever) - applied by the chunked purge
+    ACTIONS_RETENTION_DAYS: int = _safe_int("ACTIONS_RETENTION_DAYS", 90)
+    LOGIN_EVENTS_RETENTION_DAYS: int = _safe_int("LOGIN_EVENTS_RETENTION_DAYS", 30)
+    PROFILE_HISTORY_RETENTION_DAYS: int = _safe_int(
+        "PROFILE_HISTORY_RETENTION_DAYS", 180
+    )
+    RETENTION_PURGE_INTERVAL: int = _safe_int(
+        "RETENTION_PURGE_INTERVAL", 0
+    )  # Run the purge in the background every N seconds (0 = only via /cleanup)
+
+    # WAL checkpoints (see wal_checkpoint.py)
+    WAL_CHECKPOINT_INTERVAL: int = _safe_int(
+        "WAL_CHECKPOINT_INTERVAL", 60
+    )  # PASSIVE checkpoint every N seconds (0 = SQLite autocheckpoint only)
+    WAL_TRUNCATE_SIZE_MB: int = _safe_int(
+        "WAL_TRUNCATE_SIZE_MB", 64
+    )  # TRUNCATE once the -wal file grows past this, even when busy
 
     # Logging
     LOG_FILE_PATH: str = os.getenv("LOG_FILE_PATH", "bot.log")
@@ -101,6 +171,10 @@ class Config:
     LOG_MAX_BYTES: int = _safe_int("LOG_MAX_BYTES", 10485760)  # 10 MB
     LOG_BACKUP_COUNT: int = _safe_int("LOG_BACKUP_COUNT", 5)  # Keep 5 old logs
 
+    # Metrics - Prometheus text endpoint served by the bot process
+    METRICS_PORT: int = _safe_int("METRICS_PORT", 9108)  # 0 = disabled
+    METRICS_HOST: str = os.getenv("METRICS_HOST", "127.0.0.1")
+
     # Error Notifications
     ENABLE_ERROR_NOTIFICATIONS: bool = (
         os.getenv("ENABLE_ERROR_NOTIFICATIONS", "true").lower() == "true"
@@ -161,10 +235,12 @@ class Config:
 
 **Database:**
 • Path: `{cls.DATABASE_PATH}`
-• Backup: `{cls.DATABASE_BACKUP_PATH}`
+• Executor: {cls.DB_READ_WORKERS} read threads + 1 writer, max {cls.DB_MAX_PENDING_JOBS} pending
+• Slow Query Log: {f'over {cls.SLOW_QUERY_MS:g}ms' if cls.SLOW_QUERY_MS else '❌ Disabled'}
+• Backup: `{cls.DATABASE_BACKUP_PATH}` (keep {cls.DATABASE_BACKUP_KEEP}, every {cls.DATABASE_BACKUP_INTERVAL}s)
 
 **Task Intervals:**
-• Scrape Actions: {cls.SCRAPE_ACTIONS_INTERVAL}s{vip_interval_display}{online_tracking}
+• Scrape Actions: {cls.SCRAPE_ACTIONS_INTERVAL}s{f' (adaptive {cls.SCRAPE_ACTIONS_MIN_INTERVAL}-{cls.SCRAPE_ACTIONS_MAX_INTERVAL}s, fill {cls.SCRAPE_ACTIONS_TARGET_FILL:g})' if cls.SCRAPE_ACTIONS_ADAPTIVE else ''}{vip_interval_display}{online_tracking}
 • Scrape Online: {cls.SCRAPE_ONLINE_INTERVAL}s
 • Update Profiles: {cls.UPDATE_PROFILES_INTERVAL}s
 • Check Banned: {cls.CHECK_BANNED_INTERVAL}s
@@ -174,6 +250,7 @@ class Config:
 • Actions: {cls.ACTIONS_RETENTION_DAYS} days
 • Login Events: {cls.LOGIN_EVENTS_RETENTION_DAYS} days
 • Profile History: {cls.PROFILE_HISTORY_RETENTION_DAYS} days
+• Ingest Metrics: {cls.INGEST_METRICS_RETENTION_DAYS} days
 
 **Scraper:**
 • Max Concurrent: {cls.SCRAPER_MAX_CONCURRENT}
@@ -183,12 +260,21 @@ class Config:
 **Batch Sizes:**
 • Actions Fetch: {cls.ACTIONS_FETCH_LIMIT}
 • Profile Updates: {cls.PROFILES_UPDATE_BATCH}
+• Refresh Budget: {cls.PROFILE_REFRESH_BUDGET}/cycle ({cls.PROFILE_REFRESH_MIN_INTERVAL}s - {cls.PROFILE_REFRESH_MAX_INTERVAL}s)
+• Refresh Mark Window: {cls.PROFILE_MARK_COALESCE_WINDOW}s
+• Raw Text Compression: {'✅ Enabled' if cls.RAW_TEXT_COMPRESSION else '❌ Disabled'}
+• Action Archive: {f'after {cls.ACTION_ARCHIVE_DAYS} days' if cls.ACTION_ARCHIVE_DAYS else '❌ Disabled'}
+• Domain Split: {'✅ Enabled' if cls.DATABASE_SPLIT else '❌ Disabled'}
+• WAL checkpoint: every {cls.WAL_CHECKPOINT_INTERVAL}s, truncate over {cls.WAL_TRUNCATE_SIZE_MB} MB
+• Retention: actions {cls.ACTIONS_RETENTION_DAYS}d, logins {cls.LOGIN_EVENTS_RETENTION_DAYS}d, history {cls.PROFILE_HISTORY_RETENTION_DAYS}d
 
 **Logging:**
 • File: `{cls.LOG_FILE_PATH}`
 • Level: {cls.LOG_LEVEL}
 • Max Size: {cls.LOG_MAX_BYTES / 1024 / 1024:.1f} MB
 • Backups: {cls.LOG_BACKUP_COUNT}
+• Metrics: {f'`http://{cls.METRICS_HOST}:{cls.METRICS_PORT}/metrics`' if cls.METRICS_PORT else '❌ Disabled'}
+• Loop Monitor: {f'every {cls.LOOP_MONITOR_INTERVAL:g}s, blocking over {cls.LOOP_BLOCK_THRESHOLD_MS:g}ms' if cls.LOOP_MONITOR_INTERVAL > 0 else '❌ Disabled'}
 
 **Notifications:**
 • Error Alerts: {'✅ Enabled' if cls.ENABLE_ERROR_NOTIFICATIONS else '❌ Disabled'}
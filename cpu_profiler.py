@@ -0,0 +1,203 @@
+"""On-demand sampling profiler for the running process
+
+`sample` snapshots every thread's Python stack (`sys._current_frames()`)
+every `interval` seconds for `seconds` seconds from a separate thread, so
+the bot keeps running while it is profiled and nothing is instrumented
+outside the sampling window. The result aggregates into:
+
+- a pstats-style table: self samples (function was the innermost frame)
+  and cumulative samples (function anywhere on the stack) per function
+- collapsed stacks (`thread;outer;...;inner count` per line), the input
+  format of flamegraph.pl / speedscope / inferno
+
+Samples are wall-clock: a thread waiting inside a C call (SQLite, a socket)
+counts against the Python frame that made it. Threads parked in an idle
+wait (the event loop's select, an empty executor queue) are dropped unless
+`include_idle` is set.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+# 200 Hz - fine-grained enough for a few seconds, cheap enough to run in production
+DEFAULT_INTERVAL = 0.005
+MAX_SECONDS = 120
+
+# Innermost frames that mean "this thread is waiting for work"
+IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+# (filename, first line, function name) - the same key pstats uses
+FrameKey = Tuple[str, int, str]
+
+_running = threading.Lock()
+
+
+class Profile:
+    """Aggregated stack samples from one `sample` run"""
+
+    def __init__(self, seconds: float, interval: float):
+        self.seconds = seconds
+        self.interval = interval
+        self.started_at = datetime.now()
+        self.elapsed = 0.0
+        self.ticks = 0
+        self.samples = 0
+        self.idle_samples = 0
+        self.stacks: Counter = Counter()  # (thread name, frames root-first) -> samples
+        self.threads: Counter = Counter()
+
+    def add(self, thread: str, frames: Tuple[FrameKey, ...]) -> None:
+        self.stacks[(thread, frames)] += 1
+        self.threads[thread] += 1
+        self.samples += 1
+
+    def top(self, limit: int = 20, sort: str = "self") -> List[Dict]:
+        """Functions by self or cumulative samples"""
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        for (_, frames), count in self.stacks.items():
+            own[frames[-1]] += count
+            for frame in set(frames):
+                cumulative[frame] += count
+        ranked = (own if sort == "self" else cumulative).most_common(limit)
+        total = self.samples or 1
+        return [
+            {
+                "function": frame[2],
+                "location": f"{_short_path(frame[0])}:{frame[1]}",
+                "self": own[frame],
+                "cumulative": cumulative[frame],
+                "self_pct": round(own[frame] * 100 / total, 1),
+                "cumulative_pct": round(cumulative[frame] * 100 / total, 1),
+            }
+            for frame, _ in ranked
+        ]
+
+    def collapsed(self) -> str:
+        """One `thread;frame;...;frame count` line per distinct stack"""
+        lines = []
+        for (thread, frames), count in self.stacks.most_common():
+            path = ";".join(
+                [thread.replace(";", ":")]
+                + [f"{name} ({_short_path(file)}:{line})" for file, line, name in frames]
+            )
+            lines.append(f"{path} {count}")
+        return "\n".join(lines) + "\n"
+
+    def report(self, limit: int = 30) -> str:
+        """pstats-like text report"""
+        lines = [
+            f"CPU sampling profile - {self.started_at.isoformat(timespec='seconds')}",
+            f"{self.elapsed:.1f}s, {self.ticks} ticks every {self.interval * 1000:g}ms, "
+            f"{self.samples} samples ({self.idle_samples} idle dropped)",
+            "",
+            "Threads: "
+            + ", ".join(f"{name} {count}" for name, count in self.threads.most_common()),
+        ]
+        for sort, title in (("self", "self"), ("cumulative", "cumulative")):
+            lines += [
+                "",
+                f"Ordered by: {title} samples",
+                "",
+                f"{'self':>7} {'self%':>6} {'cum':>7} {'cum%':>6}  function (file:line)",
+            ]
+            for row in self.top(limit, sort):
+                lines.append(
+                    f"{row['self']:>7} {row['self_pct']:>6} {row['cumulative']:>7} "
+                    f"{row['cumulative_pct']:>6}  {row['function']} ({row['location']})"
+                )
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self, limit: int = 20) -> Dict:
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "seconds": round(self.elapsed, 2),
+            "interval_ms": self.interval * 1000,
+            "ticks": self.ticks,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "threads": dict(self.threads.most_common()),
+            "top_self": self.top(limit, "self"),
+            "top_cumulative": self.top(limit, "cumulative"),
+            "collapsed": self.collapsed(),
+        }
+
+
+def sample(
+    seconds: float,
+    interval: float = DEFAULT_INTERVAL,
+    include_idle: bool = False,
+) -> Profile:
+    """Sample all threads for `seconds` (blocking - call from a worker thread)
+
+    Raises RuntimeError when another profile is already running.
+    """
+    seconds = max(0.1, min(seconds, MAX_SECONDS))
+    interval = max(0.001, interval)
+    if not _running.acquire(blocking=False):
+        raise RuntimeError("A CPU profile is already running")
+    try:
+        profile = Profile(seconds, interval)
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        start = time.perf_counter()
+        deadline = start + seconds
+        next_tick = start
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            profile.ticks += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = _stack(frame)
+                if not include_idle and _is_idle(frames[-1]):
+                    profile.idle_samples += 1
+                    continue
+                profile.add(names.get(ident, f"thread-{ident}"), frames)
+            next_tick += interval
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+        profile.elapsed = time.perf_counter() - start
+        return profile
+    finally:
+        _running.release()
+
+
+def is_running() -> bool:
+    return _running.locked()
+
+
+def _stack(frame) -> Tuple[FrameKey, ...]:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append((code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+
+def _is_idle(frame: FrameKey) -> bool:
+    return (os.path.basename(frame[0]), frame[2]) in IDLE_LEAVES
+
+
+def _short_path(filename: str) -> str:
+    """site-packages/... or the bare file name for repo/stdlib modules"""
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return os.path.basename(filename)
+
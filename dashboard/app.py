@@ -7,7 +7,7 @@ Runs alongside the Discord bot on a separate port
 when profiles are accessed, stale, or when players are seen in actions/online.
 """
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response
 from flask_cors import CORS
 import sqlite3
 from datetime import datetime, timedelta
@@ -19,10 +19,23 @@ import re
 import threading
 from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
+import json
+import urllib.error
+import urllib.request
+from urllib.parse import urlencode
 
 # Add parent directory to path for scraper import
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import compact_schema
+import db_domains
+import query_stats
+import metrics
+import cpu_profiler
+import epoch
+import raw_text_store
+import wal_checkpoint
+
 try:
     from scraper import Pro4KingsScraper
 
@@ -88,8 +101,13 @@ def get_db_path():
 
 def get_db_connection():
     """Get database connection with row factory"""
-    conn = sqlite3.connect(get_db_path(), timeout=10.0)
-    conn.row_factory = sqlite3.Row
+    conn = sqlite3.connect(
+        get_db_path(), timeout=10.0, factory=query_stats.TimedConnection
+    )
+    # Player IDs come back as str on both the legacy and the compact schema
+    conn.row_factory = compact_schema.row_factory
+    # Split databases: attach the domain files so every table resolves
+    db_domains.attach(conn, get_db_path())
     conn.execute("PRAGMA journal_mode=WAL")
     return conn
 
@@ -141,6 +159,11 @@ def _time_ago(dt: datetime) -> str:
 
 
 def _normalize_action(action: dict) -> dict:
+    if action.get("ts") is not None:
+        # Generated integer column - format without parsing the text timestamp
+        action["timestamp_display"] = epoch.format_epoch(action["ts"])
+        action["time_ago"] = epoch.time_ago(action["ts"])
+        return action
     ts = _parse_timestamp(action.get("timestamp"))
     if ts:
         action["timestamp_display"] = _format_timestamp(ts)
@@ -333,7 +356,8 @@ def _save_profile_to_db(profile: dict):
                 warnings = excluded.warnings,
                 played_hours = excluded.played_hours,
                 age_ic = excluded.age_ic,
-                last_profile_update = CURRENT_TIMESTAMP
+                last_profile_update = CURRENT_TIMESTAMP,
+                profile_fingerprint = NULL
         """,
             (
                 profile["player_id"],
@@ -661,11 +685,11 @@ def api_online_24h():
             LEFT JOIN online_players o ON le.player_id = o.player_id 
                 AND o.detected_online_at >= datetime('now', '-5 minutes')
             WHERE le.event_type = 'login'
-            AND le.timestamp >= ?
+            AND le.ts >= ?
             GROUP BY le.player_id
             ORDER BY is_currently_online DESC, last_activity DESC
         """,
-            (cutoff,),
+            (epoch.to_epoch(cutoff),),
         )
 
         players = [dict(row) for row in cursor.fetchall()]
@@ -848,11 +872,11 @@ def api_player(player_id):
             """
             SELECT * FROM actions 
             WHERE (player_id = ? OR target_player_id = ?)
-            AND timestamp >= ?
-            ORDER BY timestamp DESC
+            AND ts >= ?
+            ORDER BY ts DESC
             LIMIT 50
         """,
-            (player_id, player_id, cutoff_7d),
+            (player_id, player_id, epoch.to_epoch(cutoff_7d)),
         )
         actions = [_normalize_action(dict(row)) for row in cursor.fetchall()]
 
@@ -999,6 +1023,23 @@ def api_refresh_status():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/refresh-queue")
+def api_refresh_queue():
+    """🔥 Bot refresh scheduler: queue depth and profile age distribution"""
+    try:
+        import refresh_scheduler
+
+        conn = get_db_connection()
+        try:
+            stats = refresh_scheduler.get_queue_stats(conn.cursor())
+        finally:
+            conn.close()
+        return jsonify(stats)
+    except Exception as e:
+        logger.error(f"Error getting refresh queue stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/factions")
 def api_factions():
     """Get all factions with member counts - online count from online_players table"""
@@ -1143,33 +1184,31 @@ def api_activity_chart():
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # Get hourly action counts for last 24 hours
-        data = []
-        now = datetime.now()
-
-        for i in range(24, 0, -1):
-            hour_start = now - timedelta(hours=i)
-            hour_end = now - timedelta(hours=i - 1)
+        # Hourly action counts for last 24 hours, grouped on the ts index
+        start = epoch.now_epoch() - 24 * epoch.HOUR
+        cursor.execute(
+            """
+            SELECT (ts - ?) / 3600 as bucket, COUNT(*) as count FROM actions 
+            WHERE ts >= ? AND ts < ?
+            GROUP BY bucket
+        """,
+            (start, start, start + 24 * epoch.HOUR),
+        )
+        counts = {row["bucket"]: row["count"] for row in cursor.fetchall()}
 
-            cursor.execute(
-                """
-                SELECT COUNT(*) FROM actions 
-                WHERE timestamp >= ? AND timestamp < ?
-            """,
-                (hour_start, hour_end),
-            )
-            count = cursor.fetchone()[0]
+        conn.close()
 
+        data = []
+        for i in range(24):
+            count = counts.get(i, 0)
             data.append(
                 {
-                    "hour": hour_start.strftime("%H:%M"),
+                    "hour": epoch.format_epoch(start + i * epoch.HOUR, "%H:%M"),
                     "count": count,
                     "actions": count,  # Alias for backwards compatibility
                 }
             )
 
-        conn.close()
-
         return jsonify({"data": data})
     except Exception as e:
         logger.error(f"Error getting activity chart: {e}")
@@ -1200,14 +1239,14 @@ def api_admin_actions():
         placeholders = ",".join("?" * len(admin_types))
         cutoff = datetime.now() - timedelta(days=days)
 
-        query = f"SELECT * FROM actions WHERE action_type IN ({placeholders}) AND timestamp >= ?"
-        params = [*admin_types, cutoff]
+        query = f"SELECT * FROM actions WHERE action_type IN ({placeholders}) AND ts >= ?"
+        params = [*admin_types, epoch.to_epoch(cutoff)]
 
         if action_type:
             query += " AND action_type = ?"
             params.append(action_type)
 
-        query += " ORDER BY timestamp DESC LIMIT ?"
+        query += " ORDER BY ts DESC LIMIT ?"
         params.append(limit)
 
         cursor.execute(query, params)
@@ -1287,11 +1326,11 @@ def api_heists():
             FROM actions a
             LEFT JOIN player_profiles p ON a.player_id = p.player_id
             WHERE a.action_type = 'bank_heist_delivery'
-            AND a.timestamp >= ?
-            ORDER BY a.timestamp DESC
+            AND a.ts >= ?
+            ORDER BY a.ts DESC
             LIMIT ?
         """,
-            (cutoff, limit),
+            (epoch.to_epoch(cutoff), limit),
         )
 
         heists = [dict(row) for row in cursor.fetchall()]
@@ -1411,7 +1450,7 @@ def api_sessions(player_id):
                     ROW_NUMBER() OVER (ORDER BY timestamp ASC) as rn
                 FROM login_events
                 WHERE player_id = ?
-                AND timestamp >= ?
+                AND ts >= ?
             ),
             logouts_with_prev AS (
                 SELECT 
@@ -1443,7 +1482,7 @@ def api_sessions(player_id):
             ORDER BY lwp.logout_time DESC
             LIMIT 100
         """,
-            (player_id, cutoff),
+            (player_id, epoch.to_epoch(cutoff)),
         )
 
         sessions = [dict(row) for row in cursor.fetchall()]
@@ -1540,11 +1579,11 @@ def api_faction_actions(faction_name):
             FROM actions a
             LEFT JOIN player_profiles p ON a.player_id = p.player_id
             WHERE a.player_id IN ({placeholders})
-            AND a.timestamp >= ?
-            ORDER BY a.timestamp DESC
+            AND a.ts >= ?
+            ORDER BY a.ts DESC
             LIMIT ?
         """,
-            (*faction_player_ids, cutoff, limit),
+            (*faction_player_ids, epoch.to_epoch(cutoff), limit),
         )
 
         actions = [dict(row) for row in cursor.fetchall()]
@@ -1771,20 +1810,7 @@ def api_player_leaderboards():
                 a.player_id,
                 COALESCE(p.username, a.player_name) as player_name,
                 COUNT(*) as transfer_count,
-                SUM(
-                    CAST(
-                        REPLACE(REPLACE(REPLACE(
-                            CASE 
-                                WHEN a.action_detail LIKE '%$%' THEN 
-                                    SUBSTR(a.action_detail, 
-                                           INSTR(a.action_detail, 'Transferat ') + 11,
-                                           INSTR(SUBSTR(a.action_detail, INSTR(a.action_detail, 'Transferat ') + 11), '$') - 1
-                                    )
-                                ELSE '0'
-                            END,
-                        '.', ''), ',', ''), ' ', '')
-                    AS INTEGER)
-                ) as total_sent
+                COALESCE(SUM(a.amount), 0) as total_sent
             FROM actions a
             LEFT JOIN player_profiles p ON a.player_id = p.player_id
             WHERE a.action_type = 'money_transfer'
@@ -1803,7 +1829,8 @@ def api_player_leaderboards():
             SELECT 
                 a.target_player_id as player_id,
                 COALESCE(p.username, a.target_player_name) as player_name,
-                COUNT(*) as receive_count
+                COUNT(*) as receive_count,
+                COALESCE(SUM(a.amount), 0) as total_received
             FROM actions a
             LEFT JOIN player_profiles p ON a.target_player_id = p.player_id
             WHERE a.action_type = 'money_transfer'
@@ -1919,7 +1946,8 @@ def api_player_leaderboards():
             SELECT 
                 a.player_id,
                 COALESCE(p.username, a.player_name) as player_name,
-                COUNT(*) as gambling_wins
+                COUNT(*) as gambling_wins,
+                COALESCE(SUM(a.amount), 0) as total_won
             FROM actions a
             LEFT JOIN player_profiles p ON a.player_id = p.player_id
             WHERE a.action_type = 'gambling_win'
@@ -2034,38 +2062,35 @@ def api_login_activity():
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cutoff = datetime.now() - timedelta(hours=hours)
-
-        # Get hourly login/logout counts
-        data = []
-        now = datetime.now()
-
-        for i in range(hours, 0, -1):
-            hour_start = now - timedelta(hours=i)
-            hour_end = now - timedelta(hours=i - 1)
+        # Hourly login/logout counts in one pass over the ts index
+        start = epoch.now_epoch() - hours * epoch.HOUR
+        cursor.execute(
+            """
+            SELECT 
+                (ts - ?) / 3600 as bucket,
+                SUM(CASE WHEN event_type = 'login' THEN 1 ELSE 0 END) as logins,
+                SUM(CASE WHEN event_type = 'logout' THEN 1 ELSE 0 END) as logouts
+            FROM login_events 
+            WHERE ts >= ? AND ts < ?
+            GROUP BY bucket
+        """,
+            (start, start, start + hours * epoch.HOUR),
+        )
+        buckets = {row["bucket"]: row for row in cursor.fetchall()}
 
-            cursor.execute(
-                """
-                SELECT 
-                    SUM(CASE WHEN event_type = 'login' THEN 1 ELSE 0 END) as logins,
-                    SUM(CASE WHEN event_type = 'logout' THEN 1 ELSE 0 END) as logouts
-                FROM login_events 
-                WHERE timestamp >= ? AND timestamp < ?
-            """,
-                (hour_start, hour_end),
-            )
+        conn.close()
 
-            row = cursor.fetchone()
+        data = []
+        for i in range(hours):
+            row = buckets.get(i)
             data.append(
                 {
-                    "hour": hour_start.strftime("%Y-%m-%d %H:00"),
-                    "logins": row["logins"] or 0,
-                    "logouts": row["logouts"] or 0,
+                    "hour": epoch.format_epoch(start + i * epoch.HOUR, "%Y-%m-%d %H:00"),
+                    "logins": row["logins"] if row else 0,
+                    "logouts": row["logouts"] if row else 0,
                 }
             )
 
-        conn.close()
-
         return jsonify({"hours": hours, "data": data})
     except Exception as e:
         logger.error(f"Error getting login activity: {e}")
@@ -2081,33 +2106,109 @@ def api_actions_trend():
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        data = []
-        now = datetime.now()
+        # Daily counts grouped on the integer ts (local midnight boundaries)
+        today = epoch.now_epoch() // epoch.DAY
+        cursor.execute(
+            """
+            SELECT ts / 86400 as day, COUNT(*) as count FROM actions 
+            WHERE ts >= ? AND ts < ?
+            GROUP BY day
+        """,
+            ((today - days) * epoch.DAY, today * epoch.DAY),
+        )
+        counts = {row["day"]: row["count"] for row in cursor.fetchall()}
 
-        for i in range(days, 0, -1):
-            day_start = (now - timedelta(days=i)).replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
-            day_end = day_start + timedelta(days=1)
+        conn.close()
+
+        data = [
+            {
+                "date": epoch.format_epoch(day * epoch.DAY, "%Y-%m-%d"),
+                "count": counts.get(day, 0),
+            }
+            for day in range(today - days, today)
+        ]
+
+        return jsonify({"days": days, "data": data})
+    except Exception as e:
+        logger.error(f"Error getting actions trend: {e}")
+        return jsonify({"error": str(e)}), 500
 
+
+@app.route("/api/ingest-metrics")
+def api_ingest_metrics():
+    """Action feed lag / gap time series (one row per poll, bucketed for the chart)"""
+    try:
+        hours = max(1, min(request.args.get("hours", 24, type=int), 24 * 7))
+        # ~300 points per chart
+        bucket = max(60, hours * 3600 // 300)
+        since = epoch.now_epoch() - hours * epoch.HOUR
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
             cursor.execute(
                 """
-                SELECT COUNT(*) as count FROM actions 
-                WHERE timestamp >= ? AND timestamp < ?
+                SELECT (ts / ?) * ? AS bucket,
+                       COUNT(*) AS polls,
+                       SUM(new_items) AS new_items,
+                       SUM(gap) AS gaps,
+                       MIN(overlap) AS min_overlap,
+                       SUM(lag_avg * new_items) / NULLIF(SUM(CASE WHEN lag_avg IS NOT NULL
+                           THEN new_items END), 0) AS lag_avg,
+                       MAX(lag_max) AS lag_max,
+                       AVG(poll_interval) AS poll_interval
+                FROM ingest_metrics
+                WHERE ts >= ?
+                GROUP BY bucket
+                ORDER BY bucket
             """,
-                (day_start, day_end),
-            )
-
-            row = cursor.fetchone()
-            data.append(
-                {"date": day_start.strftime("%Y-%m-%d"), "count": row["count"] or 0}
+                (bucket, bucket, since),
             )
+            rows = cursor.fetchall()
+        except sqlite3.OperationalError:
+            rows = []  # Bot hasn't created the table yet
+        finally:
+            conn.close()
 
-        conn.close()
+        points = [
+            {
+                "time": epoch.format_epoch(row["bucket"], "%Y-%m-%d %H:%M"),
+                "polls": row["polls"],
+                "new_items": row["new_items"] or 0,
+                "gaps": row["gaps"] or 0,
+                "min_overlap": row["min_overlap"],
+                "lag_avg": round(row["lag_avg"], 1) if row["lag_avg"] is not None else None,
+                "lag_max": round(row["lag_max"], 1) if row["lag_max"] is not None else None,
+                "poll_interval": (
+                    round(row["poll_interval"], 1)
+                    if row["poll_interval"] is not None
+                    else None
+                ),
+            }
+            for row in rows
+        ]
+        lagged = [p for p in points if p["lag_avg"] is not None]
+        totals = {
+            "polls": sum(p["polls"] for p in points),
+            "new_items": sum(p["new_items"] for p in points),
+            "gaps": sum(p["gaps"] for p in points),
+            "lag_avg": (
+                round(
+                    sum(p["lag_avg"] * p["new_items"] for p in lagged)
+                    / max(1, sum(p["new_items"] for p in lagged)),
+                    1,
+                )
+                if lagged
+                else None
+            ),
+            "lag_max": max((p["lag_max"] for p in lagged), default=None),
+        }
 
-        return jsonify({"days": days, "data": data})
+        return jsonify(
+            {"hours": hours, "bucket_seconds": bucket, "points": points, "totals": totals}
+        )
     except Exception as e:
-        logger.error(f"Error getting actions trend: {e}")
+        logger.error(f"Error getting ingest metrics: {e}")
         return jsonify({"error": str(e)}), 500
 
 
@@ -2120,33 +2221,27 @@ def api_peak_times():
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cutoff = datetime.now() - timedelta(days=days)
+        cutoff = epoch.now_epoch() - days * epoch.DAY
 
-        # Get all login events in the period
+        # Count logins per (weekday, hour) in SQL - no per-row parsing
         cursor.execute(
-            """
-            SELECT timestamp FROM login_events 
-            WHERE event_type = 'login' AND timestamp >= ?
+            f"""
+            SELECT 
+                {epoch.SQL_WEEKDAY.format(col="ts")} as weekday,
+                {epoch.SQL_HOUR_OF_DAY.format(col="ts")} as hour,
+                COUNT(*) as count
+            FROM login_events 
+            WHERE event_type = 'login' AND ts >= ?
+            GROUP BY weekday, hour
         """,
             (cutoff,),
         )
 
-        # Build heatmap: 7 days x 24 hours
+        # Build heatmap: 7 days x 24 hours (0=Monday, 6=Sunday)
         heatmap = [[0 for _ in range(24)] for _ in range(7)]
 
         for row in cursor.fetchall():
-            ts = row["timestamp"]
-            if isinstance(ts, str):
-                try:
-                    # Both Pro4Kings panel and dashboard use Romania local time
-                    # Just strip 'Z' suffix instead of treating it as UTC
-                    ts = datetime.fromisoformat(ts.rstrip("Z"))
-                except:
-                    continue
-            if ts:
-                day_of_week = ts.weekday()  # 0=Monday, 6=Sunday
-                hour = ts.hour
-                heatmap[day_of_week][hour] += 1
+            heatmap[row["weekday"]][row["hour"]] = row["count"]
 
         conn.close()
 
@@ -2259,9 +2354,9 @@ def api_compare_players():
             cursor.execute(
                 """
                 SELECT COUNT(*) as count FROM actions 
-                WHERE (player_id = ? OR target_player_id = ?) AND timestamp >= ?
+                WHERE (player_id = ? OR target_player_id = ?) AND ts >= ?
             """,
-                (pid, pid, cutoff),
+                (pid, pid, epoch.to_epoch(cutoff)),
             )
             profile["actions_30d"] = cursor.fetchone()["count"]
 
@@ -2269,9 +2364,9 @@ def api_compare_players():
             cursor.execute(
                 """
                 SELECT COUNT(*) as count FROM login_events 
-                WHERE player_id = ? AND event_type = 'login' AND timestamp >= ?
+                WHERE player_id = ? AND event_type = 'login' AND ts >= ?
             """,
-                (pid, cutoff),
+                (pid, epoch.to_epoch(cutoff)),
             )
             profile["sessions_30d"] = cursor.fetchone()["count"]
 
@@ -2301,13 +2396,79 @@ def api_compare_players():
         return jsonify({"error": str(e)}), 500
 
 
+def bot_metrics_url() -> str:
+    port = os.getenv("METRICS_PORT", "9108")
+    return os.getenv("BOT_METRICS_URL", f"http://127.0.0.1:{port}/metrics")
+
+
+def bot_metrics_status(families) -> dict:
+    """Task health + scraper counters from the bot's /metrics families"""
+    tasks = {}
+    for labels, running in families.get("p4k_task_running", []):
+        name = labels.get("task")
+        errors = metrics.value(families, "p4k_task_error_count", 0, task=name)
+        last_run = metrics.value(
+            families, "p4k_task_last_run_timestamp_seconds", task=name
+        )
+        runs = metrics.value(families, "p4k_task_duration_seconds_count", 0, task=name)
+        total = metrics.value(families, "p4k_task_duration_seconds_sum", 0, task=name)
+        if last_run is None:
+            task_status = "unknown"
+        elif errors >= 5:
+            task_status = "error"
+        elif errors > 0:
+            task_status = "warning"
+        else:
+            task_status = "healthy"
+        tasks[name] = {
+            "last_run": datetime.fromtimestamp(last_run).isoformat() if last_run else None,
+            "is_running": bool(running),
+            "error_count": int(errors),
+            "status": task_status,
+            "runs": int(runs),
+            "avg_duration_s": round(total / runs, 2) if runs else None,
+        }
+
+    responses = {
+        labels.get("status"): count
+        for labels, count in families.get("p4k_scraper_responses_total", [])
+    }
+    scraper = {
+        "success_count": int(
+            sum(count for code, count in responses.items() if code.startswith("2"))
+        ),
+        "error_503_count": int(responses.get("503", 0)),
+        "error_429_count": int(responses.get("429", 0)),
+        "timeouts": int(responses.get("timeout", 0)),
+        "adaptive_delay": metrics.value(
+            families, "p4k_scraper_adaptive_delay_seconds", 0
+        ),
+        "actions_found": int(metrics.value(families, "p4k_actions_ingested_total", 0)),
+        "latency_p50_s": metrics.value(
+            families, "p4k_scraper_request_seconds", quantile="0.5"
+        ),
+        "latency_p99_s": metrics.value(
+            families, "p4k_scraper_request_seconds", quantile="0.99"
+        ),
+    }
+    started = metrics.value(families, "p4k_process_start_time_seconds")
+    return {
+        "tasks": tasks,
+        "scraper": scraper,
+        "uptime": (
+            str(timedelta(seconds=int(datetime.now().timestamp() - started)))
+            if started
+            else None
+        ),
+    }
+
+
 @app.route("/api/bot-status")
 def api_bot_status():
     """Get bot health status - detects connectivity from recent database activity"""
     try:
         import json
         import psutil
-        import tracemalloc
 
         status = {
             "bot_connected": False,
@@ -2398,28 +2559,32 @@ def api_bot_status():
             except:
                 pass
 
+        # 📊 Live task health from the bot's /metrics endpoint (same host by default)
+        families = metrics.fetch(bot_metrics_url())
+        if families:
+            status.update(bot_metrics_status(families))
+            status["bot_connected"] = True
+            status["metrics_source"] = "endpoint"
+
         # 🔥 ENHANCED: Get comprehensive memory info
         try:
             process = psutil.Process(os.getpid())
             mem_info = process.memory_info()
 
-            # Get tracemalloc data if available
+            # Peak RSS from the kernel (KiB on Linux) - no allocation tracing needed
+            peak_rss = mem_info.rss
             try:
-                tracemalloc.start()
-            except:
-                pass  # Already started
+                import resource
 
-            current_traced, peak_traced = 0, 0
-            try:
-                current_traced, peak_traced = tracemalloc.get_traced_memory()
-            except:
-                pass
+                peak_rss = max(
+                    peak_rss, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+                )
+            except ImportError:
+                pass  # Windows
 
             status["memory"] = {
                 "current_mb": round(mem_info.rss / 1024 / 1024, 1),
-                "peak_mb": round(peak_traced / 1024 / 1024, 1)
-                if peak_traced > 0
-                else round(mem_info.rss / 1024 / 1024, 1),
+                "peak_mb": round(peak_rss / 1024 / 1024, 1),
                 "percent": round(
                     (mem_info.rss / psutil.virtual_memory().total) * 100, 1
                 ),
@@ -2468,7 +2633,24 @@ def api_bot_status():
             db_path = get_db_path()
             db_size_mb = 0
             if os.path.exists(db_path):
-                db_size_mb = round(os.path.getsize(db_path) / 1024 / 1024, 1)
+                # Main file plus the domain files of a split database
+                db_size_mb = round(
+                    sum(
+                        os.path.getsize(path)
+                        for path in db_domains.database_files(db_path)
+                    )
+                    / 1024
+                    / 1024,
+                    1,
+                )
+
+            # WAL size + last checkpoint recorded by the bot
+            wal = wal_checkpoint.load_stats(db_path)
+            last_checkpoint = wal["last_checkpoint"] or {}
+            wal_bytes = sum(
+                wal_checkpoint.wal_size(path)
+                for path in db_domains.database_files(db_path)
+            )
 
             status["database"] = {
                 "total_players": total_players,
@@ -2476,6 +2658,11 @@ def api_bot_status():
                 "online_count": online_count,
                 "size_mb": db_size_mb,
                 "path": db_path,
+                "wal_size_mb": round(wal_bytes / 1024 / 1024, 1),
+                "last_checkpoint": last_checkpoint.get("at"),
+                "last_checkpoint_mode": last_checkpoint.get("mode"),
+                "last_checkpoint_ms": round(last_checkpoint.get("seconds", 0) * 1000),
+                "last_checkpoint_busy": last_checkpoint.get("busy"),
             }
 
             # Also set at root level for backward compatibility
@@ -2582,11 +2769,11 @@ def api_vip_events():
             FROM login_events le
             LEFT JOIN player_profiles pp ON le.player_id = pp.player_id
             WHERE le.player_id IN ({placeholders})
-            AND le.timestamp >= ?
-            ORDER BY le.timestamp DESC
+            AND le.ts >= ?
+            ORDER BY le.ts DESC
             LIMIT 20
         """,
-            (*vip_ids, cutoff),
+            (*vip_ids, epoch.to_epoch(cutoff)),
         )
 
         events = [dict(row) for row in cursor.fetchall()]
@@ -2703,6 +2890,73 @@ def api_admin_login_stats():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/admin/db-stats")
+def api_admin_db_stats():
+    """Slowest dashboard SQL statements (by fingerprint) since start or reset"""
+    try:
+        limit = min(request.args.get("limit", 20, type=int), 100)
+        sort = request.args.get("sort", "total_ms")
+        if sort not in ("total_ms", "max_ms", "avg_ms", "calls"):
+            sort = "total_ms"
+        if request.args.get("reset") == "true":
+            query_stats.STATS.reset()
+        return jsonify(
+            {
+                "summary": query_stats.STATS.summary(),
+                "top": query_stats.STATS.top(limit, sort),
+            }
+        )
+    except Exception as e:
+        logger.error(f"Error getting db stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/admin/profile")
+def api_admin_profile():
+    """Sample the bot (default) or this dashboard process for N seconds
+
+    ?seconds=10&interval_ms=5&idle=false&target=bot|dashboard&format=json|collapsed
+    """
+    try:
+        seconds = max(1, min(request.args.get("seconds", 10, type=int), 60))
+        interval_ms = request.args.get("interval_ms", 5, type=float)
+        idle = request.args.get("idle", "false").lower() == "true"
+        target = request.args.get("target", "bot")
+
+        if target == "dashboard":
+            try:
+                profile = cpu_profiler.sample(seconds, interval_ms / 1000, idle).to_dict()
+            except RuntimeError as e:
+                return jsonify({"error": str(e)}), 409
+        else:
+            # Bot process: its metrics server exposes /debug/profile next to /metrics
+            url = bot_metrics_url().rsplit("/metrics", 1)[0] + "/debug/profile?" + urlencode(
+                {"seconds": seconds, "interval_ms": interval_ms, "idle": str(idle).lower()}
+            )
+            try:
+                with urllib.request.urlopen(url, timeout=seconds + 15) as response:
+                    profile = json.loads(response.read().decode())
+            except urllib.error.HTTPError as e:
+                return jsonify(json.loads(e.read().decode() or "{}")), e.code
+            except (urllib.error.URLError, OSError) as e:
+                return jsonify({"error": f"Bot metrics endpoint unreachable: {e}"}), 503
+
+        if request.args.get("format") == "collapsed":
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            return Response(
+                profile["collapsed"],
+                mimetype="text/plain",
+                headers={
+                    "Content-Disposition": f"attachment; filename=cpu_profile_{target}_{stamp}.collapsed"
+                },
+            )
+        profile["target"] = target
+        return jsonify(profile)
+    except Exception as e:
+        logger.error(f"Error profiling: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/admin/cleanup-login-events", methods=["POST"])
 def api_admin_cleanup_login_events():
     """
@@ -2882,10 +3136,10 @@ def api_cleanup_reparsed():
                 """
                 SELECT action_type, COUNT(*) as count
                 FROM actions
-                WHERE raw_text = ?
+                WHERE raw_text IN (?, ?)
                 GROUP BY action_type
             """,
-                (pattern,),
+                raw_text_store.match_values(pattern),
             )
 
             types = {row["action_type"]: row["count"] for row in cursor.fetchall()}
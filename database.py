@@ -1,19 +1,64 @@
 import sqlite3
+import hashlib
+import itertools
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import logging
 from contextlib import contextmanager
 import time
 import asyncio
 import os
 
+import action_archive
+import action_values
+import compact_schema
+import db_domains
+import db_executor
+import epoch
+import query_stats
+import raw_text_store
+import refresh_scheduler
+
 logger = logging.getLogger(__name__)
 
+# Retention purge: rows per DELETE chunk, pause between chunks (seconds)
+PURGE_CHUNK_SIZE = 5000
+PURGE_PAUSE = 0.2
+VACUUM_PAGES_PER_STEP = 2000  # ~8 MB per incremental_vacuum step at 4 KB pages
+
+# Still-online players get detected_online_at / last_seen advanced once per
+# bucket (seconds, aligned to the clock). Bucket + SCRAPE_ONLINE_INTERVAL must
+# stay under the 5-minute "currently online" window readers and the stale
+# cleanup use.
+ONLINE_REFRESH_BUCKET = 180
+
+# maintenance_state key: last action id the value backfill has looked at
+BACKFILL_MARKER = "action_values_backfill_id"
+
 
 class Database:
     """Enhanced async-safe database manager with non-blocking operations"""
 
-    def __init__(self, db_path: Optional[str] = None):
+    DEFAULT_RETENTION_DAYS = {
+        "actions": 90,
+        "login_events": 30,
+        "profile_history": 180,
+        "ingest_metrics": 7,
+    }
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        mark_coalesce_window: int = 600,
+        compress_raw_text: bool = False,
+        archive_after_days: int = 0,
+        archive_dir: Optional[str] = None,
+        retention_days: Optional[Dict[str, int]] = None,
+        split_domains: bool = False,
+        read_workers: int = 4,
+        max_pending_jobs: int = 200,
+        slow_query_ms: Optional[float] = None,
+    ):
         # 🔥 Railway Volume Support: Use /data if available, otherwise default path
         if db_path is None:
             if os.path.exists("/data"):
@@ -26,15 +71,48 @@ class Database:
         self.db_path = db_path
         logger.info(f"📁 Database path: {self.db_path}")
 
+        # 🔥 Coalescing state for mark_players_for_update:
+        # (player_id, reason) -> (monotonic time, name)
+        self.mark_coalesce_window = mark_coalesce_window
+        self._recent_marks: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._marks_pruned_at = time.monotonic()
+
+        # 🗜️ Store new raw_text dictionary-compressed (readers decode transparently)
+        self.compress_raw_text = compress_raw_text
+
+        # 📦 Hot/cold split: actions older than this move to monthly archives (0 = off)
+        self.archive_after_days = archive_after_days
+        self.archive_dir = action_archive.archive_dir_for(db_path, archive_dir)
+
+        # 🧹 Retention (days, 0 = keep forever): actions, login_events, profile_history
+        self.retention_days = {**self.DEFAULT_RETENTION_DAYS, **(retention_days or {})}
+
+        # 🗂️ Split into per-domain files (see db_domains.py) - applied to new databases
+        self.split_domains = split_domains
+
+        # 🧵 Own threads for DB work: read pool + one writer per file (see db_executor.py)
+        self.executor = db_executor.DBExecutor(read_workers, max_pending_jobs)
+
+        # 🐢 Statement timing for every connection (see query_stats.py)
+        if slow_query_ms is not None:
+            query_stats.STATS.slow_ms = slow_query_ms
+
         # Initialize database synchronously on startup (before event loop)
         self._init_database_sync()
 
+        # Domain files in use - each gets its own writer thread (see run_write)
+        self.split_schemas = {
+            schema
+            for schema in db_domains.DOMAINS
+            if os.path.exists(db_domains.domain_path(self.db_path, schema))
+        }
+
     @contextmanager
     def get_connection(self, retries: int = 3):
         """
         Context manager for database connections with retry logic
 
-        ⚠️ WARNING: This is SYNCHRONOUS and should only be called via asyncio.to_thread()
+        ⚠️ WARNING: This is SYNCHRONOUS and should only be called via run_read()/run_write()
         """
         conn = None
         last_error = None
@@ -42,16 +120,21 @@ class Database:
         for attempt in range(retries):
             try:
                 # 🔥 Reduced timeout from 60s to 10s to prevent long blocks
-                conn = sqlite3.connect(self.db_path, timeout=10.0)
-                conn.row_factory = sqlite3.Row
+                conn = sqlite3.connect(
+                    self.db_path, timeout=10.0, factory=query_stats.TimedConnection
+                )
+                conn.row_factory = compact_schema.row_factory
+                # 🗂️ Domain files (if split) - unqualified table names resolve across them
+                attached = db_domains.attach(conn, self.db_path)
 
-                # 🔥 Enable WAL mode for better concurrency
+                # 🔥 Enable WAL mode for better concurrency (applies to attached files too)
                 conn.execute("PRAGMA journal_mode=WAL")
                 conn.execute("PRAGMA busy_timeout=10000")  # 10 second busy timeout
                 # 🔥 Optimize for speed
-                conn.execute(
-                    "PRAGMA synchronous=NORMAL"
-                )  # Faster than FULL, still safe with WAL
+                for schema in ["main"] + attached:
+                    conn.execute(
+                        f"PRAGMA {schema}.synchronous=NORMAL"
+                    )  # Faster than FULL, still safe with WAL
                 conn.execute("PRAGMA cache_size=-64000")  # 64MB cache
 
                 yield conn
@@ -99,9 +182,17 @@ class Database:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
 
+                # 🧹 New databases use incremental auto_vacuum so retention purges
+                # can shrink the file (must be set before the first table exists)
+                cursor.execute("SELECT COUNT(*) FROM sqlite_master")
+                if cursor.fetchone()[0] == 0:
+                    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                    cursor.execute("VACUUM")
+
                 # 🔥 FIXED: Removed trailing comma and UNIQUE constraint on username
                 # Multiple players can have the same name with different IDs
-                cursor.execute(
+                self._create(
+                    cursor,
                     """
                     CREATE TABLE IF NOT EXISTS player_profiles (
                         player_id TEXT PRIMARY KEY,
@@ -121,13 +212,22 @@ class Database:
                         -- Metadata
                         total_actions INTEGER DEFAULT 0,
                         last_profile_update TIMESTAMP,
-                        priority_update BOOLEAN DEFAULT FALSE
+                        priority_update BOOLEAN DEFAULT FALSE,
+
+                        -- Refresh scheduling (see refresh_scheduler.py)
+                        next_refresh_at TIMESTAMP,
+                        refresh_score REAL,
+                        last_activity_at TIMESTAMP,
+                        profile_checks INTEGER DEFAULT 0,
+                        profile_changes INTEGER DEFAULT 0,
+                        profile_fingerprint TEXT
                     )
-                """
+                """,
                 )
 
                 # Actions table - INDEFINITE STORAGE
-                cursor.execute(
+                self._create(
+                    cursor,
                     """
                     CREATE TABLE IF NOT EXISTS actions (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -151,14 +251,20 @@ class Database:
                         -- Timestamp and raw data
                         timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         raw_text TEXT,
+                        ts INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', timestamp) AS INTEGER)) VIRTUAL,
+
+                        -- Money fields (extracted at ingest)
+                        amount INTEGER,
+                        fee INTEGER,
                         
                         FOREIGN KEY (player_id) REFERENCES player_profiles(player_id)
                     )
-                """
+                """,
                 )
 
                 # Login/Logout events
-                cursor.execute(
+                self._create(
+                    cursor,
                     """
                     CREATE TABLE IF NOT EXISTS login_events (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -167,14 +273,16 @@ class Database:
                         event_type TEXT NOT NULL CHECK(event_type IN ('login', 'logout')),
                         timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         session_duration_seconds INTEGER,
+                        ts INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', timestamp) AS INTEGER)) VIRTUAL,
                         
                         FOREIGN KEY (player_id) REFERENCES player_profiles(player_id)
                     )
-                """
+                """,
                 )
 
                 # Faction rank history
-                cursor.execute(
+                self._create(
+                    cursor,
                     """
                     CREATE TABLE IF NOT EXISTS rank_history (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -187,11 +295,12 @@ class Database:
                         
                         FOREIGN KEY (player_id) REFERENCES player_profiles(player_id)
                     )
-                """
+                """,
                 )
 
                 # Profile change history
-                cursor.execute(
+                self._create(
+                    cursor,
                     """
                     CREATE TABLE IF NOT EXISTS profile_history (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -203,11 +312,12 @@ class Database:
                         
                         FOREIGN KEY (player_id) REFERENCES player_profiles(player_id)
                     )
-                """
+                """,
                 )
 
                 # Banned players
-                cursor.execute(
+                self._create(
+                    cursor,
                     """
                     CREATE TABLE IF NOT EXISTS banned_players (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -224,11 +334,12 @@ class Database:
                         
                         UNIQUE(player_id, ban_date)
                     )
-                """
+                """,
                 )
 
                 # Online players snapshot
-                cursor.execute(
+                self._create(
+                    cursor,
                     """
                     CREATE TABLE IF NOT EXISTS online_players (
                         player_id TEXT PRIMARY KEY,
@@ -237,11 +348,12 @@ class Database:
                         
                         FOREIGN KEY (player_id) REFERENCES player_profiles(player_id)
                     )
-                """
+                """,
                 )
 
                 # Scan progress table
-                cursor.execute(
+                self._create(
+                    cursor,
                     """
                     CREATE TABLE IF NOT EXISTS scan_progress (
                         id INTEGER PRIMARY KEY CHECK(id = 1),
@@ -250,7 +362,36 @@ class Database:
                         error_count INTEGER DEFAULT 0,
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
-                """
+                """,
+                )
+
+                # 📈 One row per action poll: feed completeness / freshness (action_pipeline.py)
+                self._create(
+                    cursor,
+                    """
+                    CREATE TABLE IF NOT EXISTS ingest_metrics (
+                        id INTEGER PRIMARY KEY,
+                        ts INTEGER NOT NULL,
+                        snapshot_size INTEGER,
+                        new_items INTEGER,
+                        overlap INTEGER,
+                        gap BOOLEAN DEFAULT FALSE,
+                        lag_avg REAL,
+                        lag_max REAL,
+                        poll_interval REAL
+                    )
+                """,
+                )
+
+                # 🔧 Progress markers for resumable maintenance jobs (e.g. the value backfill)
+                self._create(
+                    cursor,
+                    """
+                    CREATE TABLE IF NOT EXISTS maintenance_state (
+                        name TEXT PRIMARY KEY,
+                        value INTEGER
+                    )
+                """,
                 )
 
                 # Initialize scan_progress if empty
@@ -263,193 +404,463 @@ class Database:
                     """
                     )
 
+                # 🔥 Add columns introduced after the initial schema to existing databases
+                added = self._ensure_columns(
+                    cursor,
+                    "player_profiles",
+                    {
+                        "next_refresh_at": "TIMESTAMP",
+                        "refresh_score": "REAL",
+                        "last_activity_at": "TIMESTAMP",
+                        "profile_checks": "INTEGER DEFAULT 0",
+                        "profile_changes": "INTEGER DEFAULT 0",
+                        "profile_fingerprint": "TEXT",
+                    },
+                )
+                if "next_refresh_at" in added:
+                    # Carry over the legacy priority queue into the scheduler
+                    cursor.execute(
+                        """
+                        UPDATE player_profiles SET next_refresh_at = CURRENT_TIMESTAMP
+                        WHERE priority_update = TRUE
+                    """
+                    )
+
+                # 🗜️ Migrated databases keep actions in action_log behind a view
+                compact = compact_schema.is_compact(cursor)
+                actions_table = compact_schema.actions_table(cursor)
+                if self._ensure_columns(
+                    cursor, actions_table, compact_schema.ACTION_COLUMNS
+                ) and compact:
+                    compact_schema.create_actions_view(cursor)
+                # ⏱️ Integer epoch twin of login_events.timestamp (generated, indexed)
+                self._ensure_columns(cursor, "login_events", {"ts": epoch.TS_COLUMN_SQL})
+
                 # Create indexes for performance
-                indexes = [
-                    "CREATE INDEX IF NOT EXISTS idx_actions_player ON actions(player_id)",
-                    "CREATE INDEX IF NOT EXISTS idx_actions_target ON actions(target_player_id)",
-                    "CREATE INDEX IF NOT EXISTS idx_actions_timestamp ON actions(timestamp)",
-                    "CREATE INDEX IF NOT EXISTS idx_actions_type ON actions(action_type)",
-                    "CREATE INDEX IF NOT EXISTS idx_actions_detail ON actions(action_detail)",
+                indexes = compact_schema.action_index_statements(compact) + [
                     "CREATE INDEX IF NOT EXISTS idx_login_events_player ON login_events(player_id)",
                     "CREATE INDEX IF NOT EXISTS idx_login_events_timestamp ON login_events(timestamp)",
+                    "CREATE INDEX IF NOT EXISTS idx_login_events_ts ON login_events(ts)",
+                    "CREATE INDEX IF NOT EXISTS idx_login_events_type_ts ON login_events(event_type, ts)",
                     "CREATE INDEX IF NOT EXISTS idx_players_online ON player_profiles(is_online)",
                     "CREATE INDEX IF NOT EXISTS idx_players_faction ON player_profiles(faction)",
                     "CREATE INDEX IF NOT EXISTS idx_players_priority ON player_profiles(priority_update)",
+                    "CREATE INDEX IF NOT EXISTS idx_players_next_refresh ON player_profiles(next_refresh_at)",
                     "CREATE INDEX IF NOT EXISTS idx_rank_history_player ON rank_history(player_id)",
                     "CREATE INDEX IF NOT EXISTS idx_rank_history_current ON rank_history(is_current)",
                     "CREATE INDEX IF NOT EXISTS idx_profile_history_player ON profile_history(player_id)",
                     "CREATE INDEX IF NOT EXISTS idx_banned_active ON banned_players(is_active)",
                     "CREATE INDEX IF NOT EXISTS idx_online_players_detected ON online_players(detected_online_at)",
+                    "CREATE INDEX IF NOT EXISTS idx_ingest_metrics_ts ON ingest_metrics(ts)",
                 ]
 
                 for index_sql in indexes:
-                    cursor.execute(index_sql)
+                    self._create(cursor, index_sql)
+
+                fresh = False
+                if not compact:
+                    cursor.execute(
+                        "SELECT (SELECT COUNT(*) FROM player_profiles) + (SELECT COUNT(*) FROM actions)"
+                    )
+                    fresh = cursor.fetchone()[0] == 0
 
                 conn.commit()
 
+            # 🗜️ New databases start on the compact layout (instant while empty);
+            # existing ones are migrated online with `python compact_schema.py --execute`
+            if fresh:
+                compact_schema.migrate(self.db_path, execute=True, log=logger.debug)
+                logger.info("🗜️ Created compact schema (INTEGER player IDs, action_types)")
+                if self.split_domains:
+                    db_domains.split_database(self.db_path, execute=True, log=logger.debug)
+                    files = db_domains.database_files(self.db_path)
+                    logger.info(f"🗂️ Split into domain files: {', '.join(files)}")
+            elif not compact:
+                logger.warning(
+                    "⚠️ Legacy TEXT-key schema - run `python compact_schema.py --execute` "
+                    "to migrate to INTEGER player IDs"
+                )
+
+            if self.split_domains and not fresh:
+                with self.get_connection() as conn:
+                    unsplit = db_domains.table_schema(conn.cursor(), "action_log") == "main"
+                if unsplit:
+                    logger.warning(
+                        "⚠️ DATABASE_SPLIT is on but tables are still in one file - stop the "
+                        "bot and run `python db_domains.py --execute` to split"
+                    )
+
             logger.info("✅ Database initialized successfully")
 
         except Exception as e:
             logger.error(f"❌ Database initialization failed: {e}", exc_info=True)
             raise
 
-    # 🔥 ASYNC WRAPPER: All public methods now use asyncio.to_thread()
+    @staticmethod
+    def _create(cursor, sql: str) -> None:
+        """CREATE ... IF NOT EXISTS in the schema (domain file) the table lives in"""
+        cursor.execute(db_domains.qualify(cursor, sql))
+
+    @staticmethod
+    def _ensure_columns(cursor, table: str, columns: Dict[str, str]) -> List[str]:
+        """Add missing columns to an existing table, returns names of added columns"""
+        return compact_schema.add_missing_columns(cursor, table, columns)
+
+    # 🔥 ASYNC WRAPPER: All public methods run their _sync half on the DB executor
+
+    async def run_read(self, fn, *args, **kwargs):
+        """Run a blocking read on the DB read pool"""
+        return await self.executor.run(db_executor.READ, fn, *args, **kwargs)
 
-    def _save_player_profile_sync(self, profile) -> None:
+    async def run_write(self, fn, *args, domain: str = "main", **kwargs):
+        """Run a blocking write on the writer thread of its database file
+
+        `domain` is the db_domains schema the write goes to. Writes that
+        touch several domains stay on "main", so two cross-file transactions
+        never wait on each other's locks. Unsplit databases have one file
+        and one writer.
+        """
+        writer = domain if domain in self.split_schemas else "main"
+        return await self.executor.run(
+            db_executor.WRITE, fn, *args, writer=writer, **kwargs
+        )
+
+    def get_executor_stats(self) -> Dict:
+        """Queue wait / run time per method and pending jobs"""
+        return self.executor.stats()
+
+    def get_query_stats(self, limit: int = 10, sort: str = "total_ms") -> Dict:
+        """Top statements by fingerprint (see query_stats.py)"""
+        return {
+            "summary": query_stats.STATS.summary(),
+            "top": query_stats.STATS.top(limit, sort),
+        }
+
+    def _save_player_profile_sync(self, profile) -> bool:
         """🔥 UPDATED SYNC: Save/update player profile with change tracking (removed 5 fields)"""
+        return self._save_player_profiles_bulk_sync([profile]) > 0
+
+    async def save_player_profile(self, profile) -> bool:
+        """ASYNC: Save/update player profile
+
+        Returns True if the profile is new or a tracked field changed, False
+        if nothing or only presence (is_online / last_seen) changed
+        """
+        return await self.run_write(self._save_player_profile_sync, profile)
+
+    def _save_player_profiles_bulk_sync(self, profiles: List[Dict]) -> int:
+        """SYNC: Save a batch of scraped profiles in one transaction
+
+        Old rows for the whole batch are read with a single IN (...) query,
+        rank_history/profile_history diffs are computed in memory and every
+        write goes through executemany. Returns the number of profiles that
+        are new or whose tracked fields (_profile_changed) differ - the same
+        notion of change the refresh scheduler uses. Unchanged fingerprints
+        only get rescheduled; presence-only changes are written but not counted.
+        """
+        # Last occurrence wins if an ID appears twice in one batch
+        by_id = {}
+        for profile in profiles:
+            if profile:
+                by_id[str(profile["player_id"])] = profile
+        if not by_id:
+            return 0
+
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
 
-                # Get current values to detect changes (removed level, respect_points from SELECT)
-                cursor.execute(
-                    """
-                    SELECT faction, faction_rank, job, warnings
-                    FROM player_profiles WHERE player_id = ?
-                """,
-                    (profile["player_id"],),
-                )
-                old_data = cursor.fetchone()
+                # 🔥 One query for all old rows (chunked to stay under SQLite's variable limit)
+                old_rows = {}
+                player_ids = list(by_id)
+                for start in range(0, len(player_ids), 500):
+                    chunk = player_ids[start : start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor.execute(
+                        f"""
+                        SELECT player_id, faction, faction_rank, job, warnings,
+                               profile_fingerprint, last_profile_update,
+                               profile_checks, profile_changes,
+                               (julianday('now') - julianday(last_activity_at)) * 24
+                                   AS hours_since_activity
+                        FROM player_profiles WHERE player_id IN ({placeholders})
+                    """,
+                        chunk,
+                    )
+                    for row in cursor.fetchall():
+                        old_rows[row["player_id"]] = row
 
-                username = profile.get("player_name") or profile.get(
-                    "username", f"Player_{profile['player_id']}"
-                )
-                last_seen = profile.get("last_connection") or profile.get(
-                    "last_seen", datetime.now()
-                )
+                touch_rows = []
+                upsert_rows = []
+                changed = 0
+                rank_close_rows = []
+                rank_insert_rows = []
+                history_rows = []
 
-                # 🔥 UPDATED: Insert or update player (removed 5 fields: level, respect_points, phone_number, vehicles_count, properties_count)
-                cursor.execute(
-                    """
-                    INSERT INTO player_profiles (
-                        player_id, username, is_online, last_seen,
-                        faction, faction_rank, job, warnings,
-                        played_hours, age_ic,
-                        last_profile_update
+                for player_id, profile in by_id.items():
+                    old_data = old_rows.get(player_id)
+
+                    username = profile.get("player_name") or profile.get(
+                        "username", f"Player_{player_id}"
+                    )
+                    last_seen = profile.get("last_connection") or profile.get(
+                        "last_seen", datetime.now()
                     )
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                    ON CONFLICT(player_id) DO UPDATE SET
-                        username = excluded.username,
-                        is_online = excluded.is_online,
-                        last_seen = excluded.last_seen,
-                        faction = excluded.faction,
-                        faction_rank = excluded.faction_rank,
-                        job = excluded.job,
-                        warnings = excluded.warnings,
-                        played_hours = excluded.played_hours,
-                        age_ic = excluded.age_ic,
-                        last_profile_update = CURRENT_TIMESTAMP
-                """,
-                    (
-                        profile["player_id"],
-                        username,
-                        profile.get("is_online", False),
-                        last_seen,
-                        profile.get("faction"),
-                        profile.get("faction_rank"),
-                        profile.get("job"),
-                        profile.get("warns") or profile.get("warnings"),
-                        profile.get("played_hours"),
-                        profile.get("age_ic"),
-                    ),
-                )
 
-                # Track faction rank changes
-                if old_data:
-                    old_faction = old_data["faction"]
-                    old_rank = old_data["faction_rank"]
-                    new_faction = profile.get("faction")
-                    new_rank = profile.get("faction_rank")
-
-                    # 🔥 FIXED: Track rank changes even when old_rank is NULL
-                    # This enables /promotions to detect first rank assignments
-                    if new_faction and new_faction not in (
-                        None,
-                        "",
-                        "Civil",
-                        "Fără",
-                        "None",
-                        "Fara",
-                        "-",
-                        "N/A",
-                    ):
-                        # Check if rank actually changed (including NULL -> rank)
-                        if new_rank and new_rank not in (None, "", "-", "N/A"):
-                            if old_rank != new_rank:
-                                # End previous rank if it exists
-                                if old_rank:
-                                    cursor.execute(
-                                        """
-                                        UPDATE rank_history
-                                        SET rank_lost = CURRENT_TIMESTAMP, is_current = FALSE
-                                        WHERE player_id = ? AND is_current = TRUE
-                                    """,
-                                        (profile["player_id"],),
-                                    )
-
-                                # Insert new rank in rank_history
-                                cursor.execute(
-                                    """
-                                    INSERT INTO rank_history (player_id, faction, rank_name, is_current)
-                                    VALUES (?, ?, ?, TRUE)
-                                """,
-                                    (profile["player_id"], new_faction, new_rank),
-                                )
-
-                                # 🔥 ALSO track in profile_history for /promotions command
-                                cursor.execute(
-                                    """
-                                    INSERT INTO profile_history (player_id, field_name, old_value, new_value)
-                                    VALUES (?, 'faction_rank', ?, ?)
-                                """,
-                                    (
-                                        profile["player_id"],
-                                        old_rank or "None",
-                                        new_rank,
-                                    ),
-                                )
-
-                                username = profile.get("player_name") or profile.get(
-                                    "username", f"Player_{profile['player_id']}"
-                                )
-                                logger.info(
-                                    f"✅ Promotion detected: {username} | {old_rank or 'None'} → {new_rank} in {new_faction}"
-                                )
-
-                    # 🔥 UPDATED: Track other field changes (removed level, respect_points)
-                    fields = ["faction", "job", "warnings"]
-                    new_values = [
-                        new_faction,
-                        profile.get("job"),
-                        profile.get("warns") or profile.get("warnings"),
-                    ]
-
-                    for i, field in enumerate(fields):
-                        old_val = str(old_data[i]) if old_data[i] is not None else None
-                        new_val = (
-                            str(new_values[i]) if new_values[i] is not None else None
+                    # 🔥 Reschedule the next refresh from the profile's score
+                    checks, changes, hours_since_activity = 0, 0, None
+                    if old_data:
+                        checks = old_data["profile_checks"] or 0
+                        changes = old_data["profile_changes"] or 0
+                        hours_since_activity = old_data["hours_since_activity"]
+                        if old_data["last_profile_update"] is not None:
+                            checks += 1
+                            if self._profile_changed(old_data, profile):
+                                changes += 1
+                    # Reported "changed": new profile or a tracked field differs
+                    # (a presence-only flip is written but doesn't count)
+                    if old_data is None or self._profile_changed(old_data, profile):
+                        changed += 1
+                    score = refresh_scheduler.refresh_score(
+                        is_online=bool(profile.get("is_online")),
+                        hours_since_activity=hours_since_activity,
+                        faction=profile.get("faction"),
+                        checks=checks,
+                        changes=changes,
+                    )
+                    next_refresh = (
+                        f"+{refresh_scheduler.next_refresh_delay(score)} seconds"
+                    )
+
+                    # 🔥 Unchanged profile (the common case on refreshes): only touch
+                    # last_profile_update and the schedule - no UPSERT, no history checks
+                    fingerprint = self._profile_fingerprint(profile)
+                    if old_data and old_data["profile_fingerprint"] == fingerprint:
+                        touch_rows.append((checks, score, next_refresh, player_id))
+                        continue
+
+                    upsert_rows.append(
+                        (
+                            player_id,
+                            username,
+                            profile.get("is_online", False),
+                            last_seen,
+                            profile.get("faction"),
+                            profile.get("faction_rank"),
+                            profile.get("job"),
+                            profile.get("warns") or profile.get("warnings"),
+                            profile.get("played_hours"),
+                            profile.get("age_ic"),
+                            fingerprint,
+                            checks,
+                            changes,
+                            score,
+                            next_refresh,
                         )
+                    )
+
+                    if old_data:
+                        self._collect_profile_history(
+                            player_id,
+                            username,
+                            old_data,
+                            profile,
+                            rank_close_rows,
+                            rank_insert_rows,
+                            history_rows,
+                        )
+
+                if touch_rows:
+                    cursor.executemany(
+                        """
+                        UPDATE player_profiles
+                        SET last_profile_update = CURRENT_TIMESTAMP,
+                            priority_update = FALSE,
+                            profile_checks = ?,
+                            refresh_score = ?,
+                            next_refresh_at = datetime('now', ?)
+                        WHERE player_id = ?
+                    """,
+                        touch_rows,
+                    )
 
-                        if old_val != new_val and new_val is not None:
-                            cursor.execute(
-                                """
-                                INSERT INTO profile_history (player_id, field_name, old_value, new_value)
-                                VALUES (?, ?, ?, ?)
-                            """,
-                                (profile["player_id"], field, old_val, new_val),
-                            )
+                # 🔥 UPDATED: Insert or update player (removed 5 fields: level, respect_points, phone_number, vehicles_count, properties_count)
+                if upsert_rows:
+                    cursor.executemany(
+                        """
+                        INSERT INTO player_profiles (
+                            player_id, username, is_online, last_seen,
+                            faction, faction_rank, job, warnings,
+                            played_hours, age_ic,
+                            last_profile_update, priority_update, profile_fingerprint,
+                            profile_checks, profile_changes, refresh_score, next_refresh_at
+                        )
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, FALSE, ?,
+                                ?, ?, ?, datetime('now', ?))
+                        ON CONFLICT(player_id) DO UPDATE SET
+                            username = excluded.username,
+                            is_online = excluded.is_online,
+                            last_seen = excluded.last_seen,
+                            faction = excluded.faction,
+                            faction_rank = excluded.faction_rank,
+                            job = excluded.job,
+                            warnings = excluded.warnings,
+                            played_hours = excluded.played_hours,
+                            age_ic = excluded.age_ic,
+                            last_profile_update = CURRENT_TIMESTAMP,
+                            priority_update = FALSE,
+                            profile_fingerprint = excluded.profile_fingerprint,
+                            profile_checks = excluded.profile_checks,
+                            profile_changes = excluded.profile_changes,
+                            refresh_score = excluded.refresh_score,
+                            next_refresh_at = excluded.next_refresh_at
+                    """,
+                        upsert_rows,
+                    )
+
+                # End previous ranks before inserting the new current ones
+                if rank_close_rows:
+                    cursor.executemany(
+                        """
+                        UPDATE rank_history
+                        SET rank_lost = CURRENT_TIMESTAMP, is_current = FALSE
+                        WHERE player_id = ? AND is_current = TRUE
+                    """,
+                        rank_close_rows,
+                    )
+                if rank_insert_rows:
+                    cursor.executemany(
+                        """
+                        INSERT INTO rank_history (player_id, faction, rank_name, is_current)
+                        VALUES (?, ?, ?, TRUE)
+                    """,
+                        rank_insert_rows,
+                    )
+                if history_rows:
+                    cursor.executemany(
+                        """
+                        INSERT INTO profile_history (player_id, field_name, old_value, new_value)
+                        VALUES (?, ?, ?, ?)
+                    """,
+                        history_rows,
+                    )
 
                 conn.commit()
+                return changed
         except Exception as e:
             logger.error(
-                f"Error saving player profile {profile.get('player_id')}: {e}",
+                f"Error saving {len(by_id)} player profiles: {e}",
                 exc_info=True,
             )
             raise
 
-    async def save_player_profile(self, profile) -> None:
-        """ASYNC: Save/update player profile"""
-        await asyncio.to_thread(self._save_player_profile_sync, profile)
+    async def save_player_profiles_bulk(self, profiles: List[Dict]) -> int:
+        """ASYNC: Save a batch of profiles in one transaction
+
+        Returns the number of new profiles plus those whose tracked fields changed
+        """
+        return await self.run_write(self._save_player_profiles_bulk_sync, profiles)
+
+    @staticmethod
+    def _collect_profile_history(
+        player_id: str,
+        username: str,
+        old_data,
+        profile,
+        rank_close_rows: List[Tuple],
+        rank_insert_rows: List[Tuple],
+        history_rows: List[Tuple],
+    ) -> None:
+        """Append the rank_history/profile_history rows for one changed profile"""
+        old_faction = old_data["faction"]
+        old_rank = old_data["faction_rank"]
+        new_faction = profile.get("faction")
+        new_rank = profile.get("faction_rank")
+
+        # 🔥 FIXED: Track rank changes even when old_rank is NULL
+        # This enables /promotions to detect first rank assignments
+        if new_faction and new_faction not in (
+            None,
+            "",
+            "Civil",
+            "Fără",
+            "None",
+            "Fara",
+            "-",
+            "N/A",
+        ):
+            # Check if rank actually changed (including NULL -> rank)
+            if new_rank and new_rank not in (None, "", "-", "N/A"):
+                if old_rank != new_rank:
+                    # End previous rank if it exists
+                    if old_rank:
+                        rank_close_rows.append((player_id,))
+
+                    rank_insert_rows.append((player_id, new_faction, new_rank))
+
+                    # 🔥 ALSO track in profile_history for /promotions command
+                    history_rows.append(
+                        (player_id, "faction_rank", old_rank or "None", new_rank)
+                    )
+
+                    logger.info(
+                        f"✅ Promotion detected: {username} | {old_rank or 'None'} → {new_rank} in {new_faction}"
+                    )
+
+        # 🔥 UPDATED: Track other field changes (removed level, respect_points)
+        new_values = {
+            "faction": new_faction,
+            "job": profile.get("job"),
+            "warnings": profile.get("warns") or profile.get("warnings"),
+        }
+
+        for field, new_value in new_values.items():
+            old_val = str(old_data[field]) if old_data[field] is not None else None
+            new_val = str(new_value) if new_value is not None else None
+
+            if old_val != new_val and new_val is not None:
+                history_rows.append((player_id, field, old_val, new_val))
+
+    @staticmethod
+    def _profile_fingerprint(profile) -> str:
+        """Hash of the scraped profile fields that the profile UPSERT writes
+
+        last_seen only counts for offline players: for online players the
+        scraper fills it with the fetch time, and presence reconciliation
+        keeps it current anyway.
+        """
+        is_online = bool(profile.get("is_online"))
+        last_seen = None if is_online else profile.get("last_connection")
+        parts = [
+            profile.get("player_name") or profile.get("username"),
+            is_online,
+            last_seen,
+            profile.get("faction"),
+            profile.get("faction_rank"),
+            profile.get("job"),
+            profile.get("warns") or profile.get("warnings"),
+            profile.get("played_hours"),
+            profile.get("age_ic"),
+        ]
+        raw = "\x1f".join("" if part is None else str(part) for part in parts)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _profile_changed(old_data, profile) -> bool:
+        """Return True if any tracked profile field differs from the stored row"""
+        new_values = {
+            "faction": profile.get("faction"),
+            "faction_rank": profile.get("faction_rank"),
+            "job": profile.get("job"),
+            "warnings": profile.get("warns") or profile.get("warnings"),
+        }
+        for field, new_val in new_values.items():
+            old_val = old_data[field]
+            if (str(old_val) if old_val is not None else None) != (
+                str(new_val) if new_val is not None else None
+            ):
+                return True
+        return False
 
     def _update_scan_progress_sync(self, last_id: int, found: int, errors: int) -> None:
         """SYNC: Update scan progress"""
@@ -473,7 +884,7 @@ class Database:
 
     async def update_scan_progress(self, last_id: int, found: int, errors: int) -> None:
         """ASYNC: Update scan progress"""
-        await asyncio.to_thread(self._update_scan_progress_sync, last_id, found, errors)
+        await self.run_write(self._update_scan_progress_sync, last_id, found, errors)
 
     def _get_scan_progress_sync(self) -> Optional[Dict]:
         """SYNC: Get scan progress"""
@@ -489,7 +900,7 @@ class Database:
 
     async def get_scan_progress(self) -> Optional[Dict]:
         """ASYNC: Get scan progress"""
-        return await asyncio.to_thread(self._get_scan_progress_sync)
+        return await self.run_read(self._get_scan_progress_sync)
 
     def _save_action_sync(self, action) -> None:
         """SYNC: Save action to database"""
@@ -503,9 +914,9 @@ class Database:
                         player_id, player_name, action_type, action_detail,
                         item_name, item_quantity, target_player_id, target_player_name,
                         admin_id, admin_name, warning_count, reason,
-                        timestamp, raw_text
+                        timestamp, raw_text, amount, fee
                     )
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                     (
                         action.get("player_id"),
@@ -521,28 +932,169 @@ class Database:
                         action.get("warning_count"),
                         action.get("reason"),
                         action.get("timestamp", datetime.now()),
-                        action.get("raw_text"),
+                        raw_text_store.encode(
+                            action.get("raw_text"), self.compress_raw_text
+                        ),
+                        action.get("amount"),
+                        action.get("fee"),
                     ),
                 )
 
-                # Increment player action count
-                if action.get("player_id"):
-                    cursor.execute(
-                        """
-                        UPDATE player_profiles SET total_actions = total_actions + 1
-                        WHERE player_id = ?
-                    """,
-                        (action["player_id"],),
-                    )
-
                 conn.commit()
         except Exception as e:
             logger.error(f"Error saving action: {e}", exc_info=True)
             raise
 
+    def _add_action_counts_sync(self, counts: Dict[str, int]) -> None:
+        """SYNC: Add new actions to player_profiles.total_actions (player_id -> count)"""
+        with self.get_connection() as conn:
+            conn.executemany(
+                """
+                UPDATE player_profiles SET total_actions = total_actions + ?
+                WHERE player_id = ?
+            """,
+                [(count, player_id) for player_id, count in counts.items()],
+            )
+            conn.commit()
+
     async def save_action(self, action) -> None:
-        """ASYNC: Save action to database"""
-        await asyncio.to_thread(self._save_action_sync, action)
+        """ASYNC: Save action to database (player counters: add_action_counts)"""
+        await self.run_write(self._save_action_sync, action, domain="events")
+
+    async def add_action_counts(self, counts: Dict[str, int]) -> None:
+        """ASYNC: Bump total_actions for a batch of saved actions
+
+        Separate from save_action: the counters live in the profiles file,
+        whose writer must not hold up action inserts when domains are split.
+        """
+        if counts:
+            await self.run_write(self._add_action_counts_sync, counts)
+
+    def _save_ingest_metric_sync(self, metric: Dict) -> None:
+        """SYNC: Record one action poll (see action_pipeline.py)"""
+        with self.get_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO ingest_metrics (
+                    ts, snapshot_size, new_items, overlap, gap,
+                    lag_avg, lag_max, poll_interval
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    metric["ts"],
+                    metric["snapshot_size"],
+                    metric["new_items"],
+                    metric.get("overlap"),
+                    metric.get("gap", False),
+                    metric.get("lag_avg"),
+                    metric.get("lag_max"),
+                    metric.get("poll_interval"),
+                ),
+            )
+            conn.commit()
+
+    async def save_ingest_metric(self, metric: Dict) -> None:
+        """ASYNC: Record one action poll"""
+        await self.run_write(self._save_ingest_metric_sync, metric)
+
+    def _backfill_action_values_batch_sync(self, batch_size: int) -> Optional[int]:
+        """SYNC: Fill amount/fee/item columns for the next batch of old actions
+
+        Resumes after the id stored in maintenance_state and advances it in
+        the same transaction, so rows the parser can't read are looked at
+        once, not on every start. Returns rows updated, or None when there
+        is nothing left past the marker.
+        """
+        placeholders = ",".join("?" * len(action_values.VALUE_ACTION_TYPES))
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT value FROM maintenance_state WHERE name = ?",
+                (BACKFILL_MARKER,),
+            )
+            row = cursor.fetchone()
+            last_id = row[0] if row else 0
+
+            cursor.execute(
+                f"""
+                SELECT id, player_id, action_type, action_detail, raw_text,
+                       item_name, item_quantity
+                FROM actions
+                WHERE id > ? AND amount IS NULL
+                AND action_type IN ({placeholders})
+                ORDER BY id
+                LIMIT ?
+            """,
+                (last_id, *action_values.VALUE_ACTION_TYPES, batch_size),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return None
+
+            updates = []
+            for row in rows:
+                values = action_values.extract_action_values(
+                    row["action_type"],
+                    row["action_detail"],
+                    row["raw_text"],
+                    row["player_id"],
+                )
+                if values["amount"] is None and values["item_name"] is None:
+                    continue
+                updates.append(
+                    (
+                        values["amount"],
+                        values["fee"],
+                        values["item_name"],
+                        values["item_quantity"],
+                        row["id"],
+                    )
+                )
+
+            if updates:
+                cursor.executemany(
+                    f"""
+                    UPDATE {compact_schema.actions_table(cursor)}
+                    SET amount = ?, fee = ?,
+                        item_name = COALESCE(item_name, ?),
+                        item_quantity = COALESCE(item_quantity, ?)
+                    WHERE id = ?
+                """,
+                    updates,
+                )
+            cursor.execute(
+                """
+                INSERT INTO maintenance_state (name, value) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET value = excluded.value
+            """,
+                (BACKFILL_MARKER, rows[-1]["id"]),
+            )
+            conn.commit()
+            return len(updates)
+
+    async def backfill_action_values(
+        self, batch_size: int = 5000, pause: float = PURGE_PAUSE
+    ) -> int:
+        """ASYNC: Fill amount/fee/item columns for historical actions
+
+        One writer job per batch with a `pause` in between, like
+        purge_old_data, so scrapers' writes interleave with the backfill.
+        Returns the number of rows updated.
+        """
+        updated = 0
+        while True:
+            batch = await self.run_write(
+                self._backfill_action_values_batch_sync, batch_size
+            )
+            if batch is None:
+                break
+            updated += batch
+            await asyncio.sleep(pause)
+
+        if updated:
+            logger.info(f"💰 Backfilled amount/fee for {updated:,} actions")
+        return updated
 
     def _action_exists_sync(
         self, timestamp: Optional[datetime], text: Optional[str]
@@ -555,17 +1107,16 @@ class Database:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                time_window_start = timestamp - timedelta(seconds=2)
-                time_window_end = timestamp + timedelta(seconds=2)
+                ts = epoch.to_epoch(timestamp)
 
                 cursor.execute(
                     """
                     SELECT 1 FROM actions 
-                    WHERE timestamp BETWEEN ? AND ? 
-                    AND raw_text = ? 
+                    WHERE ts BETWEEN ? AND ? 
+                    AND raw_text IN (?, ?) 
                     LIMIT 1
                     """,
-                    (time_window_start, time_window_end, text),
+                    (ts - 2, ts + 2, *raw_text_store.match_values(text)),
                 )
                 return cursor.fetchone() is not None
         except Exception as e:
@@ -576,7 +1127,7 @@ class Database:
         self, timestamp: Optional[datetime], text: Optional[str]
     ) -> bool:
         """🔥 ASYNC: Check if action exists"""
-        return await asyncio.to_thread(self._action_exists_sync, timestamp, text)
+        return await self.run_read(self._action_exists_sync, timestamp, text)
 
     def _save_login_sync(
         self, player_id: str, player_name: str, timestamp: datetime
@@ -626,8 +1177,8 @@ class Database:
         self, player_id: str, player_name: str, timestamp: datetime
     ) -> bool:
         """ASYNC: Save login event - returns True if saved, False if skipped"""
-        return await asyncio.to_thread(
-            self._save_login_sync, player_id, player_name, timestamp
+        return await self.run_write(
+            self._save_login_sync, player_id, player_name, timestamp, domain="events"
         )
 
     def _save_logout_sync(self, player_id: str, timestamp: datetime) -> bool:
@@ -695,7 +1246,58 @@ class Database:
 
     async def save_logout(self, player_id: str, timestamp: datetime) -> bool:
         """🔥 ASYNC: Save logout event - returns True if saved, False if skipped"""
-        return await asyncio.to_thread(self._save_logout_sync, player_id, timestamp)
+        return await self.run_write(
+            self._save_logout_sync, player_id, timestamp, domain="events"
+        )
+
+    def _get_presence_state_sync(self) -> List[Dict]:
+        """SYNC: Get the most recent login/logout event for every player
+
+        Used once at startup to seed the in-memory PresenceTracker.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            # SQLite returns the bare columns from the row holding MAX(timestamp)
+            cursor.execute(
+                """
+                SELECT player_id, event_type, MAX(timestamp) AS timestamp
+                FROM login_events
+                GROUP BY player_id
+            """
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    async def get_presence_state(self) -> List[Dict]:
+        """ASYNC: Get the most recent login/logout event for every player"""
+        return await self.run_read(self._get_presence_state_sync)
+
+    def _save_presence_events_sync(self, events: List[Dict]) -> None:
+        """SYNC: Batch insert login/logout events decided by the PresenceTracker"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                """
+                INSERT INTO login_events (
+                    player_id, player_name, event_type, timestamp, session_duration_seconds
+                )
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                [
+                    (
+                        e["player_id"],
+                        e.get("player_name"),
+                        e["event_type"],
+                        e["timestamp"],
+                        e.get("session_duration_seconds"),
+                    )
+                    for e in events
+                ],
+            )
+            conn.commit()
+
+    async def save_presence_events(self, events: List[Dict]) -> None:
+        """ASYNC: Batch insert login/logout events in one transaction"""
+        await self.run_write(self._save_presence_events_sync, events, domain="events")
 
     def _update_online_players_sync(self, online_players: List[Dict]) -> None:
         """🔥 OPTIMIZED SYNC: Batch update online players"""
@@ -730,7 +1332,104 @@ class Database:
 
     async def update_online_players(self, online_players: List[Dict]) -> None:
         """ASYNC: Update online players snapshot"""
-        await asyncio.to_thread(self._update_online_players_sync, online_players)
+        await self.run_write(self._update_online_players_sync, online_players)
+
+    def _reconcile_online_players_sync(self, online_players: List[Dict]) -> Dict:
+        """🔥 SYNC: Apply only the diff between the stored and fresh online list
+
+        In one transaction:
+        1. Insert players who joined, delete players who left
+        2. Update the stored name for players who were renamed
+        3. Advance detected_online_at / last_seen of players still online,
+           but only once per ONLINE_REFRESH_BUCKET (wall-clock aligned), so
+           most polls write just the joined/left/renamed rows
+
+        Returns dict with 'joined', 'left' and 'renamed' lists of player dicts
+        """
+        fresh = {p["player_id"]: p["player_name"] for p in online_players}
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT player_id, player_name FROM online_players")
+            stored = {row[0]: row[1] for row in cursor.fetchall()}
+
+            joined = [
+                {"player_id": pid, "player_name": name}
+                for pid, name in fresh.items()
+                if pid not in stored
+            ]
+            left = [
+                {"player_id": pid, "player_name": name}
+                for pid, name in stored.items()
+                if pid not in fresh
+            ]
+            renamed = [
+                {"player_id": pid, "player_name": name, "old_name": stored[pid]}
+                for pid, name in fresh.items()
+                if pid in stored and name and stored[pid] != name
+            ]
+
+            if left:
+                cursor.executemany(
+                    "DELETE FROM online_players WHERE player_id = ?",
+                    [(p["player_id"],) for p in left],
+                )
+                cursor.executemany(
+                    "UPDATE player_profiles SET is_online = FALSE WHERE player_id = ?",
+                    [(p["player_id"],) for p in left],
+                )
+
+            if joined:
+                cursor.executemany(
+                    """
+                    INSERT INTO online_players (player_id, player_name, detected_online_at)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(player_id) DO UPDATE SET
+                        player_name = excluded.player_name,
+                        detected_online_at = CURRENT_TIMESTAMP
+                """,
+                    [(p["player_id"], p["player_name"]) for p in joined],
+                )
+
+            if renamed:
+                cursor.executemany(
+                    "UPDATE online_players SET player_name = ? WHERE player_id = ?",
+                    [(p["player_name"], p["player_id"]) for p in renamed],
+                )
+
+            # Everyone left in online_players is currently online - rows stamped
+            # before the current bucket started are advanced, the rest are fresh
+            bucket_start = "datetime(strftime('%s', 'now') / ? * ?, 'unixepoch')"
+            cursor.execute(
+                f"""
+                UPDATE online_players SET detected_online_at = CURRENT_TIMESTAMP
+                WHERE detected_online_at < {bucket_start}
+            """,
+                (ONLINE_REFRESH_BUCKET, ONLINE_REFRESH_BUCKET),
+            )
+            cursor.execute(
+                f"""
+                UPDATE player_profiles
+                SET is_online = TRUE, last_seen = CURRENT_TIMESTAMP
+                WHERE player_id IN (SELECT player_id FROM online_players)
+                AND (
+                    is_online IS NOT TRUE
+                    OR last_seen IS NULL
+                    OR last_seen < {bucket_start}
+                )
+            """,
+                (ONLINE_REFRESH_BUCKET, ONLINE_REFRESH_BUCKET),
+            )
+
+            conn.commit()
+
+        return {"joined": joined, "left": left, "renamed": renamed}
+
+    async def reconcile_online_players(self, online_players: List[Dict]) -> Dict:
+        """🔥 ASYNC: Apply joins/leaves/renames to online_players in one transaction"""
+        return await self.run_write(
+            self._reconcile_online_players_sync, online_players
+        )
 
     def _cleanup_stale_online_players_sync(self, minutes: int = 5) -> int:
         """🆕 SYNC: Remove stale entries from online_players table
@@ -769,7 +1468,9 @@ class Database:
 
     async def cleanup_stale_online_players(self, minutes: int = 5) -> int:
         """🆕 ASYNC: Remove stale entries from online_players table"""
-        return await asyncio.to_thread(self._cleanup_stale_online_players_sync, minutes)
+        return await self.run_write(
+            self._cleanup_stale_online_players_sync, minutes, domain="live"
+        )
 
     def _remove_from_online_players_sync(self, player_id: str) -> bool:
         """🔥 SYNC: Remove a specific player from online_players table (on logout)"""
@@ -789,7 +1490,9 @@ class Database:
 
     async def remove_from_online_players(self, player_id: str) -> bool:
         """🔥 ASYNC: Remove a specific player from online_players table (on logout)"""
-        return await asyncio.to_thread(self._remove_from_online_players_sync, player_id)
+        return await self.run_write(
+            self._remove_from_online_players_sync, player_id, domain="live"
+        )
 
     def _cleanup_duplicate_logins_sync(self, dry_run: bool = True) -> Dict:
         """🆕 SYNC: Remove duplicate consecutive login events without matching logouts
@@ -860,7 +1563,9 @@ class Database:
 
     async def cleanup_duplicate_logins(self, dry_run: bool = True) -> Dict:
         """🆕 ASYNC: Remove duplicate consecutive login events"""
-        return await asyncio.to_thread(self._cleanup_duplicate_logins_sync, dry_run)
+        return await self.run_write(
+            self._cleanup_duplicate_logins_sync, dry_run, domain="events"
+        )
 
     def _cleanup_duplicate_logouts_sync(self, dry_run: bool = True) -> Dict:
         """🆕 SYNC: Remove duplicate consecutive logout events without matching logins
@@ -931,39 +1636,198 @@ class Database:
 
     async def cleanup_duplicate_logouts(self, dry_run: bool = True) -> Dict:
         """🆕 ASYNC: Remove duplicate consecutive logout events"""
-        return await asyncio.to_thread(self._cleanup_duplicate_logouts_sync, dry_run)
+        return await self.run_write(
+            self._cleanup_duplicate_logouts_sync, dry_run, domain="events"
+        )
 
-    def _mark_player_for_update_sync(self, player_id: str, player_name: str) -> None:
-        """Mark player for priority update - allows duplicate usernames"""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
+    async def mark_player_for_update(
+        self, player_id: str, player_name: str, reason: str = "action"
+    ) -> None:
+        """ASYNC: Mark player for priority update (coalesced, see mark_players_for_update)"""
+        await self.mark_players_for_update([(player_id, player_name)], reason)
 
-                cursor.execute(
-                    """
-                    INSERT INTO player_profiles (player_id, username, priority_update)
-                    VALUES (?, ?, TRUE)
-                    ON CONFLICT(player_id) DO UPDATE SET
-                        username = excluded.username,
-                        priority_update = TRUE
-                """,
-                    (player_id, player_name),
+    def _mark_players_for_update_sync(
+        self, players: List[Tuple[str, str]], reason: str
+    ) -> None:
+        """SYNC: Schedule many players for refresh with one executemany
+
+        next_refresh_at is only ever pulled forward (to now + the signal's delay),
+        never pushed back. Activity signals also stamp last_activity_at.
+        Errors propagate so the caller can forget the coalescing entries.
+        """
+        delay = f"+{refresh_scheduler.SIGNAL_DELAYS.get(reason, 0)} seconds"
+        is_activity = reason in refresh_scheduler.ACTIVITY_SIGNALS
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                """
+                INSERT INTO player_profiles (
+                    player_id, username, priority_update, next_refresh_at, last_activity_at
                 )
+                VALUES (
+                    ?, ?, TRUE, datetime('now', ?),
+                    CASE WHEN ? THEN CURRENT_TIMESTAMP END
+                )
+                ON CONFLICT(player_id) DO UPDATE SET
+                    username = excluded.username,
+                    priority_update = TRUE,
+                    -- A renamed row no longer matches the scraped fingerprint
+                    profile_fingerprint = CASE
+                        WHEN excluded.username = player_profiles.username
+                        THEN player_profiles.profile_fingerprint
+                    END,
+                    next_refresh_at = CASE
+                        WHEN player_profiles.next_refresh_at IS NULL
+                          OR excluded.next_refresh_at < player_profiles.next_refresh_at
+                        THEN excluded.next_refresh_at
+                        ELSE player_profiles.next_refresh_at
+                    END,
+                    last_activity_at = COALESCE(
+                        excluded.last_activity_at, player_profiles.last_activity_at
+                    )
+            """,
+                [(pid, name, delay, is_activity) for pid, name in players],
+            )
+            conn.commit()
 
-                conn.commit()
+    async def mark_players_for_update(self, players, reason: str = "action") -> int:
+        """🔥 ASYNC: Bulk mark players for refresh with in-memory coalescing
 
-        except sqlite3.IntegrityError as e:
-            logger.error(f"Unexpected IntegrityError for player_id={player_id}: {e}")
+        Args:
+            players: Iterable of (player_id, player_name) tuples
+            reason: Signal type from refresh_scheduler.SIGNAL_DELAYS
+                ("action", "login", "online", "missing_rank")
+
+        The same player_id marked again for the same reason within
+        mark_coalesce_window seconds (with an unchanged name) is skipped, so
+        repeated marks produce a single write. Everything that survives
+        coalescing lands in one executemany.
+
+        Returns number of players actually written
+        """
+        now = time.monotonic()
+        window = self.mark_coalesce_window
+
+        if now - self._marks_pruned_at > window:
+            self._recent_marks = {
+                key: entry
+                for key, entry in self._recent_marks.items()
+                if now - entry[0] < window
+            }
+            self._marks_pruned_at = now
+
+        batch = {}
+        for player_id, player_name in players:
+            if not player_id:
+                continue
+            recent = self._recent_marks.get((player_id, reason))
+            if recent and now - recent[0] < window and recent[1] == player_name:
+                continue
+            batch[player_id] = player_name
+
+        if not batch:
+            return 0
+
+        # Recorded before the write so concurrent calls coalesce onto this one
+        for player_id, player_name in batch.items():
+            self._recent_marks[(player_id, reason)] = (now, player_name)
+
+        try:
+            await self.run_write(
+                self._mark_players_for_update_sync, list(batch.items()), reason
+            )
         except Exception as e:
+            # Not written - let the next signal for these players retry
+            for player_id, player_name in batch.items():
+                if self._recent_marks.get((player_id, reason)) == (now, player_name):
+                    del self._recent_marks[(player_id, reason)]
             logger.error(
-                f"Error marking player {player_id} for update: {e}", exc_info=True
+                f"Error marking {len(batch)} players for update: {e}", exc_info=True
             )
+            return 0
+        return len(batch)
 
-    async def mark_player_for_update(self, player_id: str, player_name: str) -> None:
-        """ASYNC: Mark player for priority update"""
-        await asyncio.to_thread(
-            self._mark_player_for_update_sync, player_id, player_name
+    def _get_due_profile_refreshes_sync(self, budget: int) -> List[str]:
+        """SYNC: Get the most valuable due profiles, at most `budget` IDs
+
+        Candidates are the most overdue rows (a few times the budget), which
+        are then ranked by refresh_scheduler.refresh_score including staleness.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT
+                    p.player_id,
+                    p.faction,
+                    p.profile_checks,
+                    p.profile_changes,
+                    o.player_id IS NOT NULL AS is_online,
+                    (julianday('now') - julianday(p.last_activity_at)) * 24
+                        AS hours_since_activity,
+                    (julianday('now') - julianday(p.last_profile_update)) * 24
+                        AS hours_since_update
+                FROM player_profiles p
+                LEFT JOIN online_players o ON o.player_id = p.player_id
+                WHERE p.next_refresh_at <= CURRENT_TIMESTAMP
+                ORDER BY p.next_refresh_at ASC
+                LIMIT ?
+            """,
+                (budget * 5,),
+            )
+            candidates = cursor.fetchall()
+
+        scored = sorted(
+            candidates,
+            key=lambda row: refresh_scheduler.refresh_score(
+                is_online=bool(row["is_online"]),
+                hours_since_activity=row["hours_since_activity"],
+                faction=row["faction"],
+                checks=row["profile_checks"] or 0,
+                changes=row["profile_changes"] or 0,
+                hours_since_update=row["hours_since_update"],
+            ),
+            reverse=True,
         )
+        return [row["player_id"] for row in scored[:budget]]
+
+    async def get_due_profile_refreshes(self, budget: int) -> List[str]:
+        """🔥 ASYNC: Get the most valuable due profiles within a per-cycle budget"""
+        return await self.run_read(self._get_due_profile_refreshes_sync, budget)
+
+    def _defer_profile_refreshes_sync(self, player_ids: List[str], seconds: int) -> None:
+        """SYNC: Push next_refresh_at back for IDs that returned no profile"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                """
+                UPDATE player_profiles
+                SET next_refresh_at = datetime('now', ?), priority_update = FALSE
+                WHERE player_id = ?
+            """,
+                [(f"+{seconds} seconds", pid) for pid in player_ids],
+            )
+            conn.commit()
+
+    async def defer_profile_refreshes(
+        self,
+        player_ids: List[str],
+        seconds: int = refresh_scheduler.MISSING_PROFILE_RETRY_DELAY,
+    ) -> None:
+        """ASYNC: Push next_refresh_at back for IDs that returned no profile"""
+        if player_ids:
+            await self.run_write(
+                self._defer_profile_refreshes_sync, player_ids, seconds
+            )
+
+    def _get_refresh_queue_stats_sync(self) -> Dict:
+        """SYNC: Refresh queue depth and profile age distribution"""
+        with self.get_connection() as conn:
+            return refresh_scheduler.get_queue_stats(conn.cursor())
+
+    async def get_refresh_queue_stats(self) -> Dict:
+        """ASYNC: Refresh queue depth and profile age distribution"""
+        return await self.run_read(self._get_refresh_queue_stats_sync)
 
     def _get_players_pending_update_sync(self, limit: int = 100) -> List[str]:
         """SYNC: Get player IDs pending update"""
@@ -982,7 +1846,7 @@ class Database:
 
     async def get_players_pending_update(self, limit: int = 100) -> List[str]:
         """ASYNC: Get player IDs pending update"""
-        return await asyncio.to_thread(self._get_players_pending_update_sync, limit)
+        return await self.run_read(self._get_players_pending_update_sync, limit)
 
     def _reset_player_priority_sync(self, player_id: str) -> None:
         """SYNC: Reset player priority"""
@@ -1000,7 +1864,7 @@ class Database:
 
     async def reset_player_priority(self, player_id: str) -> None:
         """ASYNC: Reset player priority"""
-        await asyncio.to_thread(self._reset_player_priority_sync, player_id)
+        await self.run_write(self._reset_player_priority_sync, player_id)
 
     def _get_current_online_players_sync(self) -> List[Dict]:
         """SYNC: Get currently online players"""
@@ -1017,7 +1881,7 @@ class Database:
 
     async def get_current_online_players(self) -> List[Dict]:
         """ASYNC: Get currently online players"""
-        return await asyncio.to_thread(self._get_current_online_players_sync)
+        return await self.run_read(self._get_current_online_players_sync)
 
     def _get_online_players_last_24h_count_sync(self) -> int:
         """🆕 SYNC: Get count of players who were online in last 24 hours"""
@@ -1036,7 +1900,25 @@ class Database:
 
     async def get_online_players_last_24h_count(self) -> int:
         """🆕 ASYNC: Get count of players who were online in last 24 hours"""
-        return await asyncio.to_thread(self._get_online_players_last_24h_count_sync)
+        return await self.run_read(self._get_online_players_last_24h_count_sync)
+
+    @contextmanager
+    def _actions_source(self, conn: sqlite3.Connection, since: datetime):
+        """FROM source for action queries reaching back to `since`
+
+        Plain `actions` while the window is inside the live DB; once it
+        reaches past the archive age, live + monthly archives (ATTACH +
+        UNION ALL, see action_archive.py).
+        """
+        since_ts = epoch.to_epoch(since)
+        if (
+            not self.archive_after_days
+            or since_ts >= epoch.now_epoch() - self.archive_after_days * epoch.DAY
+        ):
+            yield "actions"
+            return
+        with action_archive.union_source(conn, self.archive_dir, since_ts) as source:
+            yield source
 
     def _get_player_actions_sync(self, identifier: str, days: int = 7) -> List[Dict]:
         """🆕 SYNC: Get player actions - BIDIRECTIONAL (sender OR receiver)
@@ -1048,24 +1930,26 @@ class Database:
         🔥 REMOVED: action_detail LIKE pattern - caused false positives
         (e.g. "100.280$" matched player ID 280)
         """
-        with self.get_connection() as conn:
+        cutoff = datetime.now() - timedelta(days=days)
+        with self.get_connection() as conn, self._actions_source(
+            conn, cutoff
+        ) as source:
             cursor = conn.cursor()
-            cutoff = datetime.now() - timedelta(days=days)
 
             if identifier.isdigit():
                 # Query for actions where player is SENDER or RECEIVER
                 # 🔥 FIX: Only match exact player_id or target_player_id (no fuzzy text matching)
                 cursor.execute(
-                    """
-                    SELECT * FROM actions
+                    f"""
+                    SELECT * FROM {source} AS actions
                     WHERE (
                         player_id = ? 
                         OR target_player_id = ?
                     )
-                    AND timestamp >= ?
-                    ORDER BY timestamp DESC
+                    AND ts >= ?
+                    ORDER BY ts DESC
                 """,
-                    (identifier, identifier, cutoff),
+                    (identifier, identifier, epoch.to_epoch(cutoff)),
                 )
                 results = cursor.fetchall()
 
@@ -1074,42 +1958,44 @@ class Database:
 
             # Search by name (sender or receiver) - still fuzzy for names
             cursor.execute(
-                """
-                SELECT * FROM actions
+                f"""
+                SELECT * FROM {source} AS actions
                 WHERE (player_name LIKE ? OR target_player_name LIKE ?) 
-                AND timestamp >= ?
-                ORDER BY timestamp DESC
+                AND ts >= ?
+                ORDER BY ts DESC
             """,
-                (f"%{identifier}%", f"%{identifier}%", cutoff),
+                (f"%{identifier}%", f"%{identifier}%", epoch.to_epoch(cutoff)),
             )
 
             return [dict(row) for row in cursor.fetchall()]
 
     async def get_player_actions(self, identifier: str, days: int = 7) -> List[Dict]:
         """🆕 ASYNC: Get player actions - BIDIRECTIONAL"""
-        return await asyncio.to_thread(self._get_player_actions_sync, identifier, days)
+        return await self.run_read(self._get_player_actions_sync, identifier, days)
 
     def _get_recent_actions_sync(self, days: int = 7, limit: int = 50) -> List[Dict]:
         """🆕 SYNC: Get recent actions from ALL players"""
-        with self.get_connection() as conn:
+        cutoff = datetime.now() - timedelta(days=days)
+        with self.get_connection() as conn, self._actions_source(
+            conn, cutoff
+        ) as source:
             cursor = conn.cursor()
-            cutoff = datetime.now() - timedelta(days=days)
 
             cursor.execute(
-                """
-                SELECT * FROM actions
-                WHERE timestamp >= ?
-                ORDER BY timestamp DESC
+                f"""
+                SELECT * FROM {source} AS actions
+                WHERE ts >= ?
+                ORDER BY ts DESC
                 LIMIT ?
             """,
-                (cutoff, limit),
+                (epoch.to_epoch(cutoff), limit),
             )
 
             return [dict(row) for row in cursor.fetchall()]
 
     async def get_recent_actions(self, days: int = 7, limit: int = 50) -> List[Dict]:
         """🆕 ASYNC: Get recent actions from ALL players"""
-        return await asyncio.to_thread(self._get_recent_actions_sync, days, limit)
+        return await self.run_read(self._get_recent_actions_sync, days, limit)
 
     def _save_banned_player_sync(self, ban_data: Dict) -> None:
         """SYNC: Save banned player"""
@@ -1140,7 +2026,7 @@ class Database:
 
     async def save_banned_player(self, ban_data: Dict) -> None:
         """ASYNC: Save banned player"""
-        await asyncio.to_thread(self._save_banned_player_sync, ban_data)
+        await self.run_write(self._save_banned_player_sync, ban_data, domain="live")
 
     def _mark_expired_bans_sync(self, current_ban_ids: set) -> None:
         """SYNC: Mark expired bans"""
@@ -1170,7 +2056,9 @@ class Database:
 
     async def mark_expired_bans(self, current_ban_ids: set) -> None:
         """ASYNC: Mark expired bans"""
-        await asyncio.to_thread(self._mark_expired_bans_sync, current_ban_ids)
+        await self.run_write(
+            self._mark_expired_bans_sync, current_ban_ids, domain="live"
+        )
 
     def _get_banned_players_sync(self, include_expired: bool = False) -> List[Dict]:
         """SYNC: Get banned players"""
@@ -1188,7 +2076,7 @@ class Database:
 
     async def get_banned_players(self, include_expired: bool = False) -> List[Dict]:
         """ASYNC: Get banned players"""
-        return await asyncio.to_thread(self._get_banned_players_sync, include_expired)
+        return await self.run_read(self._get_banned_players_sync, include_expired)
 
     def _get_banned_players_with_details_sync(
         self, include_expired: bool = False
@@ -1245,7 +2133,7 @@ class Database:
         self, include_expired: bool = False
     ) -> List[Dict]:
         """🆕 ASYNC: Get banned players with played hours and faction"""
-        return await asyncio.to_thread(
+        return await self.run_read(
             self._get_banned_players_with_details_sync, include_expired
         )
 
@@ -1261,7 +2149,7 @@ class Database:
 
     async def get_player_by_exact_id(self, player_id: str) -> Optional[Dict]:
         """ASYNC: Get player by exact ID"""
-        return await asyncio.to_thread(self._get_player_by_exact_id_sync, player_id)
+        return await self.run_read(self._get_player_by_exact_id_sync, player_id)
 
     def _search_player_by_name_sync(self, name: str) -> List[Dict]:
         """SYNC: Search players by name"""
@@ -1281,7 +2169,7 @@ class Database:
 
     async def search_player_by_name(self, name: str) -> List[Dict]:
         """ASYNC: Search players by name"""
-        return await asyncio.to_thread(self._search_player_by_name_sync, name)
+        return await self.run_read(self._search_player_by_name_sync, name)
 
     def _save_scan_progress_sync(
         self, last_player_id: str, total_scanned: int, completed: bool = False
@@ -1305,7 +2193,7 @@ class Database:
         self, last_player_id: str, total_scanned: int, completed: bool = False
     ) -> None:
         """ASYNC: Save scan progress (legacy)"""
-        await asyncio.to_thread(
+        await self.run_write(
             self._save_scan_progress_sync, last_player_id, total_scanned, completed
         )
 
@@ -1338,7 +2226,7 @@ class Database:
                     "online_count": online_count,
                 }
 
-        return await asyncio.to_thread(_get_stats_sync)
+        return await self.run_read(_get_stats_sync)
 
     async def get_actions_count_last_24h(self) -> int:
         """Get actions count in last 24 hours"""
@@ -1348,11 +2236,12 @@ class Database:
                 cursor = conn.cursor()
                 cutoff = datetime.now() - timedelta(hours=24)
                 cursor.execute(
-                    "SELECT COUNT(*) FROM actions WHERE timestamp >= ?", (cutoff,)
+                    "SELECT COUNT(*) FROM actions WHERE ts >= ?",
+                    (epoch.to_epoch(cutoff),),
                 )
                 return cursor.fetchone()[0]
 
-        return await asyncio.to_thread(_get_count_sync)
+        return await self.run_read(_get_count_sync)
 
     async def get_logins_count_today(self) -> int:
         """Get login count today"""
@@ -1364,12 +2253,12 @@ class Database:
                     hour=0, minute=0, second=0, microsecond=0
                 )
                 cursor.execute(
-                    "SELECT COUNT(*) FROM login_events WHERE event_type = ? AND timestamp >= ?",
-                    ("login", today),
+                    "SELECT COUNT(*) FROM login_events WHERE event_type = ? AND ts >= ?",
+                    ("login", epoch.to_epoch(today)),
                 )
                 return cursor.fetchone()[0]
 
-        return await asyncio.to_thread(_get_count_sync)
+        return await self.run_read(_get_count_sync)
 
     async def get_active_bans_count(self) -> int:
         """Get active bans count"""
@@ -1382,7 +2271,7 @@ class Database:
                 )
                 return cursor.fetchone()[0]
 
-        return await asyncio.to_thread(_get_count_sync)
+        return await self.run_read(_get_count_sync)
 
     async def get_player_sessions(self, player_id: str, days: int = 7) -> List[Dict]:
         """🔥 REWRITTEN: Get player sessions with proper deduplication.
@@ -1412,7 +2301,7 @@ class Database:
                             ROW_NUMBER() OVER (ORDER BY timestamp ASC) as rn
                         FROM login_events
                         WHERE player_id = ?
-                        AND timestamp >= ?
+                        AND ts >= ?
                     ),
                     logouts_with_prev AS (
                         SELECT 
@@ -1445,7 +2334,7 @@ class Database:
                            AND e.rn < lwp.logout_rn) IS NOT NULL
                     ORDER BY lwp.logout_time DESC
                 """,
-                    (player_id, cutoff),
+                    (player_id, epoch.to_epoch(cutoff)),
                 )
 
                 results = [dict(row) for row in cursor.fetchall()]
@@ -1470,7 +2359,7 @@ class Database:
 
                 return results
 
-        return await asyncio.to_thread(_get_sessions_sync)
+        return await self.run_read(_get_sessions_sync)
 
     async def get_player_first_last_session(self, player_id: str) -> Dict:
         """🆕 Get player's first ever detected login and last session info"""
@@ -1540,7 +2429,7 @@ class Database:
 
                 return result
 
-        return await asyncio.to_thread(_get_first_last_sync)
+        return await self.run_read(_get_first_last_sync)
 
     async def get_player_rank_history(self, player_id: str) -> List[Dict]:
         """Get player rank history"""
@@ -1558,7 +2447,7 @@ class Database:
                 )
                 return [dict(row) for row in cursor.fetchall()]
 
-        return await asyncio.to_thread(_get_history_sync)
+        return await self.run_read(_get_history_sync)
 
     async def get_faction_members(self, faction_name: str) -> List[Dict]:
         """Get faction members with accurate online status (last 5 minutes)"""
@@ -1584,7 +2473,7 @@ class Database:
                 )
                 return [dict(row) for row in cursor.fetchall()]
 
-        return await asyncio.to_thread(_get_members_sync)
+        return await self.run_read(_get_members_sync)
 
     async def get_all_factions_with_counts(self) -> List[Dict]:
         """Get all factions with member and CURRENTLY ONLINE counts (last 5 minutes)"""
@@ -1609,7 +2498,7 @@ class Database:
                 )
                 return [dict(row) for row in cursor.fetchall()]
 
-        return await asyncio.to_thread(_get_factions_sync)
+        return await self.run_read(_get_factions_sync)
 
     async def get_recent_promotions(self, days: int = 7) -> List[Dict]:
         """Get recent promotions"""
@@ -1639,7 +2528,7 @@ class Database:
 
                 return [dict(row) for row in cursor.fetchall()]
 
-        return await asyncio.to_thread(_get_promotions_sync)
+        return await self.run_read(_get_promotions_sync)
 
     async def get_all_heists(self, days: int = 30) -> List[Dict]:
         """🆕 Get all bank heist deliveries with player faction info"""
@@ -1662,15 +2551,15 @@ class Database:
                     FROM actions a
                     LEFT JOIN player_profiles p ON a.player_id = p.player_id
                     WHERE a.action_type = 'bank_heist_delivery'
-                    AND a.timestamp >= ?
-                    ORDER BY a.timestamp DESC
+                    AND a.ts >= ?
+                    ORDER BY a.ts DESC
                 """,
-                    (cutoff,),
+                    (epoch.to_epoch(cutoff),),
                 )
 
                 return [dict(row) for row in cursor.fetchall()]
 
-        return await asyncio.to_thread(_get_heists_sync)
+        return await self.run_read(_get_heists_sync)
 
     async def get_faction_actions(self, faction_name: str, days: int = 7) -> List[Dict]:
         """🆕 Get all actions for players in a specific faction"""
@@ -1703,16 +2592,16 @@ class Database:
                     FROM actions a
                     LEFT JOIN player_profiles p ON a.player_id = p.player_id
                     WHERE a.player_id IN ({placeholders})
-                    AND a.timestamp >= ?
-                    ORDER BY a.timestamp DESC
+                    AND a.ts >= ?
+                    ORDER BY a.ts DESC
                     LIMIT 500
                 """,
-                    (*faction_player_ids, cutoff),
+                    (*faction_player_ids, epoch.to_epoch(cutoff)),
                 )
 
                 return [dict(row) for row in cursor.fetchall()]
 
-        return await asyncio.to_thread(_get_faction_actions_sync)
+        return await self.run_read(_get_faction_actions_sync)
 
     async def get_all_faction_names(self) -> List[str]:
         """🆕 Get list of all distinct faction names for autocomplete"""
@@ -1732,7 +2621,7 @@ class Database:
                 )
                 return [row[0] for row in cursor.fetchall()]
 
-        return await asyncio.to_thread(_get_faction_names_sync)
+        return await self.run_read(_get_faction_names_sync)
 
     async def get_player_stats(self, identifier: str) -> Optional[Dict]:
         """🆕 Get player stats by ID or name - unified method for commands"""
@@ -1766,131 +2655,341 @@ class Database:
                 row = cursor.fetchone()
                 return dict(row) if row else None
 
-        return await asyncio.to_thread(_get_stats_sync)
+        return await self.run_read(_get_stats_sync)
 
-    async def cleanup_old_data(self, dry_run: bool = True) -> Dict[str, int]:
-        """Cleanup old data"""
+    def _archive_pending_sync(self, cutoff_ts: int) -> List[Tuple[str, int]]:
+        """SYNC: (month, rows) of live actions older than cutoff_ts"""
+        with self.get_connection() as conn:
+            return action_archive.pending_by_month(conn, cutoff_ts)
 
-        def _cleanup_sync():
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                results = {}
+    def _archive_batch_sync(self, month: str, cutoff_ts: int) -> int:
+        """SYNC: Move one batch of a month's old actions (one short transaction)"""
+        with self.get_connection() as conn:
+            return action_archive.archive_batch(
+                conn, self.archive_dir, month, cutoff_ts, PURGE_CHUNK_SIZE
+            )
 
-                # Actions older than 90 days
-                cutoff_actions = datetime.now() - timedelta(days=90)
-                if dry_run:
-                    cursor.execute(
-                        "SELECT COUNT(*) FROM actions WHERE timestamp < ?",
-                        (cutoff_actions,),
-                    )
-                    results["Actions"] = cursor.fetchone()[0]
-                else:
-                    cursor.execute(
-                        "DELETE FROM actions WHERE timestamp < ?", (cutoff_actions,)
-                    )
-                    results["Actions"] = cursor.rowcount
+    async def archive_old_actions(
+        self, dry_run: bool = False, pause: float = PURGE_PAUSE
+    ) -> int:
+        """Move actions past the archive age into monthly archive DBs
 
-                # Login events older than 30 days
-                cutoff_logins = datetime.now() - timedelta(days=30)
-                if dry_run:
-                    cursor.execute(
-                        "SELECT COUNT(*) FROM login_events WHERE timestamp < ?",
-                        (cutoff_logins,),
-                    )
-                    results["Login Events"] = cursor.fetchone()[0]
-                else:
-                    cursor.execute(
-                        "DELETE FROM login_events WHERE timestamp < ?", (cutoff_logins,)
-                    )
-                    results["Login Events"] = cursor.rowcount
+        One writer job per batch with a `pause` in between, so a first run
+        over years of history doesn't hold the writer for minutes. No-op
+        when archiving is off; dry_run only counts the rows.
+        """
+        if not self.archive_after_days:
+            return 0
 
-                # Profile history older than 180 days
-                cutoff_profile = datetime.now() - timedelta(days=180)
-                if dry_run:
-                    cursor.execute(
-                        "SELECT COUNT(*) FROM profile_history WHERE changed_at < ?",
-                        (cutoff_profile,),
-                    )
-                    results["Profile History"] = cursor.fetchone()[0]
-                else:
-                    cursor.execute(
-                        "DELETE FROM profile_history WHERE changed_at < ?",
-                        (cutoff_profile,),
-                    )
-                    results["Profile History"] = cursor.rowcount
+        cutoff_ts = epoch.now_epoch() - self.archive_after_days * epoch.DAY
+        pending = await self.run_read(self._archive_pending_sync, cutoff_ts)
+        if dry_run:
+            return sum(count for _, count in pending)
+
+        moved = 0
+        start = time.monotonic()
+        for month, count in pending:
+            month_moved = 0
+            while True:
+                batch = await self.run_write(
+                    self._archive_batch_sync, month, cutoff_ts, domain="events"
+                )
+                if not batch:
+                    break
+                month_moved += batch
+                await asyncio.sleep(pause)
+            moved += month_moved
+            logger.info(f"📦 Archived {month_moved:,}/{count:,} actions for {month}")
+
+        if moved:
+            logger.info(
+                f"📦 Moved {moved:,} actions to archives in "
+                f"{time.monotonic() - start:.1f}s"
+            )
+        return moved
 
-                if not dry_run:
-                    conn.commit()
+    def _retention_targets_sync(self) -> List[Tuple[str, str, str, object]]:
+        """SYNC: (label, table, filter, cutoff) for each retention policy in force"""
+        now = datetime.now()
+        days = self.retention_days
+        targets = []
+        with self.get_connection() as conn:
+            actions_table = compact_schema.actions_table(conn.cursor())
+
+        # Tiered mode archives actions instead (see archive_old_actions)
+        if days.get("actions") and not self.archive_after_days:
+            cutoff = now - timedelta(days=days["actions"])
+            targets.append(("Actions", actions_table, "ts < ?", epoch.to_epoch(cutoff)))
+        if days.get("login_events"):
+            cutoff = now - timedelta(days=days["login_events"])
+            targets.append(
+                ("Login Events", "login_events", "ts < ?", epoch.to_epoch(cutoff))
+            )
+        if days.get("profile_history"):
+            cutoff = now - timedelta(days=days["profile_history"])
+            targets.append(
+                ("Profile History", "profile_history", "changed_at < ?", cutoff)
+            )
+        if days.get("ingest_metrics"):
+            cutoff = now - timedelta(days=days["ingest_metrics"])
+            targets.append(
+                ("Ingest Metrics", "ingest_metrics", "ts < ?", epoch.to_epoch(cutoff))
+            )
+        return targets
 
-                return results
+    def _purge_bounds_sync(
+        self, table: str, where: str, cutoff
+    ) -> Tuple[int, Optional[int], Optional[int]]:
+        """SYNC: (count, min id, max id) of the rows a retention policy removes"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT COUNT(*), MIN(id), MAX(id) FROM {table} WHERE {where}",
+                (cutoff,),
+            )
+            return tuple(cursor.fetchone())
+
+    def _purge_chunk_sync(
+        self, table: str, where: str, cutoff, start_id: int, end_id: int
+    ) -> int:
+        """SYNC: Delete one bounded id range (one short write transaction)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"DELETE FROM {table} WHERE id >= ? AND id < ? AND {where}",
+                (start_id, end_id, cutoff),
+            )
+            return cursor.rowcount
+
+    def _incremental_vacuum_sync(self, pages: int) -> Optional[int]:
+        """SYNC: Release up to `pages` free pages to the OS
 
-        return await asyncio.to_thread(_cleanup_sync)
+        Returns the free pages left, or None when the database isn't in
+        auto_vacuum=INCREMENTAL mode.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            free = None
+            for schema in db_domains.schemas(cursor):
+                cursor.execute(f"PRAGMA {schema}.auto_vacuum")
+                if cursor.fetchone()[0] != 2:
+                    continue
+                # executescript steps the pragma to completion (execute() frees 1 page)
+                cursor.executescript(f"PRAGMA {schema}.incremental_vacuum({int(pages)});")
+                cursor.execute(f"PRAGMA {schema}.freelist_count")
+                free = (free or 0) + cursor.fetchone()[0]
+            return free
+
+    async def _purge_table(
+        self,
+        label: str,
+        table: str,
+        where: str,
+        cutoff,
+        chunk_size: int = PURGE_CHUNK_SIZE,
+        pause: float = PURGE_PAUSE,
+        log=logger.info,
+    ) -> int:
+        """Delete one retention target in id-range chunks, returns rows deleted"""
+        count, min_id, max_id = await self.run_read(
+            self._purge_bounds_sync, table, where, cutoff
+        )
+        if not count:
+            return 0
+
+        log(f"🧹 Purging {count:,} {label.lower()} rows from {table}...")
+        deleted = 0
+        chunks = 0
+        start = time.monotonic()
+        for start_id in range(min_id, max_id + 1, chunk_size):
+            deleted += await self.run_write(
+                self._purge_chunk_sync,
+                table,
+                where,
+                cutoff,
+                start_id,
+                start_id + chunk_size,
+                domain=db_domains.domain_of(table),
+            )
+            chunks += 1
+            if chunks % 50 == 0:
+                log(
+                    f"🧹 {label}: {deleted:,}/{count:,} "
+                    f"({deleted / count * 100:.0f}%) purged"
+                )
+            await asyncio.sleep(pause)
+
+        log(
+            f"✅ Purged {deleted:,} {label.lower()} rows in "
+            f"{time.monotonic() - start:.1f}s ({chunks} chunks)"
+        )
+        return deleted
+
+    async def purge_old_data(
+        self,
+        dry_run: bool = False,
+        chunk_size: int = PURGE_CHUNK_SIZE,
+        pause: float = PURGE_PAUSE,
+    ) -> Dict[str, int]:
+        """Apply retention in bounded id-range chunks, then reclaim the space
+
+        Every chunk is its own short transaction and the loop sleeps `pause`
+        seconds between chunks, so scrapers get the write lock in between
+        instead of waiting for one multi-million row DELETE.
+        """
+        results = {}
+        targets = await self.run_read(self._retention_targets_sync)
+
+        for label, table, where, cutoff in targets:
+            if dry_run:
+                results[label] = (
+                    await self.run_read(self._purge_bounds_sync, table, where, cutoff)
+                )[0]
+                continue
+            results[label] = await self._purge_table(
+                label, table, where, cutoff, chunk_size, pause
+            )
+
+        if not dry_run and any(results.values()):
+            await self._reclaim_space(pause)
+
+        return results
+
+    async def trim_ingest_metrics(self, pause: float = PURGE_PAUSE) -> int:
+        """Drop ingest_metrics rows past their retention, returns rows deleted
+
+        The bot adds one row per poll (~17k a day at 5s), so this runs on its
+        own schedule (cleanup_stale_data) instead of waiting for the opt-in
+        retention purge.
+        """
+        days = self.retention_days.get("ingest_metrics")
+        if not days:
+            return 0
+        cutoff = epoch.to_epoch(datetime.now() - timedelta(days=days))
+        return await self._purge_table(
+            "Ingest Metrics",
+            "ingest_metrics",
+            "ts < ?",
+            cutoff,
+            pause=pause,
+            log=logger.debug,
+        )
+
+    async def _reclaim_space(self, pause: float = PURGE_PAUSE) -> None:
+        """Return freed pages to the OS in small incremental_vacuum steps"""
+        remaining = await self.run_write(
+            self._incremental_vacuum_sync, VACUUM_PAGES_PER_STEP
+        )
+        if remaining is None:
+            logger.info(
+                "💡 auto_vacuum is off - freed pages are reused but the file won't "
+                "shrink. Run `PRAGMA auto_vacuum=INCREMENTAL; VACUUM;` once to enable."
+            )
+            return
+
+        while remaining:
+            await asyncio.sleep(pause)
+            remaining = await self.run_write(
+                self._incremental_vacuum_sync, VACUUM_PAGES_PER_STEP
+            )
+        logger.info("🧹 Incremental vacuum complete")
+
+    async def cleanup_old_data(self, dry_run: bool = True) -> Dict[str, int]:
+        """Cleanup old data (archive and/or chunked retention purge)"""
+        results = {}
+        if self.archive_after_days:
+            # 📦 Tiered mode: moved to monthly archives instead of deleted
+            results["Actions (archived)"] = await self.archive_old_actions(dry_run)
+
+        results.update(await self.purge_old_data(dry_run=dry_run))
+        return results
 
     # ========================================================================
     # CSV IMPORT (Consolidated from import_on_startup.py)
     # ========================================================================
 
-    def _import_csv_profiles_sync(self, csv_path: str) -> int:
-        """SYNC: Import player profiles from CSV file"""
+    def _import_csv_profiles_sync(self, rows: List[Dict]) -> int:
+        """SYNC: Import one chunk of CSV profile rows (one write transaction)"""
+        count = 0
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for row in rows:
+                try:
+                    cursor.execute(
+                        """
+                        INSERT INTO player_profiles (
+                            player_id, username, is_online, last_seen,
+                            faction, faction_rank, job, warnings,
+                            played_hours, age_ic, last_profile_update
+                        )
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                        ON CONFLICT(player_id) DO UPDATE SET
+                            username = COALESCE(excluded.username, player_profiles.username),
+                            faction = COALESCE(excluded.faction, player_profiles.faction),
+                            faction_rank = COALESCE(excluded.faction_rank, player_profiles.faction_rank),
+                            job = COALESCE(excluded.job, player_profiles.job),
+                            warnings = COALESCE(excluded.warnings, player_profiles.warnings),
+                            played_hours = COALESCE(excluded.played_hours, player_profiles.played_hours),
+                            age_ic = COALESCE(excluded.age_ic, player_profiles.age_ic),
+                            profile_fingerprint = NULL
+                    """,
+                        (
+                            row.get("player_id"),
+                            row.get("username") or row.get("player_name"),
+                            row.get("is_online", "0") == "1",
+                            row.get("last_seen") or row.get("last_connection"),
+                            row.get("faction") or None,
+                            row.get("faction_rank") or None,
+                            row.get("job") or None,
+                            int(row.get("warnings") or row.get("warns") or 0),
+                            float(row.get("played_hours") or 0),
+                            int(row.get("age_ic") or 0)
+                            if row.get("age_ic")
+                            else None,
+                        ),
+                    )
+                    count += 1
+                except Exception as e:
+                    logger.warning(f"Error importing row: {e}")
+                    continue
+            conn.commit()
+        return count
+
+    async def import_csv_profiles(
+        self,
+        csv_path: str,
+        chunk_size: int = PURGE_CHUNK_SIZE,
+        pause: float = PURGE_PAUSE,
+    ) -> int:
+        """ASYNC: Import player profiles from CSV file
+
+        The file is read in chunks off the loop and each chunk is its own
+        writer job, so an import at startup doesn't hold the writer for the
+        whole file.
+        """
         import csv
 
         count = 0
+        chunks = 0
         try:
             with open(csv_path, "r", encoding="utf-8") as f:
                 reader = csv.DictReader(f)
-                with self.get_connection() as conn:
-                    cursor = conn.cursor()
-                    for row in reader:
-                        try:
-                            cursor.execute(
-                                """
-                                INSERT INTO player_profiles (
-                                    player_id, username, is_online, last_seen,
-                                    faction, faction_rank, job, warnings,
-                                    played_hours, age_ic, last_profile_update
-                                )
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                                ON CONFLICT(player_id) DO UPDATE SET
-                                    username = COALESCE(excluded.username, player_profiles.username),
-                                    faction = COALESCE(excluded.faction, player_profiles.faction),
-                                    faction_rank = COALESCE(excluded.faction_rank, player_profiles.faction_rank),
-                                    job = COALESCE(excluded.job, player_profiles.job),
-                                    warnings = COALESCE(excluded.warnings, player_profiles.warnings),
-                                    played_hours = COALESCE(excluded.played_hours, player_profiles.played_hours),
-                                    age_ic = COALESCE(excluded.age_ic, player_profiles.age_ic)
-                            """,
-                                (
-                                    row.get("player_id"),
-                                    row.get("username") or row.get("player_name"),
-                                    row.get("is_online", "0") == "1",
-                                    row.get("last_seen") or row.get("last_connection"),
-                                    row.get("faction") or None,
-                                    row.get("faction_rank") or None,
-                                    row.get("job") or None,
-                                    int(row.get("warnings") or row.get("warns") or 0),
-                                    float(row.get("played_hours") or 0),
-                                    int(row.get("age_ic") or 0)
-                                    if row.get("age_ic")
-                                    else None,
-                                ),
-                            )
-                            count += 1
-                            if count % 10000 == 0:
-                                conn.commit()
-                                logger.info(f"📊 Imported {count:,} profiles...")
-                        except Exception as e:
-                            logger.warning(f"Error importing row: {e}")
-                            continue
-                    conn.commit()
+                while True:
+                    rows = await asyncio.to_thread(
+                        lambda: list(itertools.islice(reader, chunk_size))
+                    )
+                    if not rows:
+                        break
+                    count += await self.run_write(self._import_csv_profiles_sync, rows)
+                    chunks += 1
+                    if chunks % 10 == 0:
+                        logger.info(f"📊 Imported {count:,} profiles...")
+                    await asyncio.sleep(pause)
             logger.info(f"✅ Imported {count:,} profiles from CSV")
         except Exception as e:
             logger.error(f"Error importing CSV: {e}", exc_info=True)
         return count
 
-    async def import_csv_profiles(self, csv_path: str) -> int:
-        """ASYNC: Import player profiles from CSV file"""
-        return await asyncio.to_thread(self._import_csv_profiles_sync, csv_path)
-
     async def auto_import_csv_if_needed(self, csv_paths: list = None) -> bool:
         """Auto-import CSV if database is empty (consolidates import_on_startup.py)"""
         import_flag = (
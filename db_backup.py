@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Online database backups through the SQLite backup API
+
+Copying the .db file of a live WAL database misses whatever still sits in
+the -wal file and can catch pages mid-write. `backup_database` instead:
+
+- opens a read transaction on the source, so the backup copies one
+  consistent snapshot (WAL readers never block writers, and concurrent
+  commits can't restart the copy)
+- copies `pages_per_step` pages at a time with a short sleep in between
+- runs `PRAGMA quick_check` on the copy, gzips it into
+  `pro4kings_YYYYmmdd_HHMMSS.db.gz` and keeps the newest `keep` backups
+
+A split database (see db_domains.py) is backed up file by file with
+`backup_all` (`pro4kings_events_...`, `pro4kings_live_...`); each file is
+consistent on its own, not across files.
+
+Usage:
+    python db_backup.py                       # Backup to DATABASE_BACKUP_PATH
+    python db_backup.py --keep 14 --no-gzip
+"""
+
+import argparse
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import db_domains
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv("DATABASE_PATH", "data/pro4kings.db")
+BACKUP_DIR = os.getenv("DATABASE_BACKUP_PATH", "data/backups")
+
+BACKUP_PREFIX = "pro4kings_"
+PAGES_PER_STEP = 1024  # 4 MB per step at 4 KB pages
+STEP_SLEEP = 0.05
+
+# progress(copied_pages, total_pages)
+ProgressCallback = Callable[[int, int], None]
+
+
+def list_backups(backup_dir: str, prefix: str = BACKUP_PREFIX) -> List[str]:
+    """Backup files in backup_dir, newest first"""
+    if not os.path.isdir(backup_dir):
+        return []
+    files = [
+        os.path.join(backup_dir, name)
+        for name in os.listdir(backup_dir)
+        if name.startswith(prefix)
+        and name[len(prefix) : len(prefix) + 1].isdigit()  # not another domain's
+        and name.endswith((".db", ".db.gz"))
+    ]
+    return sorted(files, reverse=True)
+
+
+def rotate_backups(backup_dir: str, keep: int, prefix: str = BACKUP_PREFIX) -> List[str]:
+    """Delete all but the newest `keep` backups, returns removed paths"""
+    removed = []
+    if keep <= 0:
+        return removed
+    for path in list_backups(backup_dir, prefix)[keep:]:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not remove old backup {path}: {e}")
+    return removed
+
+
+def _gzip_file(src: str, dst: str) -> None:
+    with open(src, "rb") as f_in, gzip.open(dst, "wb", compresslevel=6) as f_out:
+        shutil.copyfileobj(f_in, f_out, length=1024 * 1024)
+
+
+def backup_database(
+    db_path: str,
+    backup_dir: str,
+    pages_per_step: int = PAGES_PER_STEP,
+    compress: bool = True,
+    keep: int = 7,
+    progress: Optional[ProgressCallback] = None,
+    prefix: str = BACKUP_PREFIX,
+) -> Dict:
+    """Create a consistent backup of a live database (blocking - run in a thread)
+
+    Returns path, sizes, page count, duration and the rotated-out files.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    final_path = os.path.join(
+        backup_dir, f"{prefix}{stamp}.db" + (".gz" if compress else "")
+    )
+    tmp_path = os.path.join(backup_dir, f".{prefix}{stamp}.db.tmp")
+
+    started = time.time()
+    last_reported = [-1]
+
+    def _on_step(_status, remaining, total):
+        if progress is None or not total:
+            return
+        # Report each 10% step once
+        bucket = (total - remaining) * 10 // total
+        if bucket != last_reported[0]:
+            last_reported[0] = bucket
+            progress(total - remaining, total)
+
+    src = sqlite3.connect(db_path, timeout=30.0)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        # Pin one snapshot: other connections' commits don't restart the copy
+        src.execute("BEGIN")
+        src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        src.backup(dst, pages=pages_per_step, progress=_on_step, sleep=STEP_SLEEP)
+        src.rollback()
+
+        pages = dst.execute("PRAGMA page_count").fetchone()[0]
+        check = dst.execute("PRAGMA quick_check").fetchone()[0]
+        if check != "ok":
+            raise sqlite3.DatabaseError(f"Backup failed quick_check: {check}")
+        # Standalone file: no -wal sidecar needed to open it
+        dst.execute("PRAGMA journal_mode=DELETE")
+    except Exception:
+        dst.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        src.close()
+    dst.close()
+
+    db_size = os.path.getsize(tmp_path)
+    if compress:
+        _gzip_file(tmp_path, final_path)
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, final_path)
+
+    result = {
+        "path": final_path,
+        "db_bytes": db_size,
+        "backup_bytes": os.path.getsize(final_path),
+        "pages": pages,
+        "seconds": time.time() - started,
+        "removed": rotate_backups(backup_dir, keep, prefix),
+    }
+    logger.info(
+        f"💾 Backup {os.path.basename(final_path)}: "
+        f"{db_size / 1024 / 1024:.1f} MB -> {result['backup_bytes'] / 1024 / 1024:.1f} MB "
+        f"in {result['seconds']:.1f}s"
+    )
+    return result
+
+
+def backup_all(
+    db_path: str,
+    backup_dir: str,
+    pages_per_step: int = PAGES_PER_STEP,
+    compress: bool = True,
+    keep: int = 7,
+    progress: Optional[ProgressCallback] = None,
+) -> List[Dict]:
+    """Back up the main file and every domain file of a split database"""
+    results = []
+    for path in db_domains.database_files(db_path):
+        prefix = BACKUP_PREFIX
+        for schema in db_domains.DOMAINS:
+            if path == db_domains.domain_path(db_path, schema):
+                prefix = f"{BACKUP_PREFIX}{schema}_"
+        results.append(
+            backup_database(
+                path,
+                backup_dir,
+                pages_per_step=pages_per_step,
+                compress=compress,
+                keep=keep,
+                progress=progress,
+                prefix=prefix,
+            )
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online SQLite backup")
+    parser.add_argument("--db", default=DB_PATH, help="Database path")
+    parser.add_argument("--dir", default=BACKUP_DIR, help="Backup directory")
+    parser.add_argument("--keep", type=int, default=7, help="Backups to keep")
+    parser.add_argument("--pages-per-step", type=int, default=PAGES_PER_STEP)
+    parser.add_argument("--no-gzip", action="store_true", help="Store uncompressed")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found: {args.db}")
+        return
+
+    results = backup_all(
+        args.db,
+        args.dir,
+        pages_per_step=args.pages_per_step,
+        compress=not args.no_gzip,
+        keep=args.keep,
+        progress=lambda done, total: print(
+            f"  ... {done * 100 // total}% ({done:,}/{total:,} pages)"
+        ),
+    )
+    for result in results:
+        print(
+            f"✅ {result['path']} ({result['backup_bytes'] / 1024 / 1024:.1f} MB, "
+            f"{result['seconds']:.1f}s)"
+        )
+        for path in result["removed"]:
+            print(f"🗑️ Rotated out {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Per-domain database files
+
+SQLite has one write lock per database file. With everything in
+`pro4kings.db`, the action ingest, presence updates, profile refreshes and
+ban sync all queue for the same lock. Split mode moves the tables into
+three files, so writers to different domains no longer block each other:
+
+- `pro4kings.db`         profile state: player_profiles, rank_history,
+                         profile_history, scan_progress (stays `main`)
+- `pro4kings-events.db`  hot append-only data: actions (action_log,
+                         action_types, the `actions` view), login_events
+- `pro4kings-live.db`    bans and the online snapshot: banned_players,
+                         online_players
+
+Every connection ATTACHes the domain files that exist (`attach`). SQLite
+resolves unqualified table names across attached schemas, so all existing
+queries, including cross-domain JOINs, keep working unchanged. A transaction
+only locks the files it actually writes to.
+
+Splitting needs the compact layout (run `compact_schema.py --execute`
+first) and copies each domain in one transaction, so stop the bot first:
+    python db_domains.py              # Dry run (rows per domain)
+    python db_domains.py --execute    # Move the tables
+New databases are split at creation with DATABASE_SPLIT=true.
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+DB_PATH = os.getenv("DATABASE_PATH", "data/pro4kings.db")
+
+# schema name -> tables moved into `<db stem>-<schema>.db`
+DOMAINS: Dict[str, Tuple[str, ...]] = {
+    "events": ("action_log", "action_types", "actions", "login_events"),
+    "live": ("banned_players", "online_players"),
+}
+
+_CREATE_RE = re.compile(
+    r"^\s*(CREATE\s+(?:UNIQUE\s+)?(?:TABLE|INDEX|VIEW|TRIGGER)\s+(?:IF\s+NOT\s+EXISTS\s+)?)"
+    r"([\"`]?\w+[\"`]?)(\s+ON\s+([\"`]?\w+[\"`]?))?",
+    re.IGNORECASE,
+)
+
+
+def domain_of(table: str) -> str:
+    """Schema `table` belongs to when split ("main" for everything else)"""
+    for schema, tables in DOMAINS.items():
+        if table in tables:
+            return schema
+    return "main"
+
+
+def domain_path(db_path: str, schema: str) -> str:
+    stem, ext = os.path.splitext(db_path)
+    return f"{stem}-{schema}{ext or '.db'}"
+
+
+def database_files(db_path: str) -> List[str]:
+    """The main file plus every domain file that exists"""
+    return [db_path] + [
+        path
+        for path in (domain_path(db_path, schema) for schema in DOMAINS)
+        if os.path.exists(path)
+    ]
+
+
+def attach(conn: sqlite3.Connection, db_path: str) -> List[str]:
+    """ATTACH the existing domain files, returns the attached schema names"""
+    attached = []
+    for schema in DOMAINS:
+        path = domain_path(db_path, schema)
+        if os.path.exists(path):
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+            attached.append(schema)
+    return attached
+
+
+def schemas(cursor) -> List[str]:
+    """Schema names of the connection (main first, temp excluded)"""
+    cursor.execute("PRAGMA database_list")
+    return [row[1] for row in cursor.fetchall() if row[1] != "temp"]
+
+
+def table_schema(cursor, name: str) -> Optional[str]:
+    """Schema holding table/view `name` (the one unqualified names resolve to)"""
+    for schema in schemas(cursor):
+        cursor.execute(
+            f"SELECT 1 FROM {schema}.sqlite_master WHERE name = ? AND type IN ('table', 'view')",
+            (name,),
+        )
+        if cursor.fetchone():
+            return schema
+    return None
+
+
+def _qualified(sql: str, schema: str) -> str:
+    """CREATE statement with its object name placed in `schema`"""
+    match = _CREATE_RE.match(sql)
+    if not match:
+        return sql
+    return sql[: match.start(2)] + f"{schema}." + sql[match.start(2) :]
+
+
+def qualify(cursor, sql: str) -> str:
+    """Route a CREATE TABLE/INDEX IF NOT EXISTS to the schema its table lives in
+
+    Unqualified CREATE statements always target `main`, and IF NOT EXISTS
+    only looks there - after a split they would create empty shadow tables.
+    """
+    match = _CREATE_RE.match(sql)
+    if not match:
+        return sql
+    table = (match.group(4) or match.group(2)).strip('"`')
+    schema = table_schema(cursor, table)
+    if schema in (None, "main"):
+        return sql
+    return _qualified(sql, schema)
+
+
+def _main_objects(conn: sqlite3.Connection, tables: Tuple[str, ...]) -> List[tuple]:
+    """(type, name, tbl_name, sql) of main objects belonging to `tables`"""
+    placeholders = ",".join("?" * len(tables))
+    return conn.execute(
+        f"""
+        SELECT type, name, tbl_name, sql FROM main.sqlite_master
+        WHERE tbl_name IN ({placeholders}) AND sql IS NOT NULL
+        ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1
+                           WHEN 'view' THEN 2 ELSE 3 END
+    """,
+        tables,
+    ).fetchall()
+
+
+def _move_domain(conn: sqlite3.Connection, schema: str, tables: Tuple[str, ...]) -> int:
+    """Copy one domain's tables into its attached file and drop them from main"""
+    objects = _main_objects(conn, tables)
+    physical = [name for kind, name, _tbl, _sql in objects if kind == "table"]
+    moved = 0
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for kind, name, _tbl, sql in objects:
+            if kind == "table":
+                sql = re.sub(r"^CREATE TABLE\s+(?!IF)", "CREATE TABLE IF NOT EXISTS ", sql)
+            else:
+                sql = re.sub(
+                    rf"^CREATE (UNIQUE )?{kind.upper()}\s+(?!IF)",
+                    rf"CREATE \g<1>{kind.upper()} IF NOT EXISTS ",
+                    sql,
+                )
+            conn.execute(_qualified(sql, schema))
+            if kind == "table":
+                # table_info leaves out generated columns (not insertable)
+                columns = ", ".join(
+                    row[1] for row in conn.execute(f"PRAGMA main.table_info({name})")
+                )
+                cursor = conn.execute(
+                    f"INSERT OR IGNORE INTO {schema}.{name} ({columns}) "
+                    f"SELECT {columns} FROM main.{name}"
+                )
+                moved += cursor.rowcount
+
+        # Keep AUTOINCREMENT counters (deleted ids are never reused)
+        if all(
+            conn.execute(
+                f"SELECT 1 FROM {name}.sqlite_master WHERE name = 'sqlite_sequence'"
+            ).fetchone()
+            for name in ("main", schema)
+        ):
+            placeholders = ",".join("?" * len(physical))
+            conn.execute(
+                f"DELETE FROM {schema}.sqlite_sequence WHERE name IN ({placeholders})",
+                physical,
+            )
+            conn.execute(
+                f"INSERT INTO {schema}.sqlite_sequence (name, seq) SELECT name, seq "
+                f"FROM main.sqlite_sequence WHERE name IN ({placeholders})",
+                physical,
+            )
+
+        # Views first (dropping one drops its triggers), then the tables
+        for kind, name, _tbl, _sql in objects:
+            if kind == "view":
+                conn.execute(f"DROP VIEW main.{name}")
+        for name in physical:
+            conn.execute(f"DROP TABLE main.{name}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return moved
+
+
+def split_database(db_path: str, execute: bool = False, log=print) -> Dict[str, int]:
+    """Move every domain's tables out of the main file, returns rows per domain
+
+    Safe to re-run: tables already moved are skipped, and a domain copied but
+    not yet dropped from main (interrupted commit) is completed.
+    """
+    conn = sqlite3.connect(db_path, timeout=30.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    try:
+        attach(conn, db_path)
+        if table_schema(conn.cursor(), "action_log") is None:
+            raise RuntimeError(
+                "Split needs the compact layout - run `python compact_schema.py --execute` first"
+            )
+
+        results = {}
+        for schema, tables in DOMAINS.items():
+            present = tuple(
+                name
+                for (name,) in conn.execute(
+                    f"SELECT name FROM main.sqlite_master WHERE type IN ('table', 'view') "
+                    f"AND name IN ({','.join('?' * len(tables))})",
+                    tables,
+                )
+            )
+            path = domain_path(db_path, schema)
+            if not present:
+                log(f"✅ {schema}: already in {path}")
+                continue
+
+            rows = sum(
+                conn.execute(f"SELECT COUNT(*) FROM main.{name}").fetchone()[0]
+                for name in present
+                if name != "actions" or "action_log" not in present
+            )
+            log(f"📦 {schema}: {', '.join(present)} ({rows:,} rows) -> {path}")
+            if not execute:
+                results[schema] = rows
+                continue
+
+            started = time.time()
+            if schema not in schemas(conn.cursor()):
+                conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+            if conn.execute(f"SELECT COUNT(*) FROM {schema}.sqlite_master").fetchone()[0] == 0:
+                # Must be set before the first table exists
+                conn.execute(f"PRAGMA {schema}.auto_vacuum=INCREMENTAL")
+            conn.execute(f"PRAGMA {schema}.journal_mode=WAL")
+            results[schema] = _move_domain(conn, schema, present)
+            log(f"✅ {schema}: {results[schema]:,} rows moved in {time.time() - started:.1f}s")
+
+        if execute and results:
+            log(
+                "🧹 The main file keeps the freed pages - the retention purge's "
+                "incremental vacuum (or a VACUUM) returns them to the OS"
+            )
+        elif results:
+            log("🔍 Dry run - stop the bot and re-run with --execute to split")
+        return results
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split the database into domain files")
+    parser.add_argument("--db", default=DB_PATH, help="Database path")
+    parser.add_argument(
+        "--execute", action="store_true", help="Move tables (default: dry run)"
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found: {args.db}")
+        return
+
+    split_database(args.db, execute=args.execute)
+
+
+if __name__ == "__main__":
+    main()
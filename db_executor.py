@@ -0,0 +1,160 @@
+"""Dedicated executors for database work
+
+`asyncio.to_thread` runs everything on the loop's default executor, shared
+with cloudscraper page fetches and any other blocking call - a few slow
+banlist pages can leave action writes queued behind them. `DBExecutor`
+gives the database its own threads:
+
+- a bounded read pool (WAL readers run concurrently)
+- one write thread per database file (SQLite allows one writer per file
+  anyway, so writers queue here in order instead of spinning on
+  busy_timeout). With split domain files (db_domains.py) the events and
+  live files get their own writer, so a long profile write doesn't hold
+  up action or presence inserts
+- at most `max_pending` jobs outstanding across all of them; further
+  callers wait for a slot
+
+Queue wait (submit -> start) and execution time are recorded per method.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+READ = "read"
+WRITE = "write"
+
+
+def job_name(fn: Callable) -> str:
+    """Metrics key: the public method a sync helper or local closure belongs to"""
+    qualname = getattr(fn, "__qualname__", "job")
+    if ".<locals>." in qualname:
+        qualname = qualname.split(".<locals>.")[0]
+    name = qualname.rsplit(".", 1)[-1].lstrip("_")
+    if name.endswith("_sync"):
+        name = name[: -len("_sync")]
+    return name
+
+
+class DBExecutor:
+    """Read pool + one writer thread per database file, with per-method timing"""
+
+    def __init__(self, read_workers: int = 4, max_pending: int = 200):
+        self.read_workers = max(1, read_workers)
+        self.max_pending = max(1, max_pending)
+        self._pools = {
+            READ: ThreadPoolExecutor(
+                max_workers=self.read_workers, thread_name_prefix="db-read"
+            ),
+        }
+        # writer name ("main" or a db_domains schema) -> its single thread
+        self._writers: Dict[str, ThreadPoolExecutor] = {}
+        # (loop, semaphore) - created on first use so it binds to the running loop
+        self._slots = (None, None)
+        self._pending = {READ: 0, WRITE: 0}
+        self._slot_waits = 0
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def _pool(self, kind: str, writer: str) -> ThreadPoolExecutor:
+        if kind == READ:
+            return self._pools[READ]
+        with self._lock:
+            pool = self._writers.get(writer)
+            if pool is None:
+                pool = self._writers[writer] = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix=f"db-write-{writer}"
+                )
+            return pool
+
+    async def run(
+        self, kind: str, fn: Callable, *args, writer: str = "main", **kwargs
+    ) -> Any:
+        """Run fn(*args, **kwargs) on the read pool or on `writer`'s thread"""
+        loop = asyncio.get_running_loop()
+        slots_loop, slots = self._slots
+        if slots_loop is not loop:
+            slots = asyncio.Semaphore(self.max_pending)
+            self._slots = (loop, slots)
+        if slots.locked():
+            with self._lock:
+                self._slot_waits += 1
+
+        async with slots:
+            submitted = time.perf_counter()
+            name = job_name(fn)
+
+            def job():
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self._record(
+                        name, kind, started - submitted, time.perf_counter() - started
+                    )
+
+            with self._lock:
+                self._pending[kind] += 1
+            try:
+                return await loop.run_in_executor(self._pool(kind, writer), job)
+            finally:
+                with self._lock:
+                    self._pending[kind] -= 1
+
+    def _record(self, name: str, kind: str, wait: float, run: float) -> None:
+        with self._lock:
+            entry = self._metrics.get(name)
+            if entry is None:
+                entry = self._metrics[name] = {
+                    "kind": kind,
+                    "calls": 0,
+                    "wait_total": 0.0,
+                    "wait_max": 0.0,
+                    "run_total": 0.0,
+                    "run_max": 0.0,
+                }
+            entry["calls"] += 1
+            entry["wait_total"] += wait
+            entry["wait_max"] = max(entry["wait_max"], wait)
+            entry["run_total"] += run
+            entry["run_max"] = max(entry["run_max"], run)
+
+    def stats(self) -> Dict:
+        """Pending jobs and per-method timings (ms), slowest total first"""
+        with self._lock:
+            methods = {
+                name: {
+                    "kind": entry["kind"],
+                    "calls": entry["calls"],
+                    "wait_avg_ms": round(
+                        entry["wait_total"] / entry["calls"] * 1000, 2
+                    ),
+                    "wait_max_ms": round(entry["wait_max"] * 1000, 2),
+                    "run_avg_ms": round(
+                        entry["run_total"] / entry["calls"] * 1000, 2
+                    ),
+                    "run_max_ms": round(entry["run_max"] * 1000, 2),
+                    "run_total_s": round(entry["run_total"], 2),
+                }
+                for name, entry in self._metrics.items()
+            }
+            return {
+                "read_workers": self.read_workers,
+                "writers": sorted(self._writers),
+                "max_pending": self.max_pending,
+                "pending_reads": self._pending[READ],
+                "pending_writes": self._pending[WRITE],
+                "waited_for_slot": self._slot_waits,
+                "methods": dict(
+                    sorted(methods.items(), key=lambda item: -item[1]["run_total_s"])
+                ),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the threads (queued writes still run unless wait=False)"""
+        with self._lock:
+            pools = list(self._pools.values()) + list(self._writers.values())
+        for pool in pools:
+            pool.shutdown(wait=wait)
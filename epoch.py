@@ -0,0 +1,75 @@
+"""Integer epoch helpers for the generated `ts` columns
+
+`actions.ts` and `login_events.ts` are VIRTUAL generated columns computed as
+`strftime('%s', timestamp)` and indexed. Timestamps are stored as naive
+Romania wall-clock time (panel and bot use local time), so `ts` is "local
+seconds since 1970" - not a true UTC epoch. That keeps hour-of-day and
+day-of-week bucketing a matter of integer arithmetic, in SQL or Python,
+without parsing any strings.
+"""
+
+import calendar
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Union
+
+# Generated column definition (added by Database._init_database_sync)
+TS_COLUMN_SQL = (
+    "INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', timestamp) AS INTEGER)) VIRTUAL"
+)
+
+HOUR = 3600
+DAY = 86400
+
+# SQL expressions for bucketing a ts column (1970-01-01 was a Thursday)
+SQL_HOUR_OF_DAY = "(({col} / 3600) % 24)"
+SQL_WEEKDAY = "((({col} / 86400) + 3) % 7)"  # 0 = Monday
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(value: Union[datetime, str, int, None]) -> Optional[int]:
+    """Convert a naive datetime (or timestamp string) to local epoch seconds"""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.rstrip("Z"))
+        except ValueError:
+            return None
+    return calendar.timegm(value.timetuple())
+
+
+def now_epoch() -> int:
+    """Current local wall-clock time as epoch seconds"""
+    return to_epoch(datetime.now())
+
+
+def from_epoch(ts: Optional[int]) -> Optional[datetime]:
+    """Naive local datetime for an epoch value"""
+    if ts is None:
+        return None
+    return _EPOCH + timedelta(seconds=ts)
+
+
+def format_epoch(ts: Optional[int], fmt: str = "%Y-%m-%d %H:%M:%S") -> str:
+    """strftime for epoch values without building a datetime"""
+    if ts is None:
+        return ""
+    return time.strftime(fmt, time.gmtime(ts))
+
+
+def time_ago(ts: Optional[int], now: Optional[int] = None) -> str:
+    """Short relative time ('5m ago') for an epoch value"""
+    if ts is None:
+        return ""
+    diff = (now if now is not None else now_epoch()) - ts
+    if diff < 60:
+        return "Just now"
+    if diff < HOUR:
+        return f"{diff // 60}m ago"
+    if diff < DAY:
+        return f"{diff // HOUR}h ago"
+    return f"{diff // DAY}d ago"
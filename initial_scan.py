@@ -40,6 +40,7 @@ class FastScanner:
         self.stats = {
             "total_scanned": 0,
             "found": 0,
+            "changed": 0,
             "not_found": 0,
             "errors": 0,
             "retries_503": 0,
@@ -71,6 +72,32 @@ class FastScanner:
         except Exception as e:
             logger.error(f"Error saving scan state: {e}")
 
+    async def save_profiles(self, profiles: List) -> None:
+        """Persist one scraped batch in a single transaction and update stats"""
+        profile_dicts = [
+            {
+                "player_id": profile.player_id,
+                "player_name": profile.username,
+                "is_online": profile.is_online,
+                "last_connection": profile.last_seen,
+                "faction": profile.faction,
+                "faction_rank": profile.faction_rank,
+                "job": profile.job,
+                "warns": profile.warnings,
+                "played_hours": profile.played_hours,
+                "age_ic": profile.age_ic,
+            }
+            for profile in profiles
+            if profile
+        ]
+        if not profile_dicts:
+            return
+
+        changed = await self.db.save_player_profiles_bulk(profile_dicts)
+        async with self.stats_lock:
+            self.stats["found"] += len(profile_dicts)
+            self.stats["changed"] += changed
+
     async def worker(
         self,
         worker_id: int,
@@ -84,23 +111,7 @@ class FastScanner:
                 )
                 profiles = await scraper.batch_get_profiles(batch_ids)
 
-                for profile in profiles:
-                    if profile:
-                        profile_dict = {
-                            "player_id": profile.player_id,
-                            "player_name": profile.username,
-                            "is_online": profile.is_online,
-                            "last_connection": profile.last_seen,
-                            "faction": profile.faction,
-                            "faction_rank": profile.faction_rank,
-                            "job": profile.job,
-                            "warns": profile.warnings,
-                            "played_hours": profile.played_hours,
-                            "age_ic": profile.age_ic,
-                        }
-                        await self.db.save_player_profile(profile_dict)
-                        async with self.stats_lock:
-                            self.stats["found"] += 1
+                await self.save_profiles(profiles)
 
                 found_count = len([p for p in profiles if p])
                 not_found_count = len(batch_ids) - found_count
@@ -121,21 +132,7 @@ class FastScanner:
                     await asyncio.sleep(10)
                     try:
                         profiles = await scraper.batch_get_profiles(batch_ids)
-                        for profile in profiles:
-                            if profile:
-                                profile_dict = {
-                                    "player_id": profile.player_id,
-                                    "player_name": profile.username,
-                                    "is_online": profile.is_online,
-                                    "last_connection": profile.last_seen,
-                                    "faction": profile.faction,
-                                    "faction_rank": profile.faction_rank,
-                                    "job": profile.job,
-                                    "warns": profile.warnings,
-                                    "played_hours": profile.played_hours,
-                                    "age_ic": profile.age_ic,
-                                }
-                                await self.db.save_player_profile(profile_dict)
+                        await self.save_profiles(profiles)
                         async with self.stats_lock:
                             self.stats["total_scanned"] += len(batch_ids)
                     except Exception as retry_error:
@@ -236,12 +233,18 @@ class FastScanner:
             success_rate = (
                 (self.stats["found"] / current_count * 100) if current_count > 0 else 0
             )
+            change_ratio = (
+                (self.stats["changed"] / self.stats["found"] * 100)
+                if self.stats["found"] > 0
+                else 0
+            )
 
             logger.info(
                 f"""
 ╔════════════════════════════════════════════════════════════╗
 ║ PROGRESS: {progress:.1f}% ({current_count:,}/{END_ID - start_id + 1:,})
 ║ Found: {self.stats['found']:,} ({success_rate:.1f}%) | Not Found: {self.stats['not_found']:,}
+║ Changed: {self.stats['changed']:,} ({change_ratio:.1f}% of found)
 ║ Errors: {self.stats['errors']:,} | 503 Retries: {self.stats['retries_503']:,}
 ║
 ║ 📈 Performance:
@@ -267,6 +270,11 @@ class FastScanner:
             if self.stats["total_scanned"] > 0
             else 0
         )
+        change_ratio = (
+            (self.stats["changed"] / self.stats["found"] * 100)
+            if self.stats["found"] > 0
+            else 0
+        )
 
         logger.info("\n" + "=" * 60)
         logger.info("✅ SCAN COMPLETED!")
@@ -276,6 +284,7 @@ class FastScanner:
 📊 Statistics:
   Total Scanned: {self.stats['total_scanned']:,}
   Found (exists): {self.stats['found']:,} ({success_rate:.1f}%)
+  Changed: {self.stats['changed']:,} ({change_ratio:.1f}% of found, rest unchanged)
   Not Found (404): {self.stats['not_found']:,}
   Errors: {self.stats['errors']:,}
   503 Retries: {self.stats['retries_503']:,}
@@ -0,0 +1,190 @@
+"""Event-loop lag sampler and blocking-call detector
+
+Everything in the bot (discord.py heartbeats, `tasks.loop` scrapers, HTML
+parsing) shares one asyncio loop, so a single slow synchronous call stalls
+all of it. `LoopMonitor` measures that two ways:
+
+- lag: a coroutine sleeps `interval` seconds and records how late it woke
+  up (actual - scheduled). Sustained lag means the loop is saturated.
+- blocking: a daemon thread watches the sampler's heartbeat. When it has not
+  advanced for `block_threshold` seconds the loop is stuck inside one
+  callback, and the thread captures the loop thread's current stack with
+  `sys._current_frames()` - the code that is blocking, not a later symptom.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lag samples kept for percentiles (10 min at the default 0.5s interval)
+LAG_WINDOW = 1200
+
+# Blocking events kept with their stacks
+BLOCK_HISTORY = 20
+
+# Innermost frames kept per captured stack
+STACK_DEPTH = 25
+
+_REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class LoopMonitor:
+    """Samples loop lag and records stacks of callbacks that block the loop"""
+
+    def __init__(self, interval: float = 0.5, block_threshold: float = 0.5):
+        self.interval = interval
+        # 0 disables the blocking detector (lag sampling keeps running)
+        self.block_threshold = block_threshold
+
+        self.lags: deque = deque(maxlen=LAG_WINDOW)
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self.samples = 0
+        self.blocked_count = 0
+        self.blocked_seconds = 0.0
+        self.blocks: deque = deque(maxlen=BLOCK_HISTORY)
+
+        self._task: Optional[asyncio.Task] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._current_block: Optional[Dict] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start sampling on the running loop (idempotent)"""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        if self.block_threshold > 0 and not (self._watcher and self._watcher.is_alive()):
+            self._watcher = threading.Thread(
+                target=self._watch, name="loop-block-detector", daemon=True
+            )
+            self._watcher.start()
+        logger.info(
+            f"⏱️ Loop monitor started (sample every {self.interval:g}s, "
+            + (
+                f"blocking over {self.block_threshold * 1000:.0f}ms)"
+                if self.block_threshold > 0
+                else "blocking detector off)"
+            )
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _sample(self) -> None:
+        while True:
+            scheduled = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - scheduled)
+            self._beat(now)
+            self.lag_last = lag
+            self.lag_max = max(self.lag_max, lag)
+            self.lags.append(lag)
+            self.samples += 1
+
+    def _beat(self, now: float) -> None:
+        with self._lock:
+            self._heartbeat = now
+            block, self._current_block = self._current_block, None
+        if block:
+            # The loop is back: the block lasted until this wakeup
+            block["blocked_s"] = round(now - block["_since"], 3)
+            self.blocked_seconds += block["blocked_s"]
+            logger.warning(
+                f"🐢 Event loop was blocked for {block['blocked_s']:.2f}s in "
+                f"{block['where']}"
+            )
+
+    def _watch(self) -> None:
+        """Daemon thread: capture the loop thread's stack once per block"""
+        poll = max(0.05, self.block_threshold / 2)
+        while not self._stop.wait(poll):
+            with self._lock:
+                # Sleep interval is expected idle time, not blocking
+                since = self._heartbeat + self.interval
+                stalled = time.monotonic() - since
+                if self._current_block or stalled < self.block_threshold:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is None:
+                    continue
+                stack = traceback.extract_stack(frame)[-STACK_DEPTH:]
+                block = {
+                    "at": datetime.now().isoformat(timespec="seconds"),
+                    "blocked_s": round(stalled, 3),
+                    "where": _where(stack),
+                    "stack": traceback.format_list(stack),
+                    "_since": since,
+                }
+                self._current_block = block
+                self.blocks.append(block)
+                self.blocked_count += 1
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        samples = sorted(self.lags)
+        if not samples:
+            return {"p50": None, "p99": None}
+        return {
+            "p50": samples[len(samples) // 2],
+            "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        }
+
+    def recent_blocks(self, limit: int = 5) -> List[Dict]:
+        """Newest first, without internal fields"""
+        return [
+            {k: v for k, v in block.items() if not k.startswith("_")}
+            for block in list(self.blocks)[::-1][:limit]
+        ]
+
+    def stats(self) -> Dict:
+        percentiles = self.percentiles()
+        return {
+            "running": self.running,
+            "interval_s": self.interval,
+            "block_threshold_ms": round(self.block_threshold * 1000),
+            "samples": self.samples,
+            "lag_last_ms": round(self.lag_last * 1000, 1),
+            "lag_p50_ms": (
+                round(percentiles["p50"] * 1000, 1) if percentiles["p50"] is not None else None
+            ),
+            "lag_p99_ms": (
+                round(percentiles["p99"] * 1000, 1) if percentiles["p99"] is not None else None
+            ),
+            "lag_max_ms": round(self.lag_max * 1000, 1),
+            "blocked_count": self.blocked_count,
+            "blocked_seconds": round(self.blocked_seconds, 2),
+            "last_block": self.recent_blocks(1)[0] if self.blocks else None,
+        }
+
+
+def _where(stack) -> str:
+    """Innermost frame in this repo, else the innermost frame"""
+    for entry in reversed(stack):
+        if entry.filename.startswith(_REPO_DIR) and entry.filename != __file__:
+            break
+    else:
+        entry = stack[-1]
+    return f"{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}"
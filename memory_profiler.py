@@ -0,0 +1,132 @@
+"""On-demand allocation growth profile (tracemalloc)
+
+tracemalloc hooks every allocation while it is tracing, so the bot does not
+keep it on. `profile` turns it on for one window only:
+
+1. start tracing (unless it already was, e.g. PYTHONTRACEMALLOC=1)
+2. snapshot, wait `seconds`, snapshot again
+3. diff the two by file/line (or full traceback) - what grew in between
+4. stop tracing again and free the traces
+
+Only allocations made after tracing starts are visible, so the first
+snapshot is the baseline and the diff is the growth over the window.
+Snapshots are taken and compared in a worker thread; the loop keeps running.
+"""
+
+import asyncio
+import linecache
+import os
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List
+
+MAX_SECONDS = 600
+MAX_FRAMES = 25
+
+# Allocations of the profiler machinery itself
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+_lock = asyncio.Lock()
+
+
+class MemoryProfile:
+    """Top growth sites between two snapshots"""
+
+    def __init__(self, seconds: float, group_by: str, frames: int):
+        self.seconds = seconds
+        self.group_by = group_by
+        self.frames = frames
+        self.started_at = datetime.now()
+        self.growth: List[tracemalloc.StatisticDiff] = []
+        self.total_growth = 0
+        self.traced_peak = 0
+        self.tracing_overhead = 0
+
+    def top(self, limit: int = 10) -> List[Dict]:
+        return [
+            {
+                "location": _location(stat.traceback[0]),
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "size_kb": round(stat.size / 1024, 1),
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+                "traceback": [_location(frame) for frame in stat.traceback],
+            }
+            for stat in self.growth[:limit]
+        ]
+
+    def report(self, limit: int = 50) -> str:
+        lines = [
+            f"Memory growth profile - {self.started_at.isoformat(timespec='seconds')}",
+            f"{self.seconds:g}s window, grouped by {self.group_by}, "
+            f"{self.frames} frame(s) per allocation",
+            f"Growth: {self.total_growth / 1024:.1f} KiB • traced peak "
+            f"{self.traced_peak / 1024**2:.1f} MiB • tracemalloc overhead "
+            f"{self.tracing_overhead / 1024**2:.1f} MiB",
+            "",
+        ]
+        for i, stat in enumerate(self.growth[:limit], 1):
+            lines.append(
+                f"#{i}: {stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+} blocks), "
+                f"now {stat.size / 1024:.1f} KiB in {stat.count} blocks"
+            )
+            lines.extend("    " + line for line in stat.traceback.format())
+        return "\n".join(lines) + "\n"
+
+
+async def profile(
+    seconds: float, frames: int = 1, group_by: str = "lineno"
+) -> MemoryProfile:
+    """Trace allocations for `seconds` and return the growth between snapshots
+
+    Raises RuntimeError when another memory profile is already running.
+    """
+    if _lock.locked():
+        raise RuntimeError("A memory profile is already running")
+    async with _lock:
+        seconds = max(1, min(seconds, MAX_SECONDS))
+        frames = max(1, min(frames, MAX_FRAMES))
+        group_by = "traceback" if frames > 1 else group_by
+        result = MemoryProfile(seconds, group_by, frames)
+
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(frames)
+        try:
+            before = await asyncio.to_thread(_snapshot)
+            await asyncio.sleep(seconds)
+            after = await asyncio.to_thread(_snapshot)
+            result.traced_peak = tracemalloc.get_traced_memory()[1]
+            result.tracing_overhead = tracemalloc.get_tracemalloc_memory()
+            result.growth = await asyncio.to_thread(
+                lambda: [
+                    stat
+                    for stat in after.compare_to(before, group_by)
+                    if stat.size_diff > 0
+                ]
+            )
+            result.total_growth = sum(stat.size_diff for stat in result.growth)
+        finally:
+            if started_here:
+                tracemalloc.stop()
+        return result
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+
+def _location(frame: tracemalloc.Frame) -> str:
+    filename = frame.filename
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        filename = filename.split(marker, 1)[1]
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{frame.lineno}"
@@ -0,0 +1,339 @@
+"""Prometheus text-format metrics for the bot process
+
+A small in-process registry (no client library needed) with counters,
+histograms and a windowed summary for latency percentiles. Values that
+already live elsewhere (TASK_HEALTH, executor queues, pipeline counters)
+are read at scrape time by collectors registered with `add_collector`.
+
+`start_server` serves GET /metrics on an aiohttp web server inside the bot's
+event loop. The dashboard reads it with `fetch` + `parse_text`.
+"""
+
+import logging
+import math
+import threading
+import time
+import urllib.request
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Process start (unix time), exported as p4k_process_start_time_seconds
+START_TIME = time.time()
+
+# Seconds - covers sub-second scrapes up to multi-minute purges/backups
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+# (labels, value) as returned by collectors
+Sample = Tuple[Dict[str, str], float]
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(labels: Iterable[Tuple[str, str]]) -> str:
+    labels = list(labels)
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _number(value: float) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_labels_text(key)} {_number(value)}"
+            for key, value in values.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=DURATION_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts..., +Inf count], sum
+        self._values: Dict[LabelKey, List] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = entry[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = self.header()
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = _number(bound) if bound != math.inf else "+Inf"
+                lines.append(
+                    f"{self.name}_bucket{_labels_text(key + (('le', le),))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels_text(key)} {_number(round(total, 6))}")
+            lines.append(f"{self.name}_count{_labels_text(key)} {cumulative}")
+        return lines
+
+
+class Summary(_Metric):
+    """Quantiles over the last `window` observations, plus lifetime sum/count"""
+
+    kind = "summary"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        quantiles=(0.5, 0.9, 0.99),
+        window: int = 1000,
+    ):
+        super().__init__(name, help_text)
+        self.quantiles = quantiles
+        self._samples = deque(maxlen=window)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._samples.append(value)
+            self._sum += value
+            self._count += 1
+
+    def percentiles(self) -> Dict[float, Optional[float]]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {q: None for q in self.quantiles}
+        return {
+            q: samples[min(len(samples) - 1, int(q * len(samples)))]
+            for q in self.quantiles
+        }
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for q, value in self.percentiles().items():
+            lines.append(
+                f"{self.name}{_labels_text((('quantile', _number(q)),))} "
+                f"{_number(round(value, 6)) if value is not None else 'NaN'}"
+            )
+        with self._lock:
+            lines.append(f"{self.name}_sum {_number(round(self._sum, 6))}")
+            lines.append(f"{self.name}_count {self._count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: Dict[str, Callable] = {}
+        self._duplicates: set = set()  # Families already warned about
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable, name: Optional[str] = None) -> None:
+        """collector() -> iterable of (name, type, help, [(labels, value), ...])
+
+        Collectors are keyed by `name` (default: the function name); adding
+        one under a name that is already taken is ignored.
+        """
+        name = name or collector.__name__
+        if name in self._collectors:
+            logger.warning(f"⚠️ Metrics collector {name!r} already registered - ignored")
+            return
+        self._collectors[name] = collector
+
+    def render(self) -> str:
+        lines = []
+        seen = set()
+        for metric in self._metrics:
+            lines.extend(metric.render())
+            seen.add(metric.name)
+        for collector_name, collector in self._collectors.items():
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.error(f"❌ Metrics collector failed: {e}", exc_info=True)
+                continue
+            for name, kind, help_text, samples in families:
+                # A family exposed twice makes Prometheus reject the whole scrape
+                if name in seen:
+                    if name not in self._duplicates:
+                        self._duplicates.add(name)
+                        logger.warning(
+                            f"⚠️ Metric family {name} from collector {collector_name!r} "
+                            "already exposed - skipped"
+                        )
+                    continue
+                seen.add(name)
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels_text(_key(labels))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TASK_DURATION = REGISTRY.register(
+    Histogram("p4k_task_duration_seconds", "Background task iteration duration")
+)
+SCRAPER_REQUEST_SECONDS = REGISTRY.register(
+    Summary("p4k_scraper_request_seconds", "Panel HTTP request latency (last 1000)")
+)
+SCRAPER_RESPONSES = REGISTRY.register(
+    Counter("p4k_scraper_responses_total", "Panel HTTP responses by status")
+)
+
+
+async def start_server(
+    host: str, port: int, registry: Registry = REGISTRY, routes: Optional[Dict] = None
+):
+    """Serve /metrics (+ extra GET `routes`: path -> handler) on the running loop
+
+    Returns the aiohttp AppRunner.
+    """
+    from aiohttp import web
+
+    async def handle(_request):
+        return web.Response(
+            body=registry.render().encode(),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    for path, handler in (routes or {}).items():
+        app.router.add_get(path, handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def parse_text(text: str) -> Dict[str, List[Sample]]:
+    """Prometheus text -> {name: [(labels, value), ...]} (enough for our own output)"""
+    families: Dict[str, List[Sample]] = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name_part, _, value = line.rpartition(" ")
+        labels = {}
+        if "{" in name_part:
+            name, _, label_text = name_part.partition("{")
+            label_text = label_text.rstrip("}")
+            for item in _split_labels(label_text):
+                key, _, raw = item.partition("=")
+                labels[key] = (
+                    raw.strip('"').replace('\\"', '"').replace("\\n", "\n").replace("\\\\", "\\")
+                )
+        else:
+            name = name_part
+        try:
+            number = float(value)
+        except ValueError:
+            continue
+        families.setdefault(name, []).append((labels, number))
+    return families
+
+
+def _split_labels(text: str) -> List[str]:
+    items, current, quoted, escaped = [], "", False, False
+    for char in text:
+        if escaped:
+            current += char
+            escaped = False
+        elif char == "\\":
+            current += char
+            escaped = True
+        elif char == '"':
+            current += char
+            quoted = not quoted
+        elif char == "," and not quoted:
+            items.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        items.append(current)
+    return items
+
+
+def fetch(url: str, timeout: float = 1.0) -> Optional[Dict[str, List[Sample]]]:
+    """Read and parse a /metrics endpoint, None if unreachable"""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return parse_text(response.read().decode())
+    except Exception as e:
+        logger.debug(f"Metrics endpoint {url} unreachable: {e}")
+        return None
+
+
+def value(
+    families: Dict[str, List[Sample]], name: str, default=None, **labels
+) -> Optional[float]:
+    """First sample of `name` whose labels include `labels`"""
+    for sample_labels, number in families.get(name, []):
+        if all(sample_labels.get(k) == str(v) for k, v in labels.items()):
+            return number
+    return default
+
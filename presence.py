@@ -0,0 +1,134 @@
+"""In-memory presence tracker for login/logout event deduplication"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceTracker:
+    """Tracks each player's last login/logout state in memory
+
+    Replaces the per-event `ORDER BY timestamp DESC LIMIT 1` lookups on
+    login_events: the state is loaded once from the database at startup,
+    transitions are decided here, and the resulting events are persisted in
+    a single batched transaction via flush().
+    """
+
+    def __init__(self):
+        # player_id -> {"state": "login"|"logout", "login_time": datetime|None}
+        self._state: Dict[str, Dict] = {}
+        self._pending: List[Dict] = []
+        self.loaded = False
+
+    async def load(self, db) -> int:
+        """Load the last known event per player from login_events"""
+        rows = await db.get_presence_state()
+        self._state = {}
+        for row in rows:
+            login_time = None
+            if row["event_type"] == "login":
+                login_time = _to_datetime(row["timestamp"])
+            self._state[row["player_id"]] = {
+                "state": row["event_type"],
+                "login_time": login_time,
+            }
+        self.loaded = True
+        logger.info(f"🟢 Presence tracker loaded state for {len(self._state):,} players")
+        return len(self._state)
+
+    def is_online(self, player_id: str) -> bool:
+        """Return True if the player's last recorded event is a login"""
+        entry = self._state.get(player_id)
+        return bool(entry and entry["state"] == "login")
+
+    def record_login(
+        self, player_id: str, player_name: Optional[str], timestamp: datetime
+    ) -> bool:
+        """Queue a login event unless the player is already logged in
+
+        Returns True if a login event was queued, False if skipped (duplicate)
+        """
+        entry = self._state.get(player_id)
+        if entry and entry["state"] == "login":
+            logger.debug(
+                f"Skipping duplicate login for player {player_id} - already logged in"
+            )
+            return False
+
+        self._state[player_id] = {"state": "login", "login_time": timestamp}
+        self._pending.append(
+            {
+                "player_id": player_id,
+                "player_name": player_name,
+                "event_type": "login",
+                "timestamp": timestamp,
+                "session_duration_seconds": None,
+            }
+        )
+        return True
+
+    def record_logout(self, player_id: str, timestamp: datetime) -> bool:
+        """Queue a logout event unless the player is already logged out
+
+        The session duration is computed from the tracked login time. Players
+        with no recorded events get a logout with a NULL duration (bot restart
+        edge case), matching the previous database-driven behaviour.
+
+        Returns True if a logout event was queued, False if skipped (duplicate)
+        """
+        entry = self._state.get(player_id)
+        if entry and entry["state"] == "logout":
+            logger.debug(
+                f"Skipping duplicate logout for player {player_id} - already logged out"
+            )
+            return False
+
+        duration = None
+        if entry and entry["login_time"]:
+            duration = int((timestamp - entry["login_time"]).total_seconds())
+
+        self._state[player_id] = {"state": "logout", "login_time": None}
+        self._pending.append(
+            {
+                "player_id": player_id,
+                "player_name": None,
+                "event_type": "logout",
+                "timestamp": timestamp,
+                "session_duration_seconds": duration,
+            }
+        )
+        return True
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def flush(self, db) -> int:
+        """Persist all queued events in one transaction
+
+        Returns the number of events written. On failure the events stay
+        queued and are retried on the next flush.
+        """
+        if not self._pending:
+            return 0
+
+        events = self._pending
+        self._pending = []
+        try:
+            await db.save_presence_events(events)
+        except Exception:
+            self._pending = events + self._pending
+            raise
+        return len(events)
+
+
+def _to_datetime(value) -> Optional[datetime]:
+    """Parse a login_events timestamp (stored as text by sqlite3)"""
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
@@ -0,0 +1,254 @@
+"""SQL statement timing and slow-query log
+
+Connections opened with `factory=TimedConnection` time every statement
+their cursors run. Samples are grouped by fingerprint (the SQL with
+literals, IN lists and whitespace normalized), and each fingerprint keeps a
+call count, total/max time and a latency histogram.
+
+A SELECT's time covers execute() plus fetchone()/fetchall() or iterating
+the cursor - SQLite does most of the work while rows are fetched. Statements slower than
+`slow_ms` are logged once per fingerprint per minute with their
+EXPLAIN QUERY PLAN.
+
+The registry is per process: the bot's numbers are shown by /dbstats, the
+dashboard's by /api/admin/db-stats.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds (ms); the last bucket is everything above
+BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+SLOW_LOG_INTERVAL = 60  # Seconds between slow-log lines for one fingerprint
+
+_PLANNABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+_fingerprints: Dict[str, str] = {}
+
+
+def fingerprint(sql: str) -> str:
+    """SQL with literals replaced by ? and IN (?, ?, ...) collapsed"""
+    fp = _fingerprints.get(sql)
+    if fp is None:
+        fp = _STRING_RE.sub("?", sql)
+        fp = _NUMBER_RE.sub("?", fp)
+        fp = _IN_LIST_RE.sub("(?...)", fp)
+        fp = _SPACE_RE.sub(" ", fp).strip()
+        if len(_fingerprints) > 4096:
+            _fingerprints.clear()
+        _fingerprints[sql] = fp
+    return fp
+
+
+class QueryStats:
+    """Thread-safe per-fingerprint counters and histograms"""
+
+    def __init__(self, slow_ms: float = 250):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict] = {}
+        self._last_slow_log: Dict[str, float] = {}
+        self.started = time.time()
+
+    def record(self, fp: str, elapsed_ms: float) -> bool:
+        """Add one sample, returns True if it should be logged as slow"""
+        with self._lock:
+            entry = self._stats.get(fp)
+            if entry is None:
+                entry = self._stats[fp] = {
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "histogram": [0] * (len(BUCKETS_MS) + 1),
+                }
+            entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            bucket = len(BUCKETS_MS)
+            for i, bound in enumerate(BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    bucket = i
+                    break
+            entry["histogram"][bucket] += 1
+
+            if self.slow_ms <= 0 or elapsed_ms < self.slow_ms:
+                return False
+            now = time.monotonic()
+            if now - self._last_slow_log.get(fp, 0) < SLOW_LOG_INTERVAL:
+                return False
+            self._last_slow_log[fp] = now
+            return True
+
+    def top(self, n: int = 10, sort: str = "total_ms") -> List[Dict]:
+        """Top-n fingerprints by total_ms / max_ms / calls / avg_ms"""
+        with self._lock:
+            rows = [
+                {
+                    "sql": fp,
+                    "calls": entry["calls"],
+                    "total_ms": round(entry["total_ms"], 1),
+                    "avg_ms": round(entry["total_ms"] / entry["calls"], 2),
+                    "max_ms": round(entry["max_ms"], 1),
+                    "histogram": dict(
+                        zip(
+                            [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"],
+                            entry["histogram"],
+                        )
+                    ),
+                }
+                for fp, entry in self._stats.items()
+            ]
+        return sorted(rows, key=lambda row: -row.get(sort, row["total_ms"]))[:n]
+
+    def summary(self) -> Dict:
+        with self._lock:
+            calls = sum(entry["calls"] for entry in self._stats.values())
+            total = sum(entry["total_ms"] for entry in self._stats.values())
+            return {
+                "statements": len(self._stats),
+                "calls": calls,
+                "total_ms": round(total, 1),
+                "slow_ms": self.slow_ms,
+                "since": self.started,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._last_slow_log.clear()
+            self.started = time.time()
+
+
+def _env_slow_ms() -> float:
+    try:
+        return float(os.getenv("SLOW_QUERY_MS", "250"))
+    except ValueError:
+        return 250.0
+
+
+# Process-wide registry
+STATS = QueryStats(_env_slow_ms())
+
+
+def _log_slow(conn: sqlite3.Connection, sql: str, params, elapsed_ms: float) -> None:
+    plan = ""
+    # params is None when the bindings are gone (executemany consumes them)
+    if params is not None and sql.lstrip().upper().startswith(_PLANNABLE):
+        try:
+            rows = sqlite3.Cursor(conn).execute(
+                "EXPLAIN QUERY PLAN " + sql, params
+            ).fetchall()
+            plan = "\n".join(f"    {row[3]}" for row in rows)
+        except sqlite3.Error as e:
+            plan = f"    (no plan: {e})"
+    logger.warning(
+        f"🐢 Slow query {elapsed_ms:.0f}ms: {fingerprint(sql)[:300]}"
+        + (f"\n{plan}" if plan else "")
+    )
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports execute + fetch time to STATS"""
+
+    _pending: Optional[tuple] = None
+
+    def _flush(self) -> None:
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        sql, params, elapsed_ms = pending
+        if STATS.record(fingerprint(sql), elapsed_ms):
+            _log_slow(self.connection, sql, params, elapsed_ms)
+
+    def execute(self, sql, parameters=()):
+        self._flush()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._pending = (sql, parameters, (time.perf_counter() - started) * 1000)
+            if self.description is None:
+                self._flush()
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            # No plan for executemany (parameters are consumed)
+            self._pending = (sql, None, (time.perf_counter() - started) * 1000)
+            self._flush()
+
+    def _timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            if self._pending is not None:
+                sql, params, elapsed_ms = self._pending
+                self._pending = (
+                    sql,
+                    params,
+                    elapsed_ms + (time.perf_counter() - started) * 1000,
+                )
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._timed_fetch(super().fetchmany)
+        return self._timed_fetch(super().fetchmany, size)
+
+    def fetchall(self):
+        try:
+            return self._timed_fetch(super().fetchall)
+        finally:
+            self._flush()
+
+    def __next__(self):
+        # `for row in cursor` steps the statement without calling fetch*()
+        try:
+            return self._timed_fetch(super().__next__)
+        except StopIteration:
+            self._flush()
+            raise
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._flush()
+        except Exception:
+            pass
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3.connect(..., factory=TimedConnection): every cursor is timed"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
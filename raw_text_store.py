@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Compressed storage for actions.raw_text
+
+Panel log lines are short (~100-250 bytes) and built from a few dozen fixed
+Romanian phrases, so plain zlib barely helps on a single row. Compressing
+against a preset dictionary of those phrases does: every row is stored as
+`MAGIC + raw deflate(text, zdict=ZDICT)` in the same `raw_text` column (as a
+BLOB), and falls back to the plain TEXT when that is not smaller.
+
+Encoding is deterministic, so identical lines still compare equal and
+GROUP BY raw_text keeps working. Readers never see the BLOBs:
+`compact_schema.row_factory` decodes them, and equality lookups use
+`match_values()` to match both storage forms.
+
+Enable for new rows with RAW_TEXT_COMPRESSION=true; convert existing rows:
+    python raw_text_store.py                      # Dry run (estimated savings)
+    python raw_text_store.py --execute            # Compress existing rows
+    python raw_text_store.py --execute --vacuum   # ...and reclaim space
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+import zlib
+from typing import Optional, Tuple, Union
+
+DB_PATH = os.getenv("DATABASE_PATH", "data/pro4kings.db")
+
+# Format marker (first byte of every compressed value). Bump it together with
+# a new dictionary - stored values must always decode with the one they used.
+MAGIC = b"\x01"
+
+# Preset dictionary - most frequent phrases last (closest = cheapest matches)
+ZDICT = (
+    b"Vanzarea de placute dintre jucatorii  a fost finalizata, numarul de "
+    b"inmatriculare ( pe vehiculul  a oferit "
+    b"Tradeul dintre jucatorii  si  a fost finalizat. ( "
+    b"Administratorul  i-a dat KILL CHARACTER jucatorului "
+    b"a fost dat afara de catre , motiv a primit unjail de la administratorul [ "
+    b"a primit mute de la administratorul , timp "
+    b"a fost debanat de catre administratorul "
+    b"a fost banat de catre adminul , durata 1 (de) zi(le), motiv "
+    b"a achizitionat Casa Nr.  de la jucatorul cu ID  pentru suma de .000.000$. "
+    b"a dat la remat masina "
+    b"Contract (). ('' [, ], ' [.000.000$, ]) "
+    b"a pus in chest(id ), a retras din chest(id u ), 1x "
+    b"a depozitat suma de .000$ (taxa .000$). "
+    b"a retras suma de .000$ (taxa .000$). "
+    b"a primit un avertisment (1/3), de la administratorul , motiv 200. "
+    b"a livrat bani de la banca(Fleeca Bank ( )) jefuita si a primit .000 bani "
+    b"murdari si 1x Moneda sindicat. "
+    b"a primit admin jail 120 (de) checkpointuri de la administratorul , motiv "
+    b"a castigat impotriva lui  meciul de barbut, .000.000$. ia dat lui  "
+    b"Jucatorul [ a vandut x Peste  pentru suma de $.000.000! "
+    b"Jucatorul ia transferat suma de .000.000$ jucatorului , taxa .000$. [IN BANCA]"
+)
+
+_LEVEL = 9
+_WBITS = -15  # raw deflate - no zlib header/checksum on ~100 byte rows
+_MEM_LEVEL = 4  # same output for short rows, ~5x cheaper compressor setup
+
+
+def compress(text: str) -> bytes:
+    """Compress one raw_text value (deterministic)"""
+    compressor = zlib.compressobj(
+        _LEVEL, zlib.DEFLATED, _WBITS, _MEM_LEVEL, zdict=ZDICT
+    )
+    return MAGIC + compressor.compress(text.encode("utf-8")) + compressor.flush()
+
+
+def encode(
+    text: Optional[str], compress_enabled: bool = True
+) -> Union[str, bytes, None]:
+    """Storage form of a raw_text value: compressed BLOB when that is smaller"""
+    if not text or not compress_enabled:
+        return text
+    packed = compress(text)
+    return packed if len(packed) < len(text.encode("utf-8")) else text
+
+
+def decode(value: Union[str, bytes, None]) -> Optional[str]:
+    """Readable raw_text from either storage form"""
+    if not isinstance(value, (bytes, memoryview)):
+        return value
+    value = bytes(value)
+    if value[:1] == MAGIC:
+        decompressor = zlib.decompressobj(_WBITS, zdict=ZDICT)
+        return (decompressor.decompress(value[1:]) + decompressor.flush()).decode(
+            "utf-8"
+        )
+    return value.decode("utf-8", errors="replace")
+
+
+def match_values(text: Optional[str]) -> Tuple:
+    """Parameters for `raw_text IN (?, ?)` matching plain and compressed rows"""
+    return (text, encode(text))
+
+
+def storage_stats(conn: sqlite3.Connection, sample: int = 0) -> dict:
+    """Row counts and byte totals of raw_text per storage form
+
+    With `sample`, also estimates compressed size of the plain TEXT rows from
+    the first N of them.
+    """
+    stats = {}
+    for form, kind in (("text", "text"), ("blob", "blob")):
+        rows, size = conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(raw_text AS BLOB))), 0) "
+            f"FROM actions WHERE typeof(raw_text) = '{kind}'"
+        ).fetchone()
+        stats[f"{form}_rows"] = rows
+        stats[f"{form}_bytes"] = size
+
+    if sample:
+        plain = packed = 0
+        for (text,) in conn.execute(
+            "SELECT raw_text FROM actions WHERE typeof(raw_text) = 'text' LIMIT ?",
+            (sample,),
+        ):
+            raw = text.encode("utf-8")
+            plain += len(raw)
+            packed += min(len(compress(text)), len(raw))
+        stats["sample_ratio"] = packed / plain if plain else 1.0
+    return stats
+
+
+def compress_existing(
+    db_path: str,
+    execute: bool = False,
+    batch_size: int = 5000,
+    vacuum: bool = False,
+    log=print,
+) -> int:
+    """Compress plain TEXT raw_text rows in id-ordered batches
+
+    Each batch is its own short write transaction, so the bot can keep
+    inserting while this runs. Returns the number of rows rewritten.
+    """
+    import compact_schema
+    import db_domains
+
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    db_domains.attach(conn, db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    table = compact_schema.actions_table(conn.cursor())
+
+    stats = storage_stats(conn, sample=20000)
+    text_mb = stats["text_bytes"] / 1024 / 1024
+    log(
+        f"📄 raw_text: {stats['text_rows']:,} plain rows ({text_mb:.1f} MB), "
+        f"{stats['blob_rows']:,} compressed rows "
+        f"({stats['blob_bytes'] / 1024 / 1024:.1f} MB)"
+    )
+    log(
+        f"🗜️ Estimated: {text_mb:.1f} MB -> {text_mb * stats['sample_ratio']:.1f} MB "
+        f"({(1 - stats['sample_ratio']) * 100:.0f}% smaller)"
+    )
+
+    if not execute:
+        log("🔍 Dry run - re-run with --execute to compress")
+        conn.close()
+        return 0
+
+    converted = 0
+    last_id = 0
+    started = time.time()
+    while True:
+        rows = conn.execute(
+            f"SELECT id, raw_text FROM {table} "
+            f"WHERE id > ? AND typeof(raw_text) = 'text' ORDER BY id LIMIT ?",
+            (last_id, batch_size),
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        updates = [
+            (packed, row_id)
+            for row_id, text in rows
+            if isinstance(packed := encode(text), bytes)
+        ]
+        with conn:
+            conn.executemany(f"UPDATE {table} SET raw_text = ? WHERE id = ?", updates)
+        converted += len(updates)
+        log(f"  ... {converted:,} rows compressed (id {last_id:,})")
+
+    log(f"✅ Compressed {converted:,} rows in {time.time() - started:.1f}s")
+
+    if vacuum:
+        log("🧹 VACUUM (rewrites the whole file)...")
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # applied by the VACUUM
+        conn.execute("VACUUM")
+    conn.close()
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress stored actions.raw_text")
+    parser.add_argument("--db", default=DB_PATH, help="Database path")
+    parser.add_argument(
+        "--execute", action="store_true", help="Compress rows (default: dry run)"
+    )
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument(
+        "--vacuum", action="store_true", help="VACUUM afterwards to shrink the file"
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found: {args.db}")
+        return
+
+    compress_existing(
+        args.db, execute=args.execute, batch_size=args.batch_size, vacuum=args.vacuum
+    )
+
+
+if __name__ == "__main__":
+    main()
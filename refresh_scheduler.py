@@ -0,0 +1,171 @@
+"""Scored profile refresh scheduling
+
+Each player profile carries a `next_refresh_at` timestamp. After every refresh
+the profile is rescheduled from a score built from how interesting the player
+is (online, recently active, in a faction) and how often their profile has
+actually changed. Activity signals (new actions, logins) pull `next_refresh_at`
+forward. Every update cycle fetches the due profiles with the highest score
+first, bounded by a per-cycle HTTP budget.
+"""
+
+import math
+from typing import Dict, Optional
+
+from config import Config
+
+# Score weights (max total score = sum of weights)
+WEIGHT_ONLINE = 3.0
+WEIGHT_ACTIVITY = 2.0
+WEIGHT_FACTION = 1.0
+WEIGHT_CHANGE_RATE = 2.0
+WEIGHT_STALENESS = 2.0
+MAX_SCORE = (
+    WEIGHT_ONLINE
+    + WEIGHT_ACTIVITY
+    + WEIGHT_FACTION
+    + WEIGHT_CHANGE_RATE
+    + WEIGHT_STALENESS
+)
+
+# Activity bonus halves every ACTIVITY_HALF_LIFE_HOURS after the last signal
+ACTIVITY_HALF_LIFE_HOURS = 6.0
+# Staleness bonus saturates once a profile is a week old
+STALENESS_SATURATION_HOURS = 168.0
+
+# Retry delay for IDs that were due but returned no profile (404/errors)
+MISSING_PROFILE_RETRY_DELAY = 6 * 3600
+
+# How soon a profile becomes due after each kind of signal (seconds)
+SIGNAL_DELAYS: Dict[str, int] = {
+    "action": 0,  # Player just did something - refresh next cycle
+    "login": 0,
+    "missing_rank": 0,
+    "online": 1800,  # Still online - no need to refresh more than every 30 min
+}
+
+# Signals that count as player activity for the score
+ACTIVITY_SIGNALS = ("action", "login")
+
+NON_FACTIONS = ("", "Civil", "Fără", "None", "Fara", "-", "N/A")
+
+AGE_BUCKETS = [
+    ("< 1h", 1),
+    ("1h-6h", 6),
+    ("6h-24h", 24),
+    ("1d-7d", 168),
+    ("7d-30d", 720),
+    ("> 30d", None),
+]
+
+
+def in_faction(faction: Optional[str]) -> bool:
+    """Return True if the faction value denotes real faction membership"""
+    return bool(faction) and faction not in NON_FACTIONS
+
+
+def refresh_score(
+    is_online: bool,
+    hours_since_activity: Optional[float],
+    faction: Optional[str],
+    checks: int,
+    changes: int,
+    hours_since_update: Optional[float] = 0.0,
+) -> float:
+    """Score how valuable a profile refresh is (0 .. MAX_SCORE)
+
+    Args:
+        is_online: Player is currently online
+        hours_since_activity: Hours since the last action/login signal (None = never)
+        faction: Current faction name
+        checks: Number of times the profile was fetched
+        changes: Number of those fetches where a tracked field changed
+        hours_since_update: Hours since last_profile_update (None = never fetched)
+    """
+    score = 0.0
+
+    if is_online:
+        score += WEIGHT_ONLINE
+
+    if hours_since_activity is not None:
+        score += WEIGHT_ACTIVITY * 0.5 ** (
+            max(0.0, hours_since_activity) / ACTIVITY_HALF_LIFE_HOURS
+        )
+
+    if in_faction(faction):
+        score += WEIGHT_FACTION
+
+    # Laplace-smoothed change rate: new profiles start at 0.5
+    score += WEIGHT_CHANGE_RATE * (changes + 1) / (checks + 2)
+
+    if hours_since_update is None:
+        score += WEIGHT_STALENESS
+    else:
+        score += WEIGHT_STALENESS * min(
+            1.0, max(0.0, hours_since_update) / STALENESS_SATURATION_HOURS
+        )
+
+    return score
+
+
+def next_refresh_delay(score: float) -> int:
+    """Map a score to seconds until the next refresh
+
+    Interpolates geometrically between PROFILE_REFRESH_MAX_INTERVAL (score 0)
+    and PROFILE_REFRESH_MIN_INTERVAL (MAX_SCORE).
+    """
+    min_interval = max(60, Config.PROFILE_REFRESH_MIN_INTERVAL)
+    max_interval = max(min_interval, Config.PROFILE_REFRESH_MAX_INTERVAL)
+    fraction = min(1.0, max(0.0, score / MAX_SCORE))
+    return int(max_interval * math.pow(min_interval / max_interval, fraction))
+
+
+def get_queue_stats(cursor) -> Dict:
+    """Return refresh queue depth and the age distribution of all profiles
+
+    Takes a plain sqlite3 cursor so it can be shared by the bot (Database)
+    and the dashboard.
+    """
+    cursor.execute(
+        """
+        SELECT
+            SUM(CASE WHEN next_refresh_at <= CURRENT_TIMESTAMP THEN 1 ELSE 0 END),
+            SUM(CASE WHEN next_refresh_at IS NOT NULL THEN 1 ELSE 0 END),
+            MIN(next_refresh_at)
+        FROM player_profiles
+    """
+    )
+    row = cursor.fetchone()
+    queue_depth, scheduled, oldest_due = row[0] or 0, row[1] or 0, row[2]
+
+    cases = " ".join(
+        f"WHEN age_hours < {limit} THEN '{label}'"
+        for label, limit in AGE_BUCKETS
+        if limit is not None
+    )
+    cursor.execute(
+        f"""
+        SELECT
+            CASE
+                WHEN age_hours IS NULL THEN 'never'
+                {cases}
+                ELSE '{AGE_BUCKETS[-1][0]}'
+            END AS bucket,
+            COUNT(*)
+        FROM (
+            SELECT (julianday('now') - julianday(last_profile_update)) * 24 AS age_hours
+            FROM player_profiles
+        )
+        GROUP BY bucket
+    """
+    )
+    counts = {row[0]: row[1] for row in cursor.fetchall()}
+    age_distribution = {label: counts.get(label, 0) for label, _ in AGE_BUCKETS}
+    age_distribution["never"] = counts.get("never", 0)
+
+    return {
+        "queue_depth": queue_depth,
+        "scheduled": scheduled,
+        "oldest_due": oldest_due,
+        "budget": Config.PROFILE_REFRESH_BUDGET,
+        "age_distribution": age_distribution,
+    }
@@ -78,7 +78,7 @@ class UnknownActionsReparser:
 
                 return [dict(row) for row in cursor.fetchall()]
 
-        return await asyncio.to_thread(_get_unknown_sync)
+        return await self.db.run_read(_get_unknown_sync)
 
     async def reparse_action(
         self, action: Dict, scraper: Pro4KingsScraper
@@ -133,6 +133,8 @@ class UnknownActionsReparser:
                 "admin_name": parsed.admin_name,
                 "warning_count": parsed.warning_count,
                 "reason": parsed.reason,
+                "amount": parsed.amount,
+                "fee": parsed.fee,
             }
 
         except Exception as e:
@@ -162,7 +164,9 @@ class UnknownActionsReparser:
                             admin_id = ?,
                             admin_name = ?,
                             warning_count = ?,
-                            reason = ?
+                            reason = ?,
+                            amount = ?,
+                            fee = ?
                         WHERE id = ?
                     """,
                         (
@@ -178,6 +182,8 @@ class UnknownActionsReparser:
                             update_data["admin_name"],
                             update_data["warning_count"],
                             update_data["reason"],
+                            update_data["amount"],
+                            update_data["fee"],
                             update_data["id"],
                         ),
                     )
@@ -189,7 +195,7 @@ class UnknownActionsReparser:
                 logger.error(f"Error updating action {update_data['id']}: {e}")
                 return False
 
-        return await asyncio.to_thread(_update_sync)
+        return await self.db.run_write(_update_sync, domain="events")
 
     async def run(
         self, dry_run: bool = True, action_type_filter: Optional[str] = None
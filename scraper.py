@@ -17,6 +17,9 @@ import random
 from dataclasses import dataclass, field
 import re
 
+from action_values import extract_action_values
+import metrics
+
 # 🔥 NEW: Cloudscraper for JavaScript challenge bypass (Cloudflare, etc.)
 try:
     import cloudscraper
@@ -50,6 +53,8 @@ class PlayerAction:
     reason: Optional[str] = None
     timestamp: Optional[datetime] = None
     raw_text: Optional[str] = None
+    amount: Optional[int] = None
+    fee: Optional[int] = None
 
 
 @dataclass
@@ -154,7 +159,6 @@ class Pro4KingsScraper:
         }
 
         self.last_request_time = {}
-        self.request_times = []
         self.consecutive_503 = 0
 
         self.headers = {
@@ -223,10 +227,9 @@ class Pro4KingsScraper:
                 start_time = time.time()
                 try:
                     async with self.client.get(url, ssl=False) as response:
-                        elapsed = time.time() - start_time
-                        self.request_times.append(elapsed)
-                        if len(self.request_times) > 100:
-                            self.request_times.pop(0)
+                        # 📊 Latency percentiles + status counts (/metrics)
+                        metrics.SCRAPER_REQUEST_SECONDS.observe(time.time() - start_time)
+                        metrics.SCRAPER_RESPONSES.inc(status=response.status)
 
                         if response.status == 200:
                             html = await response.text()
@@ -303,6 +306,7 @@ class Pro4KingsScraper:
                             return None
 
                 except asyncio.TimeoutError:
+                    metrics.SCRAPER_RESPONSES.inc(status="timeout")
                     if attempt < retries - 1:
                         await asyncio.sleep(0.5)
                         continue
@@ -311,6 +315,7 @@ class Pro4KingsScraper:
                 except Exception as e:
                     if "503" in str(e):
                         raise
+                    metrics.SCRAPER_RESPONSES.inc(status="error")
                     if attempt < retries - 1:
                         await asyncio.sleep(0.5)
                         continue
@@ -686,13 +691,23 @@ class Pro4KingsScraper:
           - p.mb-1 containing the action text
           - small > div containing timestamp (YYYY-MM-DD HH:MM:SS)
         """
-        url = f"{self.base_url}/"
-        html = await self.fetch_page(url)
+        html = await self.fetch_latest_actions_page()
+        if not html:
+            return []
+        return self.parse_latest_actions(html, limit)
 
+    async def fetch_latest_actions_page(self) -> Optional[str]:
+        """Fetch the homepage holding the latest actions (pipeline fetch stage)"""
+        html = await self.fetch_page(f"{self.base_url}/")
         if not html:
             logger.error("Failed to fetch homepage for actions!")
-            return []
+        return html
 
+    def parse_latest_actions(self, html: str, limit: int = 200) -> List[PlayerAction]:
+        """Parse the homepage's "Ultimele acțiuni" card (pipeline parse stage)
+
+        Pure CPU work with no I/O, so it can run off the event loop.
+        """
         soup = BeautifulSoup(html, "lxml")
         actions = []
         seen_raw_texts = set()  # Dedupe within same scrape
@@ -802,6 +817,26 @@ class Pro4KingsScraper:
 
     def _parse_action_text(
         self, text: str, timestamp: datetime
+    ) -> Optional[PlayerAction]:
+        """Parse action text and fill the numeric amount/fee/item columns"""
+        action = self._match_action_patterns(text, timestamp)
+        if action:
+            values = extract_action_values(
+                action.action_type,
+                action.action_detail,
+                action.raw_text,
+                action.player_id,
+            )
+            action.amount = values["amount"]
+            action.fee = values["fee"]
+            if action.item_name is None:
+                action.item_name = values["item_name"]
+            if action.item_quantity is None:
+                action.item_quantity = values["item_quantity"]
+        return action
+
+    def _match_action_patterns(
+        self, text: str, timestamp: datetime
     ) -> Optional[PlayerAction]:
         """🔥 COMPREHENSIVE: Parse action text into PlayerAction with ALL patterns.
 
@@ -2503,7 +2538,8 @@ class Pro4KingsScraper:
             )
             return None
 
-    def is_vip_action(self, action: PlayerAction, vip_ids: Set[str]) -> bool:
+    @staticmethod
+    def is_vip_action(action: PlayerAction, vip_ids: Set[str]) -> bool:
         """Check if action involves any VIP player"""
         if not action:
             return False
@@ -2532,7 +2568,8 @@ class Pro4KingsScraper:
         )
         return vip_actions
 
-    def is_online_action(self, action: PlayerAction, online_ids: Set[str]) -> bool:
+    @staticmethod
+    def is_online_action(action: PlayerAction, online_ids: Set[str]) -> bool:
         """Check if action involves any currently online player"""
         if not action:
             return False
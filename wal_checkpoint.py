@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+WAL checkpoint management
+
+SQLite's automatic checkpoint (every 1000 pages, run by whichever
+connection commits) never shrinks the -wal file, and it can't finish
+while the dashboard holds a long read transaction. The file then keeps
+growing, and every reader has to search a longer WAL index.
+
+`run_checkpoint` is called on a schedule by the bot:
+- PASSIVE on every run: copies what it can without waiting for anyone
+- TRUNCATE when the database was quiet since the last run (the WAL did not
+  grow) or the WAL is over `truncate_bytes`. It waits at most
+  `busy_timeout_ms` for readers, so it never stalls the scrapers for long.
+
+The last result is written next to the database (`<db>.checkpoint.json`),
+so the dashboard process can show it in /api/bot-status.
+
+Usage:
+    python wal_checkpoint.py                  # Show WAL size
+    python wal_checkpoint.py --mode truncate  # Checkpoint now
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv("DATABASE_PATH", "data/pro4kings.db")
+
+MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+
+def wal_path(db_path: str) -> str:
+    return db_path + "-wal"
+
+
+def stats_path(db_path: str) -> str:
+    return db_path + ".checkpoint.json"
+
+
+def wal_size(db_path: str) -> int:
+    """Current -wal file size in bytes (0 when there is none)"""
+    try:
+        return os.path.getsize(wal_path(db_path))
+    except OSError:
+        return 0
+
+
+def checkpoint(
+    db_path: str, mode: str = "PASSIVE", busy_timeout_ms: int = 1000
+) -> Dict:
+    """Run one wal_checkpoint on its own connection (blocking - run in a thread)
+
+    Returns mode, busy flag, WAL frames / checkpointed frames, duration and
+    the WAL size before and after.
+    """
+    mode = mode.upper()
+    if mode not in MODES:
+        raise ValueError(f"Unknown checkpoint mode: {mode}")
+
+    before = wal_size(db_path)
+    started = time.time()
+    conn = sqlite3.connect(db_path, timeout=busy_timeout_ms / 1000)
+    try:
+        conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        busy, log_frames, checkpointed = conn.execute(
+            f"PRAGMA wal_checkpoint({mode})"
+        ).fetchone()
+    finally:
+        conn.close()
+
+    return {
+        "mode": mode,
+        "busy": bool(busy),
+        "wal_frames": log_frames,
+        "checkpointed_frames": checkpointed,
+        "seconds": round(time.time() - started, 3),
+        "wal_bytes_before": before,
+        "wal_bytes_after": wal_size(db_path),
+        "at": datetime.now().isoformat(),
+    }
+
+
+def run_checkpoint(
+    db_path: str,
+    previous: Optional[Dict],
+    truncate_bytes: int,
+    busy_timeout_ms: int = 1000,
+) -> Dict:
+    """One scheduled run: PASSIVE, then TRUNCATE if quiet or the WAL is too big
+
+    `previous` is the result of the last run; the database counts as quiet
+    when neither the WAL size nor its frame count changed since then.
+    """
+    current = wal_size(db_path)
+    oversized = truncate_bytes > 0 and current > truncate_bytes
+
+    result = checkpoint(db_path, "PASSIVE", busy_timeout_ms)
+    quiet = (
+        previous is not None
+        and previous["wal_bytes_after"] == current
+        and previous["wal_frames"] == result["wal_frames"]
+    )
+    if current and (quiet or oversized):
+        result = checkpoint(db_path, "TRUNCATE", busy_timeout_ms)
+        result["reason"] = "quiet" if quiet else "oversized"
+        if result["busy"]:
+            logger.info(
+                f"⏳ WAL TRUNCATE skipped ({result['reason']}): readers still active, "
+                f"WAL {current / 1024 / 1024:.1f} MB"
+            )
+        else:
+            logger.info(
+                f"🧾 WAL truncated ({result['reason']}): "
+                f"{current / 1024 / 1024:.1f} MB -> "
+                f"{result['wal_bytes_after'] / 1024 / 1024:.1f} MB "
+                f"in {result['seconds'] * 1000:.0f}ms"
+            )
+    elif result["busy"] or result["checkpointed_frames"] < result["wal_frames"]:
+        logger.debug(
+            f"🧾 WAL PASSIVE: {result['checkpointed_frames']}/{result['wal_frames']} "
+            f"frames (readers pinning the rest)"
+        )
+
+    save_stats(db_path, result)
+    return result
+
+
+def save_stats(db_path: str, result: Dict) -> None:
+    try:
+        tmp = stats_path(db_path) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(result, f)
+        os.replace(tmp, stats_path(db_path))
+    except OSError as e:
+        logger.debug(f"Could not write checkpoint stats: {e}")
+
+
+def load_stats(db_path: str) -> Dict:
+    """Current WAL size plus the last recorded checkpoint (if any)"""
+    stats = {"wal_bytes": wal_size(db_path), "last_checkpoint": None}
+    try:
+        with open(stats_path(db_path)) as f:
+            stats["last_checkpoint"] = json.load(f)
+    except (OSError, ValueError):
+        pass
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite WAL checkpoint")
+    parser.add_argument("--db", default=DB_PATH, help="Database path")
+    parser.add_argument(
+        "--mode", choices=[m.lower() for m in MODES], help="Checkpoint now"
+    )
+    parser.add_argument("--busy-timeout", type=int, default=5000, help="ms")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found: {args.db}")
+        return
+
+    print(f"🧾 WAL: {wal_size(args.db) / 1024 / 1024:.1f} MB")
+    if not args.mode:
+        return
+
+    result = checkpoint(args.db, args.mode, args.busy_timeout)
+    save_stats(args.db, result)
+    print(
+        f"{'⏳ busy' if result['busy'] else '✅ done'}: "
+        f"{result['checkpointed_frames']}/{result['wal_frames']} frames, "
+        f"WAL {result['wal_bytes_after'] / 1024 / 1024:.1f} MB, "
+        f"{result['seconds'] * 1000:.0f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()